@@ -0,0 +1,118 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from asgiref.wsgi import WsgiToAsgiInstance
+from django.conf import settings
+
+
+BODY_MEMORY_BYTES = 65536 #request bodies larger than this are spooled to a temporary file while they arrive
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class RequestBodyTooLarge(Exception):
+	pass
+
+
+class ClientDisconnected(Exception):
+	pass
+
+
+def get_executor(): #Pool of threads the views run in, created on first use so every worker process gets its own.Each thread keeps its own db connection, so the db sees up to workers * ASGI_THREADS of them
+	global _executor
+	with _executor_lock:
+		if _executor is None:
+			_executor = ThreadPoolExecutor(
+				max_workers=settings.ASGI_THREADS,
+				thread_name_prefix='asgi'
+			)
+	return _executor
+
+
+class PooledWsgiToAsgi: #ASGI application serving a WSGI one(django's) with the network on the event loop and the views in the get_executor() pool
+	'''Django 2.1 has no async views or ORM, so a view still holds a thread(and its db connection) while it runs.
+	What it no longer holds one for is the network: the request body is read on the event loop before a thread is
+	taken and the response is made whole in the thread and then sent from the event loop, so a client on a slow
+	network ties up nothing but its socket while it uploads or downloads.Streaming responses(i.e the recipes
+	export) are sent from their thread a part at a time as they are made, as their generator has to stay on the
+	thread holding its db cursor.'''
+
+	def __init__(self, wsgi_application, executor=None):
+		self.wsgi_application = wsgi_application
+		self.executor = executor #the shared get_executor() pool by default
+
+	async def __call__(self, scope, receive, send):
+		await PooledWsgiToAsgiInstance(self.wsgi_application, self.executor or get_executor())(scope, receive, send)
+
+
+class PooledWsgiToAsgiInstance(WsgiToAsgiInstance): #One request of PooledWsgiToAsgi, the environ and start_response are asgiref's
+
+	def __init__(self, wsgi_application, executor):
+		super().__init__(wsgi_application)
+		self.executor = executor
+
+	async def __call__(self, scope, receive, send):
+		if scope['type'] != 'http':
+			raise ValueError('WSGI wrapper received a non-HTTP scope')
+		self.scope = scope
+		self.send = send
+		self.loop = asyncio.get_event_loop()
+
+		with SpooledTemporaryFile(max_size=BODY_MEMORY_BYTES) as body:
+			try:
+				await self.read_body(receive, body)
+			except RequestBodyTooLarge:
+				await self.send_empty_response(413)
+				return
+			except ClientDisconnected: #nobody left to answer
+				return
+			body.seek(0)
+			content = await self.loop.run_in_executor(self.executor, self.run_wsgi_app, body)
+
+		if content is not None:
+			await send(self.response_start)
+			await send({'type': 'http.response.body', 'body': content})
+
+	async def read_body(self, receive, body): #Read the whole request body into body, refusing it as soon as it is known to be larger than ASGI_MAX_BODY_BYTES
+		limit = settings.ASGI_MAX_BODY_BYTES
+		for name, value in self.scope.get('headers', []):
+			if name == b'content-length' and value.isdigit() and int(value) > limit:
+				raise RequestBodyTooLarge()
+
+		size = 0
+		while True:
+			message = await receive()
+			if message['type'] == 'http.disconnect':
+				raise ClientDisconnected()
+			chunk = message.get('body', b'')
+			size += len(chunk)
+			if size > limit: #a chunked body has no content-length
+				raise RequestBodyTooLarge()
+			body.write(chunk)
+			if not message.get('more_body'):
+				return
+
+	async def send_empty_response(self, status):
+		await self.send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-length', b'0')]})
+		await self.send({'type': 'http.response.body'})
+
+	def run_wsgi_app(self, body): #Run in a pool thread, returns the content of the response or None when it was streamed from here
+		response = self.wsgi_application(self.build_environ(self.scope, body), self.start_response)
+		try:
+			if not getattr(response, 'streaming', False):
+				return b''.join(response)
+			self.send_from_thread(self.response_start)
+			for chunk in response:
+				if chunk:
+					self.send_from_thread({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+			self.send_from_thread({'type': 'http.response.body'})
+			return None
+		finally:
+			if hasattr(response, 'close'):
+				response.close() #sends request_finished, which closes this thread's db connection once it is past CONN_MAX_AGE or broken.asgiref's adapter never calls it
+
+	def send_from_thread(self, message): #Send a message from the pool thread, waiting until the client took it
+		asyncio.run_coroutine_threadsafe(self.send(message), self.loop).result()
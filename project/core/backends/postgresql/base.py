@@ -0,0 +1,45 @@
+from django.db.backends.postgresql import base
+
+from core.metrics import DB_CONNECTIONS_OPEN, DB_CONNECTIONS_OPENED
+
+
+class DatabaseWrapper(base.DatabaseWrapper): #Django's postgresql backend plus the CONN_HEALTH_CHECKS setting of Django 4.1
+	'''With CONN_MAX_AGE a thread keeps its connection for the requests that follow, so a connection the server or
+	PgBouncer dropped in between would only show up as a failed query. With CONN_HEALTH_CHECKS on, the first use of a
+	reused connection in a request runs SELECT 1 on it and reconnects if that fails.'''
+
+	health_check_done = False
+
+	def connect(self):
+		self.health_check_done = True #a new connection needs no check, set first as connect() itself calls ensure_connection()
+		super().connect()
+
+	def get_new_connection(self, conn_params):
+		connection = super().get_new_connection(conn_params)
+		DB_CONNECTIONS_OPENED.labels(self.alias).inc()
+		DB_CONNECTIONS_OPEN.labels(self.alias).inc()
+		return connection
+
+	def _close(self):
+		if self.connection is None:
+			return
+		try:
+			super()._close()
+		finally:
+			DB_CONNECTIONS_OPEN.labels(self.alias).dec()
+
+	def close_if_unusable_or_obsolete(self): #Called at the start and end of every request
+		super().close_if_unusable_or_obsolete()
+		self.health_check_done = False
+
+	def ensure_connection(self):
+		if (
+			self.connection is not None
+			and not self.health_check_done
+			and self.settings_dict.get('CONN_HEALTH_CHECKS')
+			and not self.in_atomic_block #a transaction has to fail on its own connection
+		):
+			if not self.is_usable():
+				self.close()
+			self.health_check_done = True
+		super().ensure_connection()
@@ -0,0 +1,310 @@
+import abc
+import io
+import random
+import time
+import tracemalloc
+from collections import namedtuple
+from decimal import Decimal
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+from recipe.cache import bump_user_version
+from recipe.search import update_search_vectors
+
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+SEED_BATCH_SIZE = 5000
+
+ADJECTIVES = ('Spicy', 'Roasted', 'Creamy', 'Smoky', 'Crispy', 'Grilled', 'Slow cooked', 'Tangy', 'Sweet', 'Herby', 'Zesty', 'Baked')
+DISHES = ('curry', 'soup', 'salad', 'stew', 'pasta', 'risotto', 'tacos', 'dal', 'pie', 'noodles', 'tart', 'biryani', 'chowder', 'pilaf')
+TAG_WORDS = ('Vegan', 'Vegetarian', 'Quick', 'Dessert', 'Breakfast', 'Spicy', 'Gluten free', 'Party', 'Budget', 'Comfort', 'Summer', 'Winter')
+INGREDIENT_WORDS = ('Onion', 'Garlic', 'Tomato', 'Rice', 'Lentils', 'Chicken', 'Paneer', 'Butter', 'Flour', 'Ginger', 'Cumin', 'Lemon', 'Spinach', 'Chickpeas', 'Potato', 'Cream')
+
+Tenant = namedtuple('Tenant', ('recipe_count', 'user', 'token', 'recipe_ids', 'tag_ids', 'ingredient_ids'))
+
+
+def tenant_email(recipe_count, seed):
+	return 'benchmark-{}-{}@example.com'.format(recipe_count, seed)
+
+
+def skewed_choice(rng, items): #Pick from items favouring the first ones, so a few tags and ingredients are on most recipes like in a real account
+	return items[int(len(items) * rng.random() ** 2)]
+
+
+def generate_recipes(recipe_count, seed): #Yield (fields, tag indexes, ingredient indexes) of recipe_count recipes plus the tag and ingredient names they use, the same ones for the same arguments
+	rng = random.Random('{}:{}'.format(seed, recipe_count))
+	tag_names = ['{} {}'.format(TAG_WORDS[i % len(TAG_WORDS)], i // len(TAG_WORDS)) for i in range(min(max(recipe_count // 20, 8), 300))]
+	ingredient_names = ['{} {}'.format(INGREDIENT_WORDS[i % len(INGREDIENT_WORDS)], i // len(INGREDIENT_WORDS)) for i in range(min(max(recipe_count // 5, 20), 2000))]
+
+	def recipes():
+		for i in range(recipe_count):
+			fields = {
+				'title': '{} {} {}'.format(rng.choice(ADJECTIVES), rng.choice(DISHES), i),
+				'time_minutes': rng.randint(5, 180),
+				'price': Decimal(rng.randint(50, 5000)) / 100,
+				'link': 'https://example.com/recipes/{}'.format(i) if rng.random() < 0.3 else '',
+			}
+			tags = {skewed_choice(rng, range(len(tag_names))) for _ in range(rng.randint(1, 4))}
+			ingredients = {skewed_choice(rng, range(len(ingredient_names))) for _ in range(rng.randint(3, 12))}
+			yield fields, sorted(tags), sorted(ingredients)
+
+	return tag_names, ingredient_names, recipes()
+
+
+def seed_tenant(recipe_count, seed=0): #Get the benchmark user owning recipe_count recipes generated from seed, creating it on the first run
+	user = get_user_model().objects.filter(email=tenant_email(recipe_count, seed)).first()
+	if user is None:
+		user = _create_tenant(recipe_count, seed)
+
+	return Tenant(
+		recipe_count=recipe_count,
+		user=user,
+		token=Token.objects.get_or_create(user=user)[0].key,
+		recipe_ids=list(Recipe.objects.filter(user=user).order_by('id').values_list('id', flat=True)),
+		tag_ids=list(Tag.objects.filter(user=user).order_by('id').values_list('id', flat=True)),
+		ingredient_ids=list(Ingredient.objects.filter(user=user).order_by('id').values_list('id', flat=True)),
+	)
+
+
+@transaction.atomic #all or nothing, so a user found by seed_tenant has every recipe
+def _create_tenant(recipe_count, seed):
+	user = get_user_model().objects.create_user(tenant_email(recipe_count, seed), BENCHMARK_PASSWORD)
+	tag_names, ingredient_names, recipes = generate_recipes(recipe_count, seed)
+	tags = Tag.objects.bulk_create(Tag(user=user, name=name) for name in tag_names)
+	ingredients = Ingredient.objects.bulk_create(Ingredient(user=user, name=name) for name in ingredient_names)
+
+	batch = []
+	for item in recipes:
+		batch.append(item)
+		if len(batch) == SEED_BATCH_SIZE:
+			_insert_batch(user, batch, tags, ingredients)
+			batch = []
+	if batch:
+		_insert_batch(user, batch, tags, ingredients)
+	bump_user_version(user.id)
+	return user
+
+
+def _insert_batch(user, batch, tags, ingredients): #bulk_create sends no signals, the search vectors are updated here
+	recipes = Recipe.objects.bulk_create(Recipe(user=user, **fields) for fields, tag_indexes, ingredient_indexes in batch)
+	Recipe.tags.through.objects.bulk_create(
+		Recipe.tags.through(recipe_id=recipe.id, tag_id=tags[i].id)
+		for recipe, (fields, tag_indexes, ingredient_indexes) in zip(recipes, batch) for i in tag_indexes
+	)
+	Recipe.ingredients.through.objects.bulk_create(
+		Recipe.ingredients.through(recipe_id=recipe.id, ingredient_id=ingredients[i].id)
+		for recipe, (fields, tag_indexes, ingredient_indexes) in zip(recipes, batch) for i in ingredient_indexes
+	)
+	update_search_vectors([recipe.id for recipe in recipes])
+
+
+def sample_image(): #The same small JPEG every time, stored once by the content addressed storage however often it is uploaded
+	image = Image.new('RGB', (640, 480))
+	for x in range(0, 640, 32):
+		for y in range(0, 480, 32):
+			image.paste(((x * 7) % 256, (y * 5) % 256, (x + y) % 256), (x, y, x + 32, y + 32))
+	file = io.BytesIO()
+	image.save(file, format='JPEG', quality=90)
+	file.name = 'benchmark.jpg'
+	return file
+
+
+class Scenario(abc.ABC): #A request measured by the benchmark.prepare() runs untimed before every request, cleanup() once after the last one
+	status = 200
+
+	def __init__(self, client, tenant):
+		self.client = client
+		self.tenant = tenant
+		self.calls = 0
+
+	def prepare(self):
+		pass
+
+	@abc.abstractmethod
+	def request(self):
+		'''Send the measured request and return its response'''
+
+	def cleanup(self):
+		pass
+
+
+class TokenScenario(Scenario): #Log in, hashing the password with PASSWORD_HASHER
+	def request(self):
+		return self.client.post(reverse('user:token'), {'email': self.tenant.user.email, 'password': BENCHMARK_PASSWORD})
+
+
+class ListScenario(Scenario): #A page of the recipe list, built every time unless cached is set
+	cached = False
+
+	def params(self):
+		return {}
+
+	def prepare(self):
+		if not self.cached:
+			bump_user_version(self.tenant.user.id) #skip the response cache
+
+	def request(self):
+		return self.client.get(reverse('recipe:recipe-list'), self.params())
+
+
+class CachedListScenario(ListScenario): #The same page served from the response cache
+	cached = True
+
+
+class FilterScenario(ListScenario): #The recipes with either of the two most used tags under a price, cheapest first
+	def params(self):
+		return {'tags': ','.join(str(i) for i in self.tenant.tag_ids[:2]), 'max_price': 20, 'ordering': 'price'}
+
+
+class SearchScenario(ListScenario): #The ranked full text search
+	def params(self):
+		return {'q': 'spicy curry'}
+
+
+class RetrieveScenario(Scenario): #The detail of the recipes in turn
+	def request(self):
+		self.calls += 1
+		recipe_id = self.tenant.recipe_ids[self.calls * 7919 % len(self.tenant.recipe_ids)]
+		return self.client.get(reverse('recipe:recipe-detail', args=[recipe_id]))
+
+
+class CreateScenario(Scenario): #Create a recipe with tags and ingredients, the created recipes are deleted afterwards
+	status = 201
+
+	def __init__(self, client, tenant):
+		super().__init__(client, tenant)
+		self.created = []
+
+	def request(self):
+		self.calls += 1
+		res = self.client.post(reverse('recipe:recipe-list'), {
+			'title': 'Benchmark recipe {}'.format(self.calls),
+			'time_minutes': 30,
+			'price': '7.50',
+			'tags': self.tenant.tag_ids[:2],
+			'ingredients': self.tenant.ingredient_ids[:6],
+		}, format='json')
+		if res.status_code == self.status:
+			self.created.append(res.data['id'])
+		return res
+
+	def cleanup(self):
+		for recipe in Recipe.objects.filter(id__in=self.created):
+			recipe.delete() #one by one so the signals keep the cache versions and search vectors right
+
+
+class UploadImageScenario(Scenario): #Upload an image to the first recipe, its image is removed again afterwards
+	def __init__(self, client, tenant):
+		super().__init__(client, tenant)
+		self.image = sample_image().getvalue()
+
+	def request(self):
+		file = io.BytesIO(self.image)
+		file.name = 'benchmark.jpg'
+		return self.client.post(
+			reverse('recipe:recipe-upload-image', args=[self.tenant.recipe_ids[0]]),
+			{'image': file},
+			format='multipart'
+		)
+
+	def cleanup(self):
+		Recipe.objects.filter(id=self.tenant.recipe_ids[0]).update(image=None, renditions_ready=False) #the file stays, the next run uploads the same one
+		bump_user_version(self.tenant.user.id)
+
+
+SCENARIOS = {
+	'token': TokenScenario,
+	'list': ListScenario,
+	'list_cached': CachedListScenario,
+	'retrieve': RetrieveScenario,
+	'filter': FilterScenario,
+	'search': SearchScenario,
+	'create': CreateScenario,
+	'upload_image': UploadImageScenario,
+} #name -> Scenario, in the order they are run
+
+
+def percentile(values, fraction): #Nearest rank percentile of a sorted list
+	if not values:
+		return 0
+	return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def measure(scenario, iterations, warmup): #Run a scenario, returning its latency percentiles in ms, the most queries one request made and the peak of the memory python allocated for one request in KiB
+	for i in range(warmup):
+		scenario.prepare()
+		check_status(scenario, scenario.request())
+
+	latencies, query_counts = [], []
+	for i in range(iterations):
+		scenario.prepare()
+		with CaptureQueriesContext(connection) as queries:
+			started = time.perf_counter()
+			res = scenario.request()
+			latencies.append(time.perf_counter() - started)
+		check_status(scenario, res)
+		query_counts.append(len(queries))
+
+	scenario.prepare()
+	tracemalloc.start() #slows the request down, so it gets a run of its own
+	try:
+		check_status(scenario, scenario.request())
+		peak = tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+	latencies.sort()
+	return {
+		'iterations': iterations,
+		'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+		'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+		'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0,
+		'queries': max(query_counts, default=0),
+		'peak_memory_kib': round(peak / 1024, 1),
+	}
+
+
+def check_status(scenario, res):
+	if res.status_code != scenario.status:
+		raise AssertionError('{} returned {} instead of {}: {}'.format(type(scenario).__name__, res.status_code, scenario.status, res.content[:200]))
+
+
+def run_benchmark(tenants, endpoints, iterations, warmup): #Measure every endpoint for every tenant, returning a result dict per pair
+	results = []
+	for tenant in tenants:
+		client = APIClient()
+		client.credentials(HTTP_AUTHORIZATION='Token ' + tenant.token)
+		for name in endpoints:
+			scenario = SCENARIOS[name](client, tenant)
+			try:
+				result = measure(scenario, iterations, warmup)
+			finally:
+				scenario.cleanup()
+			results.append(dict({'tenant': tenant.recipe_count, 'endpoint': name}, **result))
+	return results
+
+
+def compare(baseline, current, max_slowdown): #Regressions of the current results against the baseline ones: any extra query, or a latency or memory peak more than max_slowdown(a fraction) above the baseline
+	previous = {(result['tenant'], result['endpoint']): result for result in baseline['results']}
+	regressions = []
+	for result in current['results']:
+		before = previous.get((result['tenant'], result['endpoint']))
+		if before is None:
+			continue
+		label = '{} recipes {}'.format(result['tenant'], result['endpoint'])
+		if result['queries'] > before['queries']:
+			regressions.append('{}: {} queries, was {}'.format(label, result['queries'], before['queries']))
+		for key in ('p50_ms', 'p99_ms', 'peak_memory_kib'):
+			if result[key] > before[key] * (1 + max_slowdown):
+				regressions.append('{}: {} {}, was {}'.format(label, key, result[key], before[key]))
+	return regressions
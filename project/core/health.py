@@ -0,0 +1,27 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+
+_migrated = set() #aliases found fully migrated, they don't go back to having unapplied migrations while the process runs
+
+
+def check_database(alias=DEFAULT_DB_ALIAS): #Make a real round trip to the db, raising django.db.utils.OperationalError(or another DatabaseError) when it can't answer
+	connection = connections[alias]
+	try:
+		with connection.cursor() as cursor:
+			cursor.execute('SELECT 1')
+			cursor.fetchone()
+	except Exception:
+		connection.close() #don't hand a broken connection to the next check
+		raise
+
+
+def unapplied_migrations(alias=DEFAULT_DB_ALIAS): #Names of the migrations not applied to the db yet, i.e ['core.0008_recipe_image_storage']. Loading the migration graph is only done until it comes back empty
+	if alias in _migrated:
+		return []
+
+	executor = MigrationExecutor(connections[alias])
+	plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+	if not plan:
+		_migrated.add(alias)
+	return ['{}.{}'.format(migration.app_label, migration.name) for migration, backwards in plan]
@@ -0,0 +1,83 @@
+import datetime
+import json
+import platform
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from core.benchmark import SCENARIOS, compare, run_benchmark, seed_tenant
+
+
+class Command(BaseCommand): #django command measuring the api endpoints in process against seeded accounts i.e python manage.py benchmark --output bench.json --baseline main.json
+	help = 'Seed benchmark users with generated recipes(once per size and seed) and measure the p50/p99 latency, query count and peak memory of every endpoint for each of them, optionally failing when the results regress from a baseline file'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--tenants', default='10,1000,100000', help='Comma separated recipe counts of the benchmark users')
+		parser.add_argument('--endpoints', default=','.join(SCENARIOS), help='Comma separated endpoints to measure, any of {}'.format(', '.join(SCENARIOS)))
+		parser.add_argument('--iterations', type=int, default=50, help='Measured requests per endpoint and user')
+		parser.add_argument('--warmup', type=int, default=5, help='Requests sent before measuring')
+		parser.add_argument('--seed', type=int, default=0, help='Seed of the generated recipes, the same seed always makes the same ones')
+		parser.add_argument('--output', help='File the results are written to as json')
+		parser.add_argument('--baseline', help='Results of an earlier run to compare with, any extra query or a slowdown over --max-slowdown is an error')
+		parser.add_argument('--max-slowdown', type=float, default=0.25, help='Fraction the latencies and memory peaks may grow over the baseline ones')
+
+	def handle(self, *args, **options):
+		try:
+			recipe_counts = [int(count) for count in options['tenants'].split(',')]
+		except ValueError:
+			raise CommandError('--tenants must be comma separated numbers')
+		endpoints = [name.strip() for name in options['endpoints'].split(',') if name.strip()]
+		unknown = set(endpoints) - set(SCENARIOS)
+		if unknown:
+			raise CommandError('Unknown endpoints: {}'.format(', '.join(sorted(unknown))))
+		if min(recipe_counts) < 1 or options['iterations'] < 1 or options['warmup'] < 0:
+			raise CommandError('--tenants and --iterations must be at least 1, --warmup at least 0')
+
+		baseline = None
+		if options['baseline']:
+			with open(options['baseline'], encoding='utf-8') as file:
+				baseline = json.load(file)
+
+		tenants = []
+		for count in recipe_counts:
+			self.stdout.write('Seeding the user with {} recipes'.format(count))
+			tenants.append(seed_tenant(count, options['seed']))
+
+		with override_settings(ALLOWED_HOSTS=settings.ALLOWED_HOSTS + ['testserver']): #the host of the requests made in process
+			results = run_benchmark(tenants, endpoints, options['iterations'], options['warmup'])
+
+		report = {
+			'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+			'seed': options['seed'],
+			'python': platform.python_version(),
+			'django': django.get_version(),
+			'database': connection.vendor,
+			'database_version': getattr(connection, 'pg_version', None), #i.e 160002 for postgres 16.2
+			'results': results,
+		}
+		self.report(results)
+		if options['output']:
+			with open(options['output'], 'w', encoding='utf-8') as file:
+				json.dump(report, file, indent=2)
+			self.stdout.write('Results written to {}'.format(options['output']))
+
+		if baseline is not None:
+			regressions = compare(baseline, report, options['max_slowdown'])
+			if regressions:
+				raise CommandError('Regressed from {}:\n{}'.format(options['baseline'], '\n'.join(regressions)))
+			self.stdout.write(self.style.SUCCESS('No regression from {}'.format(options['baseline'])))
+
+	def report(self, results):
+		self.stdout.write('{:>8} {:<14} {:>9} {:>9} {:>8} {:>11}'.format('recipes', 'endpoint', 'p50 ms', 'p99 ms', 'queries', 'peak KiB'))
+		for result in results:
+			self.stdout.write('{:>8} {:<14} {:>9.1f} {:>9.1f} {:>8} {:>11.1f}'.format(
+				result['tenant'],
+				result['endpoint'],
+				result['p50_ms'],
+				result['p99_ms'],
+				result['queries'],
+				result['peak_memory_kib']
+			))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+
+from recipe.images import create_renditions
+
+
+class Command(BaseCommand): #django command to make the missing image renditions i.e after a deploy restarted workers with renditions still queued, or when RECIPE_IMAGE_RENDITIONS changes(with --all)
+	help = 'Create the resized renditions of recipe images that do not have them yet'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--all', action='store_true', help='Recreate the renditions of every image')
+
+	def handle(self, *args, **options):
+		recipes = Recipe.objects.exclude(image='').exclude(image__isnull=True)
+		if not options['all']:
+			recipes = recipes.filter(renditions_ready=False)
+
+		count = 0
+		for recipe_id in recipes.values_list('id', flat=True).iterator():
+			create_renditions(recipe_id)
+			count += 1
+		self.stdout.write(self.style.SUCCESS('Created the renditions of {} images'.format(count)))
@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Recipe
+
+from recipe.export import CHUNK_SIZE, EXPORT_FORMATS, export_lines
+
+
+class Command(BaseCommand): #django command to export the full recipe book of a user as ndjson or csv i.e python manage.py export_recipes --user ksarthak4ever@gmail.com --format csv --output recipes.csv
+	help = 'Stream every recipe of a user with its tags and ingredients to a file or stdout'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--user', required=True, help='Email of the user to export')
+		parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='ndjson')
+		parser.add_argument('--output', help='File to write to, stdout when left out')
+		parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Recipes fetched per round trip')
+
+	def handle(self, *args, **options):
+		try:
+			user = get_user_model().objects.get(email=options['user'])
+		except get_user_model().DoesNotExist:
+			raise CommandError('No user with email {}'.format(options['user']))
+
+		lines = export_lines(Recipe.objects.for_user(user), options['format'], options['chunk_size'])
+		if options['output']:
+			with open(options['output'], 'w', newline='', encoding='utf-8') as output: #newline='' as the csv lines already end with \r\n
+				output.writelines(lines)
+		else:
+			for line in lines:
+				self.stdout.write(line, ending='')
@@ -0,0 +1,81 @@
+import json
+import os
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.importer import InvalidRecord, RecipeImporter, parse_record, read_records
+
+
+class Command(BaseCommand): #django command to load a large ndjson/csv recipe dataset into the account of a user i.e python manage.py import_recipes recipes.ndjson --user ksarthak4ever@gmail.com
+	help = 'Stream recipes with their tags and ingredients from an ndjson or csv file(the format export_recipes writes) into the db in resumable batches'
+
+	def add_arguments(self, parser):
+		parser.add_argument('path', help='File to import, - for stdin')
+		parser.add_argument('--user', required=True, help='Email of the user the recipes are imported for')
+		parser.add_argument('--format', choices=('ndjson', 'csv'), help='Defaults to the extension of the file, ndjson for stdin')
+		parser.add_argument('--batch-size', type=int, default=5000, help='Recipes loaded per transaction')
+		parser.add_argument('--checkpoint', help='File recording how many records are imported so a failed import can be resumed, defaults to <path>.checkpoint')
+		parser.add_argument('--skip-invalid', action='store_true', help='Report and skip invalid records instead of stopping')
+
+	def handle(self, *args, **options):
+		try:
+			user = get_user_model().objects.get(email=options['user'])
+		except get_user_model().DoesNotExist:
+			raise CommandError('No user with email {}'.format(options['user']))
+
+		path = options['path']
+		file_format = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+		checkpoint = options['checkpoint'] or (None if path == '-' else path + '.checkpoint')
+		done = self.read_checkpoint(checkpoint)
+		if done:
+			self.stdout.write('Resuming after {} records'.format(done))
+
+		importer = RecipeImporter(user)
+		started = time.monotonic()
+		imported = skipped = 0
+		batch = []
+		with (sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')) as file:
+			for number, raw in enumerate(read_records(file, file_format), start=1):
+				if number <= done:
+					continue
+				try:
+					batch.append(parse_record(raw, file_format))
+				except InvalidRecord as exc:
+					if not options['skip_invalid']:
+						raise CommandError('Record {}: {}'.format(number, exc))
+					self.stderr.write('Skipping record {}: {}'.format(number, exc))
+					skipped += 1
+
+				if len(batch) == options['batch_size']:
+					imported += self.load(importer, batch, number, checkpoint, started, imported)
+					batch = []
+			if batch:
+				imported += self.load(importer, batch, number, checkpoint, started, imported)
+
+		self.stdout.write(self.style.SUCCESS('Imported {} recipes, skipped {}'.format(imported, skipped)))
+		if checkpoint and os.path.exists(checkpoint):
+			os.remove(checkpoint) #finished, a new run starts from the top again
+
+	def load(self, importer, batch, number, checkpoint, started, imported): #Load a batch, record the number of the last record it covers and report the throughput
+		importer.load_batch(batch)
+		self.write_checkpoint(checkpoint, number)
+		imported += len(batch)
+		elapsed = time.monotonic() - started
+		self.stdout.write('{} recipes imported ({:.0f} rows/sec)'.format(imported, imported / elapsed if elapsed else 0))
+		return len(batch)
+
+	def read_checkpoint(self, checkpoint):
+		if not checkpoint or not os.path.exists(checkpoint):
+			return 0
+		with open(checkpoint) as file:
+			return json.load(file)['records']
+
+	def write_checkpoint(self, checkpoint, records): #Written right after the batch commits, through a rename so a crash never leaves a half written file
+		if not checkpoint:
+			return
+		with open(checkpoint + '.tmp', 'w') as file:
+			json.dump({'records': records}, file)
+		os.replace(checkpoint + '.tmp', checkpoint)
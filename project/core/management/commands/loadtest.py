@@ -0,0 +1,116 @@
+import http.client
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core.benchmark import percentile
+from core.models import Recipe, Tag
+
+from recipe.cache import bump_user_version
+from recipe.search import update_search_vectors
+
+
+LOADTEST_EMAIL = 'loadtest@example.com'
+
+
+class Command(BaseCommand): #django command to compare the throughput of running servers on the recipe list endpoint i.e python manage.py loadtest --url http://project:8000 --url http://localhost:8000
+	help = 'Send concurrent requests to the recipe list endpoint of one or more running servers and report their throughput and latency. The servers must use the same db as this command, it creates the user and recipes requested'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--url', action='append', required=True, help='Base url of a running server, repeat it to compare servers against the first one')
+		parser.add_argument('--requests', type=int, default=2000, help='Requests sent to each server')
+		parser.add_argument('--concurrency', type=int, default=16, help='Connections sending requests at the same time')
+		parser.add_argument('--warmup', type=int, default=50, help='Requests sent to each server before measuring')
+		parser.add_argument('--recipes', type=int, default=100, help='Recipes the load test user has')
+		parser.add_argument('--page-size', type=int, default=100)
+		parser.add_argument('--search', default='', help='Words sent as ?q= to load the ranked full text search instead of the plain list i.e --search "recipe 1"')
+
+	def handle(self, *args, **options):
+		if options['requests'] < 1 or options['concurrency'] < 1:
+			raise CommandError('--requests and --concurrency must be at least 1')
+
+		token = self.prepare(options['recipes'])
+		params = {'page_size': options['page_size']}
+		if options['search']:
+			params['q'] = options['search']
+		path = '{}?{}'.format(reverse('recipe:recipe-list'), urlencode(params))
+
+		results = []
+		for url in options['url']:
+			self.stdout.write('Loading {}{} with {} requests, {} at a time'.format(url, path, options['requests'], options['concurrency']))
+			self.send(url, path, token, options['warmup'], 1)
+			started = time.perf_counter()
+			latencies, errors = self.send(url, path, token, options['requests'], options['concurrency'])
+			results.append((url, time.perf_counter() - started, sorted(latencies), errors))
+		self.report(results)
+
+	def prepare(self, recipe_count): #Create the load test user with recipe_count recipes, returning its token
+		user = get_user_model().objects.filter(email=LOADTEST_EMAIL).first()
+		if user is None:
+			user = get_user_model().objects.create_user(LOADTEST_EMAIL, get_user_model().objects.make_random_password())
+		missing = recipe_count - Recipe.objects.filter(user=user).count()
+		if missing > 0:
+			tag, created = Tag.objects.get_or_create(user=user, name='Load test')
+			recipes = Recipe.objects.bulk_create(
+				Recipe(user=user, title='Recipe {}'.format(i), time_minutes=i % 120, price=i % 100)
+				for i in range(missing)
+			)
+			Recipe.tags.through.objects.bulk_create(
+				Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id) for recipe in recipes if recipe.id
+			)
+			update_search_vectors([recipe.id for recipe in recipes]) #bulk_create sends no signals
+			bump_user_version(user.id)
+		return Token.objects.get_or_create(user=user)[0].key
+
+	def send(self, url, path, token, count, concurrency): #Send count GET requests to path spread over concurrency keep-alive connections, returning the latencies of the successful ones and the number of failures
+		parts = urlsplit(url)
+		connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+		headers = {'Authorization': 'Token ' + token, 'Accept': 'application/json'}
+
+		def run(requests):
+			connection = connection_class(parts.hostname, parts.port, timeout=30)
+			latencies, errors = [], 0
+			for i in range(requests):
+				started = time.perf_counter()
+				try:
+					connection.request('GET', path, headers=headers)
+					response = connection.getresponse()
+					response.read()
+				except (OSError, http.client.HTTPException):
+					connection.close() #reconnects on the next request
+					errors += 1
+					continue
+				if response.status == 200:
+					latencies.append(time.perf_counter() - started)
+				else:
+					errors += 1
+			connection.close()
+			return latencies, errors
+
+		share, extra = divmod(count, concurrency)
+		with ThreadPoolExecutor(max_workers=concurrency) as executor:
+			results = list(executor.map(run, [share + (i < extra) for i in range(concurrency)]))
+		return [latency for latencies, errors in results for latency in latencies], sum(errors for latencies, errors in results)
+
+	def report(self, results):
+		self.stdout.write('{:<32} {:>10} {:>9} {:>9} {:>9} {:>7} {:>10}'.format('server', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors', 'vs first'))
+		baseline = None
+		for url, elapsed, latencies, errors in results:
+			throughput = len(latencies) / elapsed
+			if baseline is None:
+				baseline = throughput
+			self.stdout.write('{:<32} {:>10.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>7} {:>9.2f}x'.format(
+				url,
+				throughput,
+				percentile(latencies, 0.50) * 1000,
+				percentile(latencies, 0.95) * 1000,
+				percentile(latencies, 0.99) * 1000,
+				errors,
+				throughput / baseline if baseline else 0
+			))
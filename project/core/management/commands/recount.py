@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.stats import recount
+
+
+class Command(BaseCommand): #django command fixing the recipe counts of the tags/ingredients and the per user totals of /stats/ i.e after restoring a dump taken without the triggers or rows changed by hand
+	help = 'Recompute the recipe counts of tags and ingredients and the per user recipe, tag and ingredient counts from the rows, fixing the ones that drifted'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--users', help='Comma separated ids of the users to recount, all of them by default')
+
+	def handle(self, *args, **options):
+		user_ids = None
+		if options['users']:
+			try:
+				user_ids = [int(user_id) for user_id in options['users'].split(',')]
+			except ValueError:
+				raise CommandError('--users must be comma separated ids')
+
+		fixed = recount(user_ids)
+		self.stdout.write(self.style.SUCCESS('Fixed {} counts'.format(fixed)))
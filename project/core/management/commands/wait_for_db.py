@@ -1,22 +1,48 @@
+import random #for the jitter added to the waits, so containers started together don't retry in lockstep
 import time #default python module to make app sleep for a few seconds in between each db check
 
-from django.db import connections #to test if db connection is available
-from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand #the class we need to build on in order to create our custom command
+from django.db.utils import DatabaseError #OperationalError when the server can't be reached, other DatabaseErrors while it is still starting up
+from django.core.management.base import BaseCommand, CommandError #the class we need to build on in order to create our custom command
+
+from core.health import check_database, unapplied_migrations
 
 #https://docs.djangoproject.com/en/2.1/howto/custom-management-commands/#module-django.core.management
 
 
-class Command(BaseCommand): #django command to pause execution till database is available
+class Command(BaseCommand): #django command to pause execution till database is available, i.e answers a SELECT 1(and with --migrations has every migration applied)
+	help = 'Wait until the database answers queries, retrying with exponential backoff and jitter until --timeout'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--timeout', type=float, default=60, help='Seconds to wait in total before failing')
+		parser.add_argument('--initial-delay', type=float, default=0.1, help='Seconds to wait after the first failed attempt, doubled after every attempt')
+		parser.add_argument('--max-delay', type=float, default=5, help='Longest wait between two attempts')
+		parser.add_argument('--migrations', action='store_true', help='Also wait until every migration is applied, i.e for a service started next to the one running migrate')
+		parser.add_argument('--database', default='default')
 
 	def handle(self, *args, **options):
 		self.stdout.write('Waiting for database...') #to print out on screen during these management commands.
-		db_conn = None
-		while not db_conn: #i.e while there is no value in db_conn,try to set to db connections and if the connection is not available then django raises operational error and we raise an output and app sleeps for 1 second.This repeats till the db connection is available.
+		started = time.monotonic()
+		deadline = started + options['timeout']
+		delay = options['initial_delay']
+		attempts = 0
+		while True:
+			attempts += 1
 			try:
-				db_conn = connections['default']
-			except OperationalError:
-				self.stdout.write('Database unavailable,Waiting 1 second')
-				time.sleep(1)
+				check_database(options['database']) #a real round trip, not just getting the connection object which never opens a socket
+				pending = unapplied_migrations(options['database']) if options['migrations'] else []
+				if not pending:
+					break
+				reason = '{} unapplied migrations'.format(len(pending))
+			except DatabaseError as exc:
+				detail = str(exc).strip().splitlines()
+				reason = 'Database unavailable({})'.format(detail[0] if detail else type(exc).__name__)
+
+			remaining = deadline - time.monotonic()
+			if remaining <= 0:
+				raise CommandError('{} after {} attempts in {:.1f}s'.format(reason, attempts, time.monotonic() - started))
+			wait = min(random.uniform(delay / 2, delay), remaining) #equal jitter keeps the waits growing while spreading them
+			self.stdout.write('{},Waiting {:.2f} seconds'.format(reason, wait))
+			time.sleep(wait)
+			delay = min(delay * 2, options['max_delay'])
 
-		self.stdout.write(self.style.SUCCESS('Database available!'))
\ No newline at end of file
+		self.stdout.write(self.style.SUCCESS('Database available! ({} attempts in {:.2f}s)'.format(attempts, time.monotonic() - started)))
@@ -0,0 +1,51 @@
+import os
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+from prometheus_client import multiprocess
+
+
+# With PROMETHEUS_MULTIPROC_DIR set(before this module is imported) every worker process writes its values to files
+# in that directory and /metrics adds up the files of all the workers, see gunicorn.conf.py. Without it the values
+# are those of the process answering the scrape.
+
+REQUEST_LATENCY = Histogram(
+	'api_request_duration_seconds',
+	'Time taken to answer a request, by view',
+	('view', 'method', 'status'),
+	buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+REQUESTS_IN_FLIGHT = Gauge('api_requests_in_flight', 'Requests being answered', multiprocess_mode='livesum')
+CACHE_LOOKUPS = Counter('api_cache_lookups', 'Lookups of the response and token caches, hits / (hits + misses) is the hit ratio', ('cache', 'result'))
+DB_CONNECTIONS_OPEN = Gauge('db_connections_open', 'Db connections held by the worker threads', ('alias',), multiprocess_mode='livesum')
+DB_CONNECTIONS_OPENED = Counter('db_connections_opened', 'Db connections opened', ('alias',))
+IMAGE_QUEUE_DEPTH = Gauge('recipe_image_queue_depth', 'Uploaded images waiting for or having their renditions made by the worker pool', multiprocess_mode='livesum')
+
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+def record_cache_lookup(cache, hit):
+	CACHE_LOOKUPS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def view_name(request): #Label of the view a request went to, the class name of the DRF views(i.e RecipeViewSet) and the url name of the others
+	match = getattr(request, 'resolver_match', None)
+	if match is None:
+		return 'unmatched'
+	view_class = getattr(match.func, 'cls', None) #set by APIView.as_view()
+	return view_class.__name__ if view_class is not None else match.view_name
+
+
+def method_label(method): #The method of a request, without letting clients add labels by making up methods
+	return method if method in METHODS else 'other'
+
+
+def metrics_registry():
+	if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+		return REGISTRY
+	registry = CollectorRegistry()
+	multiprocess.MultiProcessCollector(registry)
+	return registry
+
+
+def latest_metrics(): #The metrics in the prometheus text format
+	return generate_latest(metrics_registry())
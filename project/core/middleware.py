@@ -0,0 +1,179 @@
+import json
+import logging
+import random
+import re
+import time
+from contextlib import ExitStack
+
+import brotli
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+from core.metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT, method_label, view_name
+from core.timing import current_timings, start_timings, stop_timings
+
+
+logger = logging.getLogger(__name__)
+
+
+re_coding = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?') #a coding of Accept-Encoding with its optional weight i.e br;q=0.8
+
+
+def accepted_encodings(header): #Content codings an Accept-Encoding header allows, leaving out the ones it refuses with q=0
+	accepted = set()
+	for part in header.split(','):
+		match = re_coding.match(part)
+		if match:
+			try:
+				weight = float(match.group(2) or 1)
+			except ValueError:
+				continue
+			if weight > 0:
+				accepted.add(match.group(1).lower())
+	return accepted
+
+
+def brotli_string(content):
+	return brotli.compress(content, quality=settings.RESPONSE_BROTLI_QUALITY)
+
+
+def brotli_sequence(sequence):
+	compressor = brotli.Compressor(quality=settings.RESPONSE_BROTLI_QUALITY)
+	for item in sequence:
+		data = compressor.process(item)
+		if data:
+			yield data
+	yield compressor.finish()
+
+
+COMPRESSORS = {
+	'br': (brotli_string, brotli_sequence),
+	'gzip': (compress_string, compress_sequence),
+}
+
+
+class CompressionMiddleware: #Brotli or gzip compression of the responses, like django's GZipMiddleware with br and a size threshold
+	'''Compresses the responses of at least RESPONSE_COMPRESSION_MIN_BYTES(streamed ones always) with the first coding
+	of RESPONSE_COMPRESSION the client's Accept-Encoding allows.Turned off when RESPONSE_COMPRESSION is empty.'''
+
+	def __init__(self, get_response):
+		self.get_response = get_response
+		self.encodings = [coding.strip() for coding in settings.RESPONSE_COMPRESSION.split(',') if coding.strip()]
+		if not self.encodings:
+			raise MiddlewareNotUsed
+		unknown = set(self.encodings) - set(COMPRESSORS)
+		if unknown:
+			raise ImproperlyConfigured('RESPONSE_COMPRESSION can only name {}, not {}'.format(', '.join(COMPRESSORS), ', '.join(sorted(unknown))))
+
+	def __call__(self, request):
+		response = self.get_response(request)
+
+		if not response.streaming and len(response.content) < settings.RESPONSE_COMPRESSION_MIN_BYTES:
+			return response
+		if response.has_header('Content-Encoding'):
+			return response
+
+		patch_vary_headers(response, ('Accept-Encoding',))
+
+		accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+		encoding = next((coding for coding in self.encodings if coding in accepted), None)
+		if encoding is None:
+			return response
+
+		compress_content, compress_stream = COMPRESSORS[encoding]
+		if response.streaming:
+			response.streaming_content = compress_stream(response.streaming_content)
+			del response['Content-Length'] #unknown until it has all been streamed
+		else:
+			compressed = compress_content(response.content)
+			if len(compressed) >= len(response.content):
+				return response
+			response.content = compressed
+			response['Content-Length'] = str(len(compressed))
+
+		# Like GZipMiddleware, weaken a strong ETag as the bytes differ from the uncompressed ones. CachedListMixin
+		# still finds the etag it issued inside the W/"..." a client sends back.
+		etag = response.get('ETag')
+		if etag and etag.startswith('"'):
+			response['ETag'] = 'W/' + etag
+		response['Content-Encoding'] = encoding
+		return response
+
+
+class RequestTimingMiddleware: #Time the db, auth, serialize and render phases of a sample of the requests, sent back as a Server-Timing header and logged as a json line
+	'''Every query run by the request thread goes through an execute wrapper counting it, its time and its shape(the
+	sql without the values), a request running one shape more than REQUEST_TIMING_REPEATED_QUERIES times is
+	logged as a warning, which is how N+1 queries show up.Auth and serialize are timed by core.timing.timed()
+	blocks in the authentication and serializer classes, render from the start of the template response hooks
+	to the end of the rendering.The phases overlap(the queries of the auth are also db time) and the queries
+	of a streamed response run after it's logged.Only REQUEST_TIMING_SAMPLE_RATE of the requests are timed,
+	the others go straight through.'''
+
+	def __init__(self, get_response):
+		self.get_response = get_response
+		if not settings.REQUEST_TIMING_SAMPLE_RATE:
+			raise MiddlewareNotUsed
+
+	def __call__(self, request):
+		if random.random() >= settings.REQUEST_TIMING_SAMPLE_RATE:
+			return self.get_response(request)
+
+		timings = start_timings()
+		try:
+			with ExitStack() as stack:
+				for connection in connections.all():
+					stack.enter_context(connection.execute_wrapper(timings.record_query))
+				response = self.get_response(request)
+		finally:
+			stop_timings()
+		timings.finish()
+
+		response['Server-Timing'] = self.server_timing(timings)
+		self.log(request, response, timings)
+		return response
+
+	def process_template_response(self, request, response): #Called right before a DRF Response is rendered
+		timings = current_timings()
+		if timings is not None:
+			timings.start('render')
+			response.add_post_render_callback(lambda response: timings.stop('render'))
+		return response
+
+	def server_timing(self, timings): #i.e db;dur=4.1;desc="3 queries", serialize;dur=2.0, render;dur=0.6, total;dur=9.8
+		metrics = ['db;dur={:.1f};desc="{} queries"'.format(timings.phases.get('db', 0) * 1000, sum(timings.queries.values()))]
+		metrics.extend('{};dur={:.1f}'.format(name, timings.phases[name] * 1000) for name in ('auth', 'serialize', 'render') if name in timings.phases)
+		metrics.append('total;dur={:.1f}'.format(timings.duration * 1000))
+		return ', '.join(metrics)
+
+	def log(self, request, response, timings):
+		repeated = timings.repeated_queries(settings.REQUEST_TIMING_REPEATED_QUERIES)
+		line = {
+			'method': request.method,
+			'path': request.path,
+			'status': response.status_code,
+			'total_ms': round(timings.duration * 1000, 2),
+			'queries': sum(timings.queries.values()),
+		}
+		line.update(('{}_ms'.format(name), round(seconds * 1000, 2)) for name, seconds in sorted(timings.phases.items()))
+		if repeated:
+			line['repeated_queries'] = [{'sql': shape, 'count': count} for shape, count in repeated]
+		logger.log(logging.WARNING if repeated else logging.INFO, json.dumps(line))
+
+
+class MetricsMiddleware: #Latency histogram per view and gauge of the requests in flight served by /metrics
+	def __init__(self, get_response):
+		self.get_response = get_response
+
+	def __call__(self, request):
+		REQUESTS_IN_FLIGHT.inc()
+		started = time.perf_counter()
+		try:
+			response = self.get_response(request)
+		finally:
+			REQUESTS_IN_FLIGHT.dec()
+		REQUEST_LATENCY.labels(view_name(request), method_label(request.method), response.status_code).observe(time.perf_counter() - started)
+		return response
@@ -0,0 +1,18 @@
+# Generated by Django 2.1.15 on 2026-10-18 08:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='renditions_ready',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 2.1.15 on 2026-10-18 08:43
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, TextField
+
+
+# The search document as recipe.search.search_document() made it at the time of this migration, frozen here.
+def joined_names(relation):
+    field = relation.field
+    recipe_column = '{}_id'.format(field.m2m_field_name())
+    return Subquery(
+        relation.through.objects.filter(**{recipe_column: OuterRef('pk')}).values(recipe_column).annotate(
+            names=StringAgg('{}__name'.format(field.m2m_reverse_field_name()), ' ')
+        ).values('names'),
+        output_field=TextField()
+    )
+
+
+def fill_search_vectors(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    config = settings.RECIPE_SEARCH_CONFIG
+    Recipe.objects.using(schema_editor.connection.alias).update(search_vector=(
+        SearchVector('title', weight='A', config=config) +
+        SearchVector(joined_names(Recipe.tags), weight='B', config=config) +
+        SearchVector(joined_names(Recipe.ingredients), weight='C', config=config)
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_image_storage'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_recipe_search_idx'),
+        ),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+        # Trigram indexes for the autocomplete on the tag and ingredient names, django 2.1 indexes can't be given
+        # an operator class.
+        migrations.RunSQL(
+            ['CREATE INDEX core_tag_name_trgm_idx ON core_tag USING gin (name gin_trgm_ops);'],
+            reverse_sql=['DROP INDEX core_tag_name_trgm_idx;'],
+        ),
+        migrations.RunSQL(
+            ['CREATE INDEX core_ingr_name_trgm_idx ON core_ingredient USING gin (name gin_trgm_ops);'],
+            reverse_sql=['DROP INDEX core_ingr_name_trgm_idx;'],
+        ),
+    ]
@@ -0,0 +1,181 @@
+# Generated by Django 2.1.15 on 2026-10-18 09:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Statement level triggers keeping Tag/Ingredient.recipe_count and UserStats up to date from the rows each
+# INSERT/COPY/DELETE changed(its transition table), so the bulk endpoints, the COPY import and the cascades of a
+# delete are counted as well as the ORM's saves and m2m changes.The rows to update are locked in id order first so
+# concurrent writers can't deadlock.Links and rows are never moved to another recipe/user by an UPDATE, so only
+# inserts and deletes are counted.
+COUNT_LINKS_SQL = """
+CREATE FUNCTION core_count_links() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    counted text := TG_ARGV[0];
+    link_column text := TG_ARGV[1];
+BEGIN
+    EXECUTE format(
+        'SELECT count(*) FROM (SELECT 1 FROM %1$I WHERE id IN (SELECT %2$I FROM changed_links) ORDER BY id FOR NO KEY UPDATE) AS locked',
+        counted, link_column
+    );
+    EXECUTE format(
+        'UPDATE %1$I AS counted SET recipe_count = counted.recipe_count %3$s changed.links '
+        'FROM (SELECT %2$I AS id, count(*) AS links FROM changed_links GROUP BY %2$I) AS changed '
+        'WHERE counted.id = changed.id',
+        counted, link_column, CASE TG_OP WHEN 'INSERT' THEN '+' ELSE '-' END
+    );
+    RETURN NULL;
+END
+$$;
+"""
+
+COUNT_USER_ROWS_SQL = """
+CREATE FUNCTION core_count_user_rows() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    counted text := TG_ARGV[0];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        EXECUTE format(
+            'INSERT INTO core_userstats AS stats (user_id, %1$I) '
+            'SELECT user_id, count(*) FROM changed_rows GROUP BY user_id ORDER BY user_id '
+            'ON CONFLICT (user_id) DO UPDATE SET %1$I = stats.%1$I + EXCLUDED.%1$I',
+            counted
+        );
+    ELSE
+        -- an UPDATE only, the stats of a user being deleted may already be gone
+        EXECUTE format(
+            'UPDATE core_userstats AS stats SET %1$I = stats.%1$I - changed.row_count '
+            'FROM (SELECT user_id, count(*) AS row_count FROM changed_rows GROUP BY user_id ORDER BY user_id) AS changed '
+            'WHERE stats.user_id = changed.user_id',
+            counted
+        );
+    END IF;
+    RETURN NULL;
+END
+$$;
+"""
+
+LINK_TRIGGERS = (
+    ('core_recipe_tags', 'core_tag', 'tag_id'),
+    ('core_recipe_ingredients', 'core_ingredient', 'ingredient_id'),
+)
+USER_ROW_TRIGGERS = (
+    ('core_recipe', 'recipe_count'),
+    ('core_tag', 'tag_count'),
+    ('core_ingredient', 'ingredient_count'),
+)
+
+
+# Django applies the defaults in python only, the counts also need them in the db for the COPY of import_recipes
+# and the triggers, which leave them out.
+COUNT_COLUMNS = (
+    ('core_tag', 'recipe_count'),
+    ('core_ingredient', 'recipe_count'),
+    ('core_userstats', 'recipe_count'),
+    ('core_userstats', 'tag_count'),
+    ('core_userstats', 'ingredient_count'),
+)
+
+
+def create_triggers():
+    statements = ['ALTER TABLE {} ALTER COLUMN {} SET DEFAULT 0;'.format(*column) for column in COUNT_COLUMNS]
+    statements += [COUNT_LINKS_SQL, COUNT_USER_ROWS_SQL]
+    for table, counted, column in LINK_TRIGGERS:
+        for event, transition in (('INSERT', 'NEW'), ('DELETE', 'OLD')):
+            statements.append(
+                "CREATE TRIGGER {table}_count_{lower} AFTER {event} ON {table} REFERENCING {transition} TABLE AS changed_links "
+                "FOR EACH STATEMENT EXECUTE PROCEDURE core_count_links('{counted}', '{column}');".format(
+                    table=table, lower=event.lower(), event=event, transition=transition, counted=counted, column=column
+                )
+            )
+    for table, counted in USER_ROW_TRIGGERS:
+        for event, transition in (('INSERT', 'NEW'), ('DELETE', 'OLD')):
+            statements.append(
+                "CREATE TRIGGER {table}_count_{lower} AFTER {event} ON {table} REFERENCING {transition} TABLE AS changed_rows "
+                "FOR EACH STATEMENT EXECUTE PROCEDURE core_count_user_rows('{counted}');".format(
+                    table=table, lower=event.lower(), event=event, transition=transition, counted=counted
+                )
+            )
+    return statements
+
+
+def drop_triggers():
+    statements = []
+    for table in [table for table, *_ in LINK_TRIGGERS] + [table for table, _ in USER_ROW_TRIGGERS]:
+        for event in ('insert', 'delete'):
+            statements.append('DROP TRIGGER {table}_count_{event} ON {table};'.format(table=table, event=event))
+    statements += ['DROP FUNCTION core_count_links();', 'DROP FUNCTION core_count_user_rows();']
+    return statements + ['ALTER TABLE {} ALTER COLUMN {} DROP DEFAULT;'.format(*column) for column in COUNT_COLUMNS]
+
+
+# The counts of the rows that existed before the triggers, the same as recipe.stats.recount() at the time of this
+# migration but frozen here.
+FILL_RECIPE_COUNTS_SQL = """
+UPDATE {table} AS counted SET recipe_count = actual.recipe_count
+FROM (
+    SELECT link.{column} AS id, count(*) AS recipe_count FROM {links} AS link GROUP BY link.{column}
+) AS actual
+WHERE counted.id = actual.id
+"""
+
+FILL_USER_STATS_SQL = """
+INSERT INTO core_userstats (user_id, recipe_count, tag_count, ingredient_count)
+SELECT
+    counted.id,
+    (SELECT count(*) FROM core_recipe WHERE user_id = counted.id),
+    (SELECT count(*) FROM core_tag WHERE user_id = counted.id),
+    (SELECT count(*) FROM core_ingredient WHERE user_id = counted.id)
+FROM core_user AS counted
+ON CONFLICT (user_id) DO UPDATE SET
+    recipe_count = EXCLUDED.recipe_count,
+    tag_count = EXCLUDED.tag_count,
+    ingredient_count = EXCLUDED.ingredient_count
+"""
+
+
+def fill_counts(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for links, table, column in LINK_TRIGGERS:
+            cursor.execute(FILL_RECIPE_COUNTS_SQL.format(table=table, links=links, column=column))
+        cursor.execute(FILL_USER_STATS_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recipe_range_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipe_count', models.IntegerField(default=0)),
+                ('tag_count', models.IntegerField(default=0)),
+                ('ingredient_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', '-recipe_count', 'id'], name='core_ingr_user_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-recipe_count', 'id'], name='core_tag_user_count_idx'),
+        ),
+        migrations.RunSQL(create_triggers(), reverse_sql=drop_triggers()),
+        migrations.RunPython(fill_counts, migrations.RunPython.noop),
+    ]
@@ -2,14 +2,22 @@ import uuid #python uuid package to give each uploaded image a unique name/id
 import os #as using os.path to provide a valid path for our file destination
 
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.conf import settings #as we want to use AUTH_USER_MODEL to apply foreign key.https://docs.djangoproject.com/en/2.1/ref/models/fields/#django.db.models.ForeignKey
 
+from core.storage import ContentAddressedStorage, content_hash
 
-def recipe_image_file_path(instance, filename): #Generate file path for new recipe image
+
+def recipe_image_file_path(instance, filename): #Generate file path for new recipe image, named after the hash of its contents so identical uploads are stored once
 	
 	ext = filename.split('.')[-1] #stripping the extension part of the filename and storing it in variable ext
-	filename = f'{uuid.uuid4()}.{ext}'
+	image = getattr(instance, 'image', None)
+	if image:
+		filename = f'{content_hash(image.file)}.{ext.lower()}'
+	else:
+		filename = f'{uuid.uuid4()}.{ext}' #no contents to hash
 
 	return os.path.join('uploads/recipe/', filename)
 
@@ -45,28 +53,92 @@ class User(AbstractBaseUser, PermissionsMixin): #custom user model that supports
 	USERNAME_FIELD = 'email' #so we can use email as a field to login
 
 
-class Tag(models.Model): # Tag to be used for a recipe
+class UserStats(models.Model): #How many recipes, tags and ingredients a user has.Kept up to date by the triggers of migration 0011 and fixed by the recount command, never saved from python
+	user = models.OneToOneField(
+		settings.AUTH_USER_MODEL,
+		on_delete=models.CASCADE,
+		primary_key=True,
+		related_name='stats'
+	)
+	recipe_count = models.IntegerField(default=0)
+	tag_count = models.IntegerField(default=0)
+	ingredient_count = models.IntegerField(default=0)
+
+
+class RecipeCountMixin: #Keeps saving a loaded tag/ingredient from writing its recipe_count back, the copy in memory goes stale as soon as a recipe is linked or unlinked
+
+	def save(self, *args, **kwargs):
+		if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+			kwargs['update_fields'] = [
+				field.name for field in self._meta.concrete_fields
+				if not field.primary_key and field.name != 'recipe_count'
+			]
+		super().save(*args, **kwargs)
+
+
+class Tag(RecipeCountMixin, models.Model): # Tag to be used for a recipe
 	name = models.CharField(max_length=255)
 	user = models.ForeignKey(
 		settings.AUTH_USER_MODEL,
 		on_delete = models.CASCADE, #as when we delete the user we delete the tags as well
 	) #assigning foreign key to the User object.
+	recipe_count = models.IntegerField(default=0, editable=False) #recipes linked to the tag, kept up to date by the triggers of migration 0011
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['user', '-name', 'id'], name='core_tag_user_name_idx'),
+			models.Index(fields=['user', '-recipe_count', 'id'], name='core_tag_user_count_idx'),
+		] #matches the per user lookup and the (-name, id) ordering of the tags list so the page is read straight from the index without sorting, the count one is read for the most used tags of /stats/
 
 	def __str__(self): #using dunder method to add string rep of the model
 		return self.name
 
 
-class Ingredient(models.Model): #Ingredient to be used in a recipe
+class Ingredient(RecipeCountMixin, models.Model): #Ingredient to be used in a recipe
 	name = models.CharField(max_length=255)
 	user = models.ForeignKey(
 		settings.AUTH_USER_MODEL,
 		on_delete=models.CASCADE
 	)
+	recipe_count = models.IntegerField(default=0, editable=False)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['user', '-name', 'id'], name='core_ingr_user_name_idx'),
+			models.Index(fields=['user', '-recipe_count', 'id'], name='core_ingr_user_count_idx'),
+		] #same access pattern as Tag
 
 	def __str__(self):
 		return self.name
 
 
+class RecipeQuerySet(models.QuerySet): #Queryset layer for recipes so every view picks the prefetch plan that matches how its recipes get serialized instead of hitting the db once per recipe for tags and ingredients
+
+	def for_user(self, user): #Recipes owned by the given user
+		return self.filter(user=user)
+
+	def with_related_ids(self, relations=('ingredients', 'tags')): #Prefetch only the ids of the related tags and ingredients, which is all the PrimaryKeyRelatedField's in RecipeSerializer need.Costs one extra query per relation in total no matter how many recipes are listed
+		return self.prefetch_related(*(
+			models.Prefetch(name, queryset=self._related_model(name).objects.only('id').order_by('id'))
+			for name in relations
+		))
+
+	def with_related_objects(self, relations=('ingredients', 'tags')): #Prefetch the full tag and ingredient rows for the nested serializers of the expanded relations
+		return self.prefetch_related(*(
+			models.Prefetch(name, queryset=self._related_model(name).objects.order_by('id'))
+			for name in relations
+		))
+
+	def _related_model(self, name): #the related objects come in id order so a recipe always lists them the same way(as recipe.fastpath does)
+		return self.model._meta.get_field(name).related_model
+
+
+class RecipeManager(models.Manager.from_queryset(RecipeQuerySet)): #Leaves Recipe.search_vector out of every query, nothing reads it back and saving a loaded recipe then doesn't write a stale copy of it over the one recipe.search keeps up to date
+
+	def get_queryset(self):
+		return super().get_queryset().defer('search_vector')
+
+
 class Recipe(models.Model): #Recipe model/object
 	user = models.ForeignKey(
 			settings.AUTH_USER_MODEL,
@@ -78,7 +150,19 @@ class Recipe(models.Model): #Recipe model/object
 	link = models.CharField(max_length=255, blank=True)
 	ingredients = models.ManyToManyField('Ingredient')
 	tags = models.ManyToManyField('Tag') #using ManyToManyField as many recipes can have many tags and ingredients. ManyToManyField is like ForeignKey.#Note- Placed the name of class/model Tag in string i.e '' if we dont do this then we need to make sure that model/class is above our current class/model which can turn tricky once we have too many models.
-	image = models.ImageField(null=True, upload_to=recipe_image_file_path) # passing reference to the function so it can be called every time we upload in the background.
+	image = models.ImageField(null=True, upload_to=recipe_image_file_path, storage=ContentAddressedStorage()) # passing reference to the function so it can be called every time we upload in the background.
+	renditions_ready = models.BooleanField(default=False) #set by recipe.images.create_renditions once the resized copies of image exist
+	search_vector = SearchVectorField(null=True, editable=False) #weighted title, tag and ingredient names for the ?q= search, kept up to date by recipe.search.update_search_vectors
+
+	objects = RecipeManager() #so the queryset helpers are available as Recipe.objects.with_related_ids() etc.
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['user', '-id'], name='core_recipe_user_id_idx'),
+			models.Index(fields=['user', 'time_minutes', 'id', 'price'], name='core_recipe_user_time_idx'),
+			models.Index(fields=['user', 'price', 'id', 'time_minutes'], name='core_recipe_user_price_idx'),
+			GinIndex(fields=['search_vector'], name='core_recipe_search_idx'),
+		] #per user lookup in the (-id) order of the recipes list, in the ?ordering=time_minutes/price orders(read backwards for descending, the trailing column checks the other range filter without visiting the table) and the full text search.The m2m through tables get their reverse lookup indexes in migration 0006, the tag and ingredient names their trigram indexes in 0009
 
 	def __str__(self) :
 		return self.title
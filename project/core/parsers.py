@@ -0,0 +1,36 @@
+import io
+
+import msgpack
+import orjson
+
+from django.conf import settings
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+
+class FastJSONParser(JSONParser): #JSONParser decoding utf-8 bodies with orjson
+	'''A body orjson rejects is handed to JSONParser, which accepts what orjson doesn't(integers over 64 bits,
+	other charsets) and raises the usual 400 for what is actually malformed.'''
+
+	def parse(self, stream, media_type=None, parser_context=None):
+		parser_context = parser_context or {}
+		encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+		if encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+			return super().parse(stream, media_type, parser_context)
+
+		body = stream.read()
+		try:
+			return orjson.loads(body)
+		except ValueError: #orjson.JSONDecodeError
+			return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+class MessagePackParser(BaseParser): #application/msgpack request bodies
+	media_type = 'application/msgpack'
+
+	def parse(self, stream, media_type=None, parser_context=None):
+		try:
+			return msgpack.unpackb(stream.read(), raw=False)
+		except (ValueError, TypeError) as exc: #malformed or truncated, extra bytes, invalid utf-8, a map key that isn't a string
+			raise ParseError('MessagePack parse error - {}'.format(exc))
@@ -0,0 +1,51 @@
+import msgpack
+import orjson
+
+from rest_framework.utils import encoders
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+LINE_SEPARATOR = '\u2028'.encode('utf-8')
+PARAGRAPH_SEPARATOR = '\u2029'.encode('utf-8')
+
+
+class FastJSONRenderer(JSONRenderer): #JSONRenderer encoding with orjson, writing the same bytes as DRF's for the compact utf-8 json the api sends by default
+	'''Falls back to JSONRenderer for what orjson can't write the same way: indented json(the browsable api, or a
+	client asking for application/json; indent=4), COMPACT_JSON/UNICODE_JSON turned off, and data orjson refuses
+	like integers over 64 bits or non string keys.Dates and times, which orjson formats differently, and the types
+	it doesn't know go through DRF's encoder.NaN and infinite floats come out as null where DRF raises in its
+	default STRICT_JSON mode.'''
+
+	options = orjson.OPT_PASSTHROUGH_DATETIME
+
+	def render(self, data, accepted_media_type=None, renderer_context=None):
+		if data is None:
+			return b''
+		if not self.compact or self.ensure_ascii or self.get_indent(accepted_media_type, renderer_context or {}):
+			return super().render(data, accepted_media_type, renderer_context)
+
+		try:
+			ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+		except TypeError: #orjson.JSONEncodeError
+			return super().render(data, accepted_media_type, renderer_context)
+
+		# Like JSONRenderer, escape the two characters that are valid json but end lines in javascript.
+		if LINE_SEPARATOR in ret or PARAGRAPH_SEPARATOR in ret:
+			ret = ret.replace(LINE_SEPARATOR, b'\\u2028').replace(PARAGRAPH_SEPARATOR, b'\\u2029')
+		return ret
+
+
+class MessagePackRenderer(BaseRenderer): #application/msgpack, for clients asking for it in their Accept header or with ?format=msgpack
+	'''Writes the same data as the json renderers, the types MessagePack has no type for(dates, decimals, uuids,
+	lazy strings...) converted by DRF's json encoder so a client gets the same values whichever format it picks.'''
+
+	media_type = 'application/msgpack'
+	format = 'msgpack'
+	charset = None
+	render_style = 'binary'
+	encoder_class = encoders.JSONEncoder
+
+	def render(self, data, accepted_media_type=None, renderer_context=None):
+		if data is None:
+			return b''
+		return msgpack.packb(data, default=self.encoder_class().default, use_bin_type=True)
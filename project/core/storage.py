@@ -0,0 +1,35 @@
+import hashlib
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def content_hash(file): #sha256 hex digest of the contents of a file, the one recipe.uploads computed while streaming the upload if there is one
+	digest = getattr(file, 'content_hash', None)
+	if digest:
+		return digest
+
+	sha256 = hashlib.sha256()
+	for chunk in file.chunks():
+		sha256.update(chunk)
+	file.seek(0)
+	return sha256.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage): #File system storage for files named after the hash of their contents, saving a name that exists already keeps the stored file instead of writing a copy under a new name
+	'''Identical uploads end up as one file shared by every row naming it, so deleting the file of one row removes it
+	for the others too. Nothing in the API deletes images, only replaces them.'''
+
+	def save(self, name, content, max_length=None):
+		if name is not None and self.exists(name):
+			return name
+		try:
+			return super().save(name, content, max_length=max_length)
+		except FileExistsError:
+			return name #an identical upload was saved between the exists() check and ours
+
+	def get_available_name(self, name, max_length=None): #The name is the identity of the contents, never make a differently named copy
+		if self.exists(name):
+			raise FileExistsError(name)
+		return super().get_available_name(name, max_length=max_length)
@@ -0,0 +1,40 @@
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test.utils import CaptureQueriesContext #records every query run on a connection while inside the with block
+
+
+def run_on_commit_callbacks(using=DEFAULT_DB_ALIAS): #Run the transaction.on_commit callbacks waiting for the transaction of a TestCase to commit, which it never does, as if the writes so far had been committed.Django 2.1 has no TestCase.captureOnCommitCallbacks(3.2)
+	db = connections[using]
+	callbacks, db.run_on_commit = db.run_on_commit, []
+	for _, callback in callbacks:
+		callback()
+
+
+def page_links(res): #Parse the Link header of a paginated response into a dict of rel -> url
+	return {
+		rel: url for url, rel in re.findall(r'<([^>]+)>; rel="(\w+)"', res.get('Link', ''))
+	}
+
+
+class QueryCountAssertionsMixin: #Mixin for API tests that need to prove an endpoint does a fixed number of queries no matter how many rows it returns i.e catches N+1 queries before they reach production
+
+	def assertQueryCountConstant(self, make_request, add_rows, row_counts=(1, 5, 10)): #Grow the dataset to each size in row_counts by calling add_rows(number_of_new_rows), call make_request() and fail if the number of queries changes between the sizes
+		query_counts = []
+		created = 0
+		for row_count in row_counts:
+			add_rows(row_count - created)
+			run_on_commit_callbacks() #the new rows invalidate the cached responses once committed
+			created = row_count
+			with CaptureQueriesContext(connection) as queries:
+				res = make_request()
+			self.assertLess(res.status_code, 400) #a failing request can run fewer queries and hide the problem
+			query_counts.append(len(queries))
+
+		self.assertEqual(
+			len(set(query_counts)), 1,
+			'Query count grows with the number of rows: {}'.format(
+				dict(zip(row_counts, query_counts))
+			)
+		)
+		return query_counts[0]
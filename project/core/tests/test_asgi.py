@@ -0,0 +1,139 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core.asgi import PooledWsgiToAsgi
+from core.models import Recipe, Tag
+
+
+TAGS_URL = reverse('recipe:tag-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class AsgiClient: #Sends requests straight to an ASGI application and collects the messages it sends back
+
+	def __init__(self, app, token):
+		self.app = app
+		self.token = token
+
+	def scope(self, method, path, headers):
+		return {
+			'type': 'http',
+			'http_version': '1.1',
+			'method': method,
+			'path': path,
+			'query_string': b'',
+			'server': ('testserver', 80),
+			'headers': [(b'host', b'testserver'), (b'authorization', 'Token {}'.format(self.token).encode())] + headers,
+		}
+
+	async def request(self, method, path, chunks=(b'',), headers=(), send=None):
+		received = [{'type': 'http.request', 'body': chunk, 'more_body': i < len(chunks) - 1} for i, chunk in enumerate(chunks)]
+		sent = []
+
+		async def receive():
+			return received.pop(0)
+
+		async def collect(message):
+			sent.append(message)
+			if send is not None:
+				await send(message)
+
+		await self.app(self.scope(method, path, list(headers)), receive, collect)
+		return sent
+
+
+def status_and_body(sent):
+	return sent[0]['status'], b''.join(message.get('body', b'') for message in sent[1:])
+
+
+class PooledWsgiToAsgiTests(TransactionTestCase): #Test the ASGI adapter of project/asgi.py, the views run in threads with their own db connections so the data has to be committed
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_user('ksarthak4ever@gmail.com', 'randompassword')
+		self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='asgi')
+		self.client = AsgiClient(PooledWsgiToAsgi(get_wsgi_application(), self.executor), Token.objects.create(user=self.user).key)
+		self.loop = asyncio.new_event_loop()
+
+	def tearDown(self):
+		self.executor.submit(connections.close_all).result() #the pool thread's connection would keep the test db from being dropped
+		self.executor.shutdown()
+		self.loop.close()
+
+	def run_request(self, *args, **kwargs):
+		return self.loop.run_until_complete(self.client.request(*args, **kwargs))
+
+	def test_create_and_list(self):
+		sent = self.run_request('POST', TAGS_URL, chunks=(b'{"name": ', b'"Vegan"}'), headers=[
+			(b'content-type', b'application/json'),
+			(b'content-length', b'17'),
+		]) #the body arrives in two parts
+		self.assertEqual(status_and_body(sent)[0], 201)
+
+		status, body = status_and_body(self.run_request('GET', TAGS_URL))
+
+		self.assertEqual(status, 200)
+		self.assertEqual([tag['name'] for tag in json.loads(body)], ['Vegan'])
+		self.assertTrue(Tag.objects.filter(user=self.user, name='Vegan').exists())
+
+	def test_slow_client_holds_no_thread(self): #Test a response waiting on a slow client leaves the only pool thread free for the next request
+		client_ready = asyncio.Event(loop=self.loop)
+
+		async def slow_send(message):
+			if message['type'] == 'http.response.body':
+				await client_ready.wait()
+
+		async def requests():
+			slow = asyncio.ensure_future(self.client.request('GET', TAGS_URL, send=slow_send))
+			fast = await asyncio.wait_for(self.client.request('GET', TAGS_URL), 10)
+			client_ready.set()
+			return await slow, fast
+
+		slow, fast = self.loop.run_until_complete(requests())
+
+		self.assertEqual(status_and_body(fast)[0], 200)
+		self.assertEqual(status_and_body(slow)[0], 200)
+
+	def test_request_finished_in_pool_thread(self): #Test request_finished is sent from the thread that ran the view, it closes the old db connections of that thread
+		threads = []
+
+		def finished(**kwargs):
+			threads.append(threading.current_thread().name)
+		request_finished.connect(finished)
+		try:
+			self.run_request('GET', TAGS_URL)
+		finally:
+			request_finished.disconnect(finished)
+
+		self.assertEqual(len(threads), 1)
+		self.assertTrue(threads[0].startswith('asgi'))
+
+	def test_streamed_response(self): #Test the export is sent in parts as it is made
+		for i in range(3):
+			Recipe.objects.create(user=self.user, title='Recipe {}'.format(i), time_minutes=10, price=5.00)
+
+		sent = self.run_request('GET', EXPORT_URL)
+		status, body = status_and_body(sent)
+
+		self.assertEqual(status, 200)
+		self.assertGreater(len(sent), 2)
+		self.assertEqual(len(body.decode().splitlines()), 3)
+
+	@override_settings(ASGI_MAX_BODY_BYTES=10)
+	def test_body_too_large(self): #Test a body over ASGI_MAX_BODY_BYTES is refused, by its content-length or once too much of it arrived
+		sent = self.run_request('POST', TAGS_URL, headers=[(b'content-length', b'20')])
+		self.assertEqual(status_and_body(sent), (413, b''))
+
+		sent = self.run_request('POST', TAGS_URL, chunks=(b'{"name": ', b'"Vegetarian"}'))
+		self.assertEqual(status_and_body(sent), (413, b''))
+		self.assertFalse(Tag.objects.exists())
@@ -10,24 +10,235 @@ we put in docker-compose file and that will ensure that the database is up and r
 
 # Here using Mocking 
 
+import json
+import os
+import tempfile
+from io import StringIO #to capture what a command writes to stdout
 from unittest.mock import patch #it will help mock the behavior of django get database function using which we can simulate the database being available and not being available for when we test our command.
 
 from django.core.management import call_command #allows us to call the command in our source code
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError #Operational error django throws when db is unavailable. Using this error to simulate the db being available or not when we run our command
-from django.test import TestCase
+from django.test import TestCase, LiveServerTestCase
+from django.contrib.auth import get_user_model
+
+from core.benchmark import SCENARIOS, Scenario, generate_recipes, seed_tenant, tenant_email
+from core.models import Recipe, Tag, Ingredient
 
 
 class CommandTests(TestCase): 
 
-	def test_wait_for_db_ready(self): #Test wait for db when db is available. Here management command is gonna try and retrieve db connection from django, and check when we do so if it retrieves an Operational Error or not.If it does end up retrieving Operational Error then that means db is not available otherwise db is available and command will continue.
-		with patch('django.db.utils.ConnectionHandler.__getitem__') as gi: #using patch to mark the connection handler to just return true everytime it's called.Therefore our call command or management command should just continue.Here overriding behavior of ConnectionHandler to do so.
-			gi.return_value = True
-			call_command('wait_for_db')
-			self.assertEqual(gi.call_count, 1)
-
-	@patch('time.sleep', return_value=True) #doing same things as patch fn above but the passes the equivalent of gi as an argument to our fn.This Mock is used to replace the behavior of time.sleep and replaces it with a Mock fn that returns True,So our code wont have to literally wait the seconds or amount specified.Simply to speed up the test.
-	def test_wait_for_db(self, ts): #Test waiting for db.This will work like a while loop. It will check to see if ConnectionHandler raises OperationalError and if it does then it will wait a second and then try again. ts time.sleep
-		with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-			gi.side_effect = [OperationalError] * 5 + [True]
-			call_command('wait_for_db')
-			self.assertEqual(gi.call_count, 6)
+	def test_wait_for_db_ready(self): #Test wait for db when db is available. The command runs a real SELECT 1 on the test database and returns after the first attempt
+		out = StringIO()
+		with patch('time.sleep') as ts:
+			call_command('wait_for_db', stdout=out)
+		ts.assert_not_called()
+		self.assertIn('Database available! (1 attempts', out.getvalue())
+
+	@patch('time.sleep', return_value=True) #This Mock is used to replace the behavior of time.sleep and replaces it with a Mock fn that returns True,So our code wont have to literally wait the seconds or amount specified.Simply to speed up the test.
+	def test_wait_for_db(self, ts): #Test waiting for db.This will work like a while loop. It will check to see if the SELECT 1 raises OperationalError and if it does then it will wait and then try again, waiting a bit longer every time. ts time.sleep
+		with patch('core.management.commands.wait_for_db.check_database') as cd:
+			cd.side_effect = [OperationalError] * 5 + [None]
+			call_command('wait_for_db', '--initial-delay', '0.1', '--max-delay', '1', stdout=StringIO())
+			self.assertEqual(cd.call_count, 6)
+
+		waits = [call[0][0] for call in ts.call_args_list]
+		self.assertEqual(len(waits), 5)
+		for attempt, wait in enumerate(waits): #exponential backoff capped at --max-delay, the jitter takes off up to half of each wait
+			delay = min(0.1 * 2 ** attempt, 1)
+			self.assertTrue(delay / 2 <= wait <= delay, (attempt, wait))
+
+	@patch('time.sleep', return_value=True)
+	def test_wait_for_db_timeout(self, ts): #Test the command gives up once the timeout has passed
+		with patch('core.management.commands.wait_for_db.check_database', side_effect=OperationalError('could not connect')):
+			with patch('time.monotonic', side_effect=[0, 0, 11, 11]): #started, then before each wait
+				with self.assertRaisesMessage(CommandError, 'could not connect'):
+					call_command('wait_for_db', '--timeout', '10', stdout=StringIO())
+		self.assertEqual(ts.call_count, 1)
+
+	@patch('time.sleep', return_value=True)
+	def test_wait_for_migrations(self, ts): #Test with --migrations the command also waits until every migration is applied
+		with patch('core.management.commands.wait_for_db.unapplied_migrations') as um:
+			um.side_effect = [['core.0008_recipe_image_storage'], []]
+			call_command('wait_for_db', '--migrations', stdout=StringIO())
+		self.assertEqual(um.call_count, 2)
+		self.assertEqual(ts.call_count, 1)
+
+
+class ExportRecipesCommandTests(TestCase): #Test the export_recipes command
+
+	def test_export_recipes_ndjson(self): #Test every recipe of the user is written as a line of json with its tags
+		user = get_user_model().objects.create_user('ksarthak4ever@gmail.com', 'randompassword')
+		recipe = Recipe.objects.create(user=user, title='Pav bhaji', time_minutes=30, price=6.50)
+		recipe.tags.add(Tag.objects.create(user=user, name='Street food'))
+		out = StringIO()
+
+		call_command('export_recipes', '--user', user.email, '--chunk-size', '1', stdout=out)
+
+		lines = out.getvalue().splitlines()
+		self.assertEqual(len(lines), 1)
+		self.assertEqual(json.loads(lines[0])['tags'], [{'id': recipe.tags.get().id, 'name': 'Street food'}])
+
+
+class ImportRecipesCommandTests(TestCase): #Test the import_recipes command
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_user('ksarthak4ever@gmail.com', 'randompassword')
+		self.tag = Tag.objects.create(user=self.user, name='Vegan')
+		self.dir = tempfile.TemporaryDirectory()
+
+	def tearDown(self):
+		self.dir.cleanup()
+
+	def write_file(self, name, content):
+		path = os.path.join(self.dir.name, name)
+		with open(path, 'w') as file:
+			file.write(content)
+		return path
+
+	def test_import_ndjson(self): #Test recipes are created with tags deduped by name against the existing ones
+		path = self.write_file('recipes.ndjson', '\n'.join(json.dumps(record) for record in [
+			{'title': 'Aloo gobi', 'time_minutes': 30, 'price': '4.50', 'tags': ['Vegan', 'Curry'], 'ingredients': ['Potato']},
+			{'title': 'Gobi paratha', 'time_minutes': 20, 'price': '3', 'tags': [{'id': 99, 'name': 'Curry'}]},
+		]))
+
+		call_command('import_recipes', path, '--user', self.user.email, '--batch-size', '1', stdout=StringIO())
+
+		self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+		self.assertEqual(sorted(Tag.objects.values_list('name', flat=True)), ['Curry', 'Vegan'])
+		recipe = Recipe.objects.get(title='Aloo gobi')
+		self.assertIn(self.tag, recipe.tags.all())
+		self.assertEqual(list(recipe.ingredients.values_list('name', flat=True)), ['Potato'])
+		self.assertEqual(Recipe.objects.get(title='Gobi paratha').tags.get().name, 'Curry')
+		self.assertEqual(dict(Tag.objects.values_list('name', 'recipe_count')), {'Curry': 2, 'Vegan': 1}) #the COPY is counted by the triggers too
+		self.assertEqual(self.user.stats.recipe_count, 2)
+		self.assertFalse(os.path.exists(path + '.checkpoint'))
+
+	def test_import_csv(self): #Test the csv written by export_recipes can be imported
+		path = self.write_file('recipes.csv', 'id,title,time_minutes,price,link,tags,ingredients\n7,Poha,15,2.00,,Vegan|Breakfast,Rice flakes\n')
+
+		call_command('import_recipes', path, '--user', self.user.email, stdout=StringIO())
+
+		recipe = Recipe.objects.get(user=self.user)
+		self.assertEqual(recipe.link, '')
+		self.assertEqual(sorted(recipe.tags.values_list('name', flat=True)), ['Breakfast', 'Vegan'])
+		self.assertEqual(Ingredient.objects.get().name, 'Rice flakes')
+
+	def test_import_resumes_from_checkpoint(self): #Test records covered by the checkpoint are not imported again
+		path = self.write_file('recipes.ndjson', '\n'.join(json.dumps(
+			{'title': 'Recipe {}'.format(i), 'time_minutes': 5, 'price': 1}
+		) for i in range(3)))
+		self.write_file('recipes.ndjson.checkpoint', json.dumps({'records': 2}))
+
+		call_command('import_recipes', path, '--user', self.user.email, stdout=StringIO())
+
+		self.assertEqual(list(Recipe.objects.values_list('title', flat=True)), ['Recipe 2'])
+
+	def test_import_invalid_record(self): #Test an invalid record stops the import unless --skip-invalid is passed
+		path = self.write_file('recipes.ndjson', '{"title": "", "time_minutes": 5, "price": 1}\n{"title": "Upma", "time_minutes": 10, "price": 2}')
+
+		with self.assertRaises(CommandError):
+			call_command('import_recipes', path, '--user', self.user.email, stdout=StringIO())
+		call_command('import_recipes', path, '--user', self.user.email, '--skip-invalid', stdout=StringIO(), stderr=StringIO())
+
+		self.assertEqual(list(Recipe.objects.values_list('title', flat=True)), ['Upma'])
+
+
+class LoadTestCommandTests(LiveServerTestCase): #Test the loadtest command against the test server
+
+	def test_loadtest_reports_every_server(self):
+		out = StringIO()
+
+		call_command(
+			'loadtest', '--url', self.live_server_url, '--url', self.live_server_url,
+			'--requests', '6', '--concurrency', '2', '--warmup', '1', '--recipes', '3', stdout=out
+		)
+
+		lines = out.getvalue().splitlines()
+		self.assertTrue(lines[-3].startswith('server'))
+		for line in lines[-2:]:
+			self.assertTrue(line.startswith(self.live_server_url))
+			self.assertEqual(line.split()[-2], '0') #no errors
+		self.assertEqual(Recipe.objects.filter(user__email='loadtest@example.com').count(), 3)
+
+	def test_loadtest_search(self): #Test --search loads the ?q= search, the seeded recipes being searchable
+		out = StringIO()
+
+		call_command(
+			'loadtest', '--url', self.live_server_url, '--search', 'recipe',
+			'--requests', '4', '--concurrency', '2', '--warmup', '1', '--recipes', '3', stdout=out
+		)
+
+		self.assertIn('q=recipe', out.getvalue())
+		self.assertEqual(out.getvalue().splitlines()[-1].split()[-2], '0')
+		self.assertEqual(Recipe.objects.filter(search_vector__isnull=False).count(), 3)
+
+	def test_loadtest_invalid_concurrency(self):
+		with self.assertRaises(CommandError):
+			call_command('loadtest', '--url', self.live_server_url, '--concurrency', '0')
+
+
+class BenchmarkCommandTests(TestCase): #Test the benchmark command against small seeded users
+
+	def setUp(self):
+		self.dir = tempfile.TemporaryDirectory()
+		self.output = os.path.join(self.dir.name, 'bench.json')
+
+	def tearDown(self):
+		self.dir.cleanup()
+
+	def benchmark(self, *args):
+		call_command('benchmark', '--tenants', '3,7', '--iterations', '2', '--warmup', '0', *args, stdout=StringIO())
+
+	def test_benchmark_every_endpoint(self):
+		self.benchmark('--output', self.output)
+
+		with open(self.output) as file:
+			results = json.load(file)['results']
+		self.assertEqual(
+			[(result['tenant'], result['endpoint']) for result in results],
+			[(tenant, endpoint) for tenant in (3, 7) for endpoint in SCENARIOS]
+		)
+		for result in results:
+			self.assertGreater(result['p50_ms'], 0)
+			self.assertGreaterEqual(result['p99_ms'], result['p50_ms'])
+			self.assertGreater(result['peak_memory_kib'], 0)
+		self.assertEqual(next(result for result in results if result['endpoint'] == 'list_cached')['queries'], 0)
+		self.assertEqual(Recipe.objects.filter(user__email=tenant_email(7, 0)).count(), 7) #the created recipes are deleted again
+
+	def test_seeded_data_is_deterministic(self): #Test the same seed generates the same recipes and a seeded user is reused
+		def generate(seed):
+			tag_names, ingredient_names, recipes = generate_recipes(50, seed)
+			return tag_names, ingredient_names, list(recipes)
+
+		self.assertEqual(generate(1), generate(1))
+		self.assertNotEqual(generate(1)[2], generate(2)[2])
+
+		tenant = seed_tenant(50, 1)
+		self.assertEqual(len(tenant.recipe_ids), 50)
+		self.assertTrue(Recipe.tags.through.objects.filter(recipe__user=tenant.user).exists())
+		self.assertEqual(seed_tenant(50, 1).recipe_ids, tenant.recipe_ids)
+
+	def test_regression_from_baseline(self): #Test an extra query fails the run against a baseline
+		self.benchmark('--endpoints', 'list', '--output', self.output)
+		with open(self.output) as file:
+			baseline = json.load(file)
+		for result in baseline['results']:
+			result['queries'] = 0
+			result['p50_ms'] = result['p99_ms'] = result['peak_memory_kib'] = 10 ** 6
+		with open(self.output, 'w') as file:
+			json.dump(baseline, file)
+
+		with self.assertRaisesRegex(CommandError, r'3 recipes list: \d+ queries, was \d+'):
+			self.benchmark('--endpoints', 'list', '--baseline', self.output)
+
+	def test_scenario_needs_request(self): #Test a scenario that doesn't define its request can't be created
+		class NoRequestScenario(Scenario):
+			pass
+
+		with self.assertRaises(TypeError):
+			NoRequestScenario(None, None)
+
+	def test_unknown_endpoint(self):
+		with self.assertRaises(CommandError):
+			self.benchmark('--endpoints', 'list,delete_everything')
@@ -0,0 +1,50 @@
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import SimpleTestCase
+
+
+@skipUnless(connection.vendor == 'postgresql', 'CONN_HEALTH_CHECKS is implemented by the postgresql backend')
+class HealthCheckTests(SimpleTestCase): #Test the CONN_HEALTH_CHECKS of core.backends.postgresql
+	allow_database_queries = True
+
+	def setUp(self):
+		self.connection = connection.copy() #a connection of its own, outside the transaction of the test
+		self.connection.settings_dict.update({'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True})
+		self.connection.ensure_connection()
+
+	def tearDown(self):
+		self.connection.close()
+
+	def test_broken_connection_replaced(self): #Test a reused connection that no longer works is replaced before the first query of the next request
+		broken = self.connection.connection
+		self.connection.close_if_unusable_or_obsolete() #end of the request
+
+		with patch.object(self.connection, 'is_usable', return_value=False):
+			with self.connection.cursor() as cursor:
+				cursor.execute('SELECT 1')
+
+		self.assertIsNot(self.connection.connection, broken)
+
+	def test_healthy_connection_reused_and_checked_once(self):
+		reused = self.connection.connection
+		self.connection.close_if_unusable_or_obsolete()
+
+		with patch.object(self.connection, 'is_usable', return_value=True) as is_usable:
+			for i in range(2):
+				with self.connection.cursor() as cursor:
+					cursor.execute('SELECT 1')
+
+		self.assertIs(self.connection.connection, reused)
+		self.assertEqual(is_usable.call_count, 1)
+
+	def test_no_checks_when_disabled(self):
+		self.connection.settings_dict['CONN_HEALTH_CHECKS'] = False
+		self.connection.close_if_unusable_or_obsolete()
+
+		with patch.object(self.connection, 'is_usable') as is_usable:
+			with self.connection.cursor() as cursor:
+				cursor.execute('SELECT 1')
+
+		is_usable.assert_not_called()
@@ -0,0 +1,92 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery
+from django.db import connection
+from django.test import TestCase
+
+from core.models import Tag, Ingredient, Recipe
+
+
+PAGE_SIZE = 20
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN output is checked against the postgres planner')
+class IndexUsageTests(TestCase): #Test the postgres planner picks the composite indexes for the per user access patterns of the api
+
+	@classmethod
+	def setUpTestData(cls): #Seed a large tenant next to many small ones so neither scanning the whole table nor sorting all the rows of the user is the cheapest plan for a page
+		users = [
+			get_user_model().objects.create_user(f'user{i}@gmail.com', 'password123')
+			for i in range(20)
+		]
+		cls.user = users[0]
+		for user in users:
+			rows = 2000 if user == cls.user else 100
+			Tag.objects.bulk_create(Tag(user=user, name=f'Tag {i}') for i in range(rows))
+			Ingredient.objects.bulk_create(Ingredient(user=user, name=f'Ingredient {i}') for i in range(rows))
+			Recipe.objects.bulk_create(
+				Recipe(user=user, title=f'Recipe {i}', time_minutes=i % 120, price=i % 100) for i in range(rows)
+			)
+
+		tag_ids = list(Tag.objects.values_list('id', flat=True))
+		ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+		recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+		Recipe.tags.through.objects.bulk_create(
+			Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_ids[(recipe_id * 7 + i) % len(tag_ids)])
+			for recipe_id in recipe_ids for i in range(3)
+		)
+		Recipe.ingredients.through.objects.bulk_create(
+			Recipe.ingredients.through(recipe_id=recipe_id, ingredient_id=ingredient_ids[(recipe_id * 11 + i) % len(ingredient_ids)])
+			for recipe_id in recipe_ids for i in range(3)
+		)
+		with connection.cursor() as cursor:
+			cursor.execute('ANALYZE') #so the planner works from statistics of the seeded data
+
+	def assertUsesIndex(self, queryset, index_name):
+		plan = queryset.explain()
+		self.assertIn(index_name, plan)
+
+	def test_tag_list_uses_index(self): #Test a page of the tags list is read from the (user, -name, id) index
+		self.assertUsesIndex(
+			Tag.objects.filter(user=self.user).order_by('-name', 'id')[:PAGE_SIZE],
+			'core_tag_user_name_idx'
+		)
+
+	def test_ingredient_list_uses_index(self):
+		self.assertUsesIndex(
+			Ingredient.objects.filter(user=self.user).order_by('-name', 'id')[:PAGE_SIZE],
+			'core_ingr_user_name_idx'
+		)
+
+	def test_recipe_list_uses_index(self): #Test a page of the recipes list is read from the (user, -id) index
+		self.assertUsesIndex(
+			Recipe.objects.filter(user=self.user).order_by('-id')[:PAGE_SIZE],
+			'core_recipe_user_id_idx'
+		)
+
+	def test_quick_cheap_recipes_use_index(self): #Test ordering by price or time with both range filters reads the page from the matching (user, field, id, other field) index
+		quick_cheap = Recipe.objects.filter(user=self.user, time_minutes__lte=20, price__lte=10)
+		self.assertUsesIndex(quick_cheap.order_by('price', 'id')[:PAGE_SIZE], 'core_recipe_user_price_idx')
+		self.assertUsesIndex(quick_cheap.order_by('-time_minutes', '-id')[:PAGE_SIZE], 'core_recipe_user_time_idx')
+
+	def test_filter_by_tag_uses_index(self): #Test the recipe ids for a tag come from the (tag_id, recipe_id) through table index
+		tag = Tag.objects.filter(user=self.user).first()
+		self.assertUsesIndex(
+			Recipe.tags.through.objects.filter(tag_id__in=[tag.id]).values('recipe_id'),
+			'core_recipe_tags_tag_recipe_idx'
+		)
+
+	def test_filter_by_ingredient_uses_index(self):
+		ingredient = Ingredient.objects.filter(user=self.user).first()
+		self.assertUsesIndex(
+			Recipe.ingredients.through.objects.filter(ingredient_id__in=[ingredient.id]).values('recipe_id'),
+			'core_recipe_ingr_ingr_recipe_idx'
+		)
+
+	def test_search_indexes_match_the_queries(self): #Test the ?q= match and the tag/ingredient autocomplete can be answered from their GIN indexes.The seeded tables are too small for the planner to prefer those over a scan on its own, so scans are turned off
+		with connection.cursor() as cursor:
+			cursor.execute('SET LOCAL enable_seqscan = off')
+		self.assertUsesIndex(Recipe.objects.filter(search_vector=SearchQuery('1999', config='english')), 'core_recipe_search_idx')
+		self.assertUsesIndex(Tag.objects.filter(name__trigram_word_similar='Tagg 1234'), 'core_tag_name_trgm_idx')
+		self.assertUsesIndex(Ingredient.objects.filter(name__trigram_word_similar='Ingredent 1234'), 'core_ingr_name_trgm_idx')
@@ -0,0 +1,199 @@
+import gzip
+import json
+import re
+from unittest.mock import patch
+
+import brotli
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.middleware import CompressionMiddleware, RequestTimingMiddleware, accepted_encodings
+from core.models import Recipe, RecipeQuerySet, Tag
+from core.timing import RequestTimings, query_shape
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+TOKEN_URL = reverse('user:token')
+
+
+def server_timing(res): #Parse a Server-Timing header into a dict of metric -> (duration in ms, description)
+	metrics = {}
+	for metric in res['Server-Timing'].split(', '):
+		match = re.match(r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?$', metric)
+		metrics[match.group(1)] = (float(match.group(2)), match.group(3))
+	return metrics
+
+
+class AcceptedEncodingsTests(SimpleTestCase):
+
+	def test_accepted_encodings(self):
+		self.assertEqual(accepted_encodings('gzip, deflate, br'), {'gzip', 'deflate', 'br'})
+		self.assertEqual(accepted_encodings('br;q=0, GZIP;q=0.5, identity'), {'gzip', 'identity'})
+		self.assertEqual(accepted_encodings(''), set())
+
+	def test_settings(self):
+		with override_settings(RESPONSE_COMPRESSION=''), self.assertRaises(MiddlewareNotUsed):
+			CompressionMiddleware(None)
+		with override_settings(RESPONSE_COMPRESSION='br,zstd'), self.assertRaises(ImproperlyConfigured):
+			CompressionMiddleware(None)
+
+
+class CompressionMiddlewareTests(TestCase): #Test the responses are compressed with the best coding the client accepts
+
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(
+			'ksarthak4ever@gmail.com',
+			'randompassword'
+		)
+		self.client.force_authenticate(self.user)
+		for i in range(30):
+			Recipe.objects.create(user=self.user, title='Recipe {}'.format(i), time_minutes=10, price=5.00)
+		self.expected = json.loads(self.client.get(RECIPES_URL).content.decode('utf-8'))
+
+	def get(self, url, accept_encoding):
+		res = self.client.get(url, HTTP_ACCEPT_ENCODING=accept_encoding)
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertIn('Accept-Encoding', res['Vary'])
+		return res
+
+	def test_brotli_preferred(self):
+		res = self.get(RECIPES_URL, 'gzip, deflate, br')
+
+		self.assertEqual(res['Content-Encoding'], 'br')
+		self.assertEqual(json.loads(brotli.decompress(res.content).decode('utf-8')), self.expected)
+		self.assertEqual(res['Content-Length'], str(len(res.content)))
+
+	def test_gzip(self):
+		res = self.get(RECIPES_URL, 'gzip, br;q=0')
+
+		self.assertEqual(res['Content-Encoding'], 'gzip')
+		self.assertEqual(json.loads(gzip.decompress(res.content).decode('utf-8')), self.expected)
+
+	def test_not_accepted(self):
+		res = self.get(RECIPES_URL, 'identity')
+
+		self.assertFalse(res.has_header('Content-Encoding'))
+
+	def test_small_responses_left_alone(self):
+		res = self.client.get(RECIPES_URL, {'page_size': 1}, HTTP_ACCEPT_ENCODING='br')
+
+		self.assertFalse(res.has_header('Content-Encoding'))
+
+	@override_settings(RESPONSE_COMPRESSION='gzip')
+	def test_settings_order(self):
+		self.client = APIClient() #setUp's client loaded the middleware with the default settings
+		self.client.force_authenticate(self.user)
+
+		res = self.get(RECIPES_URL, 'br, gzip')
+
+		self.assertEqual(res['Content-Encoding'], 'gzip')
+
+	def test_etag_still_matches(self): #Test the weakened ETag of a compressed list still gets a 304
+		etag = self.get(RECIPES_URL, 'br')['ETag']
+		self.assertTrue(etag.startswith('W/"'))
+
+		res = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING='br', HTTP_IF_NONE_MATCH=etag)
+
+		self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+	def test_streamed_export(self):
+		res = self.get(EXPORT_URL, 'br')
+
+		self.assertEqual(res['Content-Encoding'], 'br')
+		lines = brotli.decompress(b''.join(res.streaming_content)).decode('utf-8').splitlines()
+		self.assertEqual(len(lines), 30)
+
+
+class QueryShapeTests(SimpleTestCase):
+
+	def test_query_shape(self): #Test the runs of a query differing only in their values have one shape
+		self.assertEqual(
+			query_shape('SELECT "id" FROM "core_tag" WHERE "id" IN (%s, %s, %s) LIMIT 21'),
+			query_shape('SELECT "id" FROM "core_tag" WHERE "id" IN (%s) LIMIT 5')
+		)
+		self.assertNotEqual(query_shape('SELECT "id" FROM "core_tag"'), query_shape('SELECT "id" FROM "core_ingredient"'))
+
+	def test_repeated_queries(self):
+		timings = RequestTimings()
+		for i in range(6):
+			timings.record_query(lambda *args: None, 'SELECT * FROM "core_tag" WHERE "id" = %s', (i,), False, {})
+		timings.record_query(lambda *args: None, 'SELECT 1', (), False, {})
+
+		self.assertEqual(timings.repeated_queries(5), [('SELECT * FROM "core_tag" WHERE "id" = %s', 6)])
+		self.assertEqual(timings.repeated_queries(6), [])
+
+	def test_off(self):
+		with override_settings(REQUEST_TIMING_SAMPLE_RATE=0), self.assertRaises(MiddlewareNotUsed):
+			RequestTimingMiddleware(None)
+
+
+@override_settings(REQUEST_TIMING_SAMPLE_RATE=1)
+class RequestTimingMiddlewareTests(TestCase): #Test the timings of the sampled requests are sent back and logged
+
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(
+			'ksarthak4ever@gmail.com',
+			'randompassword'
+		)
+		self.token = self.client.post(TOKEN_URL, {'email': 'ksarthak4ever@gmail.com', 'password': 'randompassword'}).data['token']
+		self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
+		recipe = Recipe.objects.create(user=self.user, title='Dal makhani', time_minutes=60, price=4.00)
+		recipe.tags.add(Tag.objects.create(user=self.user, name='Vegetarian'))
+
+	def test_server_timing(self):
+		with CaptureQueriesContext(connection) as queries:
+			res = self.client.get(RECIPES_URL, {'expand': 'tags'})
+
+		metrics = server_timing(res)
+		self.assertEqual(set(metrics), {'db', 'auth', 'serialize', 'render', 'total'})
+		self.assertEqual(metrics['db'][1], '{} queries'.format(len(queries)))
+		for name in ('db', 'auth', 'serialize', 'render'):
+			self.assertLessEqual(metrics[name][0], metrics['total'][0])
+
+	def test_token_auth_timed(self): #Test the password check of the token endpoint is the auth phase
+		res = self.client.post(TOKEN_URL, {'email': 'ksarthak4ever@gmail.com', 'password': 'randompassword'})
+
+		self.assertIn('auth', server_timing(res))
+
+	def test_log_line(self):
+		with self.assertLogs('core.middleware', 'INFO') as logs:
+			self.client.get(RECIPES_URL)
+
+		self.assertEqual(len(logs.records), 1)
+		line = json.loads(logs.records[0].getMessage())
+		self.assertEqual((line['method'], line['path'], line['status']), ('GET', RECIPES_URL, 200))
+		self.assertIn('db_ms', line)
+		self.assertNotIn('repeated_queries', line)
+
+	def test_repeated_queries_logged(self): #Test an N+1 loop(the expanded tags of each recipe loaded one by one) is a warning naming only the repeated query, at the default threshold
+		for i in range(6):
+			Recipe.objects.create(user=self.user, title='Recipe {}'.format(i), time_minutes=10, price=5.00).tags.add(
+				Tag.objects.create(user=self.user, name='Tag {}'.format(i))
+			)
+
+		with patch.object(RecipeQuerySet, 'with_related_objects', lambda queryset, relations=(): queryset), self.assertLogs('core.middleware', 'WARNING') as logs:
+			self.client.get(RECIPES_URL, {'expand': 'tags'})
+
+		line = json.loads(logs.records[0].getMessage())
+		self.assertEqual(logs.records[0].levelname, 'WARNING')
+		self.assertEqual(len(line['repeated_queries']), 1)
+		self.assertEqual(line['repeated_queries'][0]['count'], 7) #one per recipe
+		self.assertIn('FROM "core_tag"', line['repeated_queries'][0]['sql'])
+		self.assertIn('"core_recipe_tags"."recipe_id" = %s', line['repeated_queries'][0]['sql'])
+
+	def test_unsampled(self):
+		with override_settings(REQUEST_TIMING_SAMPLE_RATE=0.5), patch('core.middleware.random.random', return_value=0.7):
+			res = self.client.get(RECIPES_URL)
+
+		self.assertFalse(res.has_header('Server-Timing'))
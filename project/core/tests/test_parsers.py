@@ -0,0 +1,92 @@
+import io
+import json
+
+import msgpack
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.parsers import FastJSONParser, MessagePackParser
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def parse(parser, body, encoding='utf-8'):
+	return parser.parse(io.BytesIO(body), parser.media_type, {'encoding': encoding})
+
+
+class FastJSONParserTests(SimpleTestCase): #Test FastJSONParser reads bodies the way DRF's JSONParser does
+
+	def test_same_data(self):
+		for body in (
+			'{"title": "Crème brûlée 🍮", "price": "4.50", "tags": [1, 2], "link": null}',
+			'[{"id": 1, "ratio": 0.1}, {"id": 2}]',
+			'{"big": 1180591620717411303424}', #over 64 bits, left to JSONParser
+		):
+			self.assertEqual(parse(FastJSONParser(), body.encode('utf-8')), parse(JSONParser(), body.encode('utf-8')))
+
+	def test_other_charset(self):
+		body = '{"title": "Crème"}'.encode('latin-1')
+
+		self.assertEqual(parse(FastJSONParser(), body, 'latin-1'), {'title': 'Crème'})
+
+	def test_malformed(self):
+		for body in (b'{"title": ', b'{"price": NaN}', b'\xff'):
+			with self.assertRaises(ParseError):
+				parse(FastJSONParser(), body)
+
+
+class MessagePackParserTests(SimpleTestCase):
+
+	def test_parse(self):
+		data = {'title': 'Crème brûlée 🍮', 'price': '4.50', 'tags': [1, 2], 'link': None}
+
+		self.assertEqual(parse(MessagePackParser(), msgpack.packb(data)), data)
+
+	def test_malformed(self):
+		for body in (b'\xc1', b'\x92\x01', msgpack.packb({'a': 1}) + b'\x01', b'\xd9\x02\xff\xfe', msgpack.packb({1: 'int key'})):
+			with self.assertRaises(ParseError):
+				parse(MessagePackParser(), body)
+
+
+class MessagePackApiTests(TestCase): #Test the api takes and returns application/msgpack
+
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(
+			'ksarthak4ever@gmail.com',
+			'randompassword'
+		)
+		self.client.force_authenticate(self.user)
+
+	def test_create_and_list(self):
+		res = self.client.post(
+			RECIPES_URL,
+			msgpack.packb({'title': 'Dal makhani', 'time_minutes': 60, 'price': '4.00', 'tags': [], 'ingredients': []}),
+			content_type='application/msgpack',
+			HTTP_ACCEPT='application/msgpack'
+		)
+
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+		self.assertEqual(res['Content-Type'], 'application/msgpack')
+		self.assertEqual(msgpack.unpackb(res.content, raw=False)['title'], 'Dal makhani')
+		self.assertTrue(Recipe.objects.filter(user=self.user, title='Dal makhani').exists())
+
+		as_json = self.client.get(RECIPES_URL)
+		as_msgpack = self.client.get(RECIPES_URL, HTTP_ACCEPT='application/msgpack')
+
+		self.assertEqual(msgpack.unpackb(as_msgpack.content, raw=False), json.loads(as_json.content.decode('utf-8')))
+		self.assertNotEqual(as_json['ETag'], as_msgpack['ETag']) #cached apart
+
+	def test_malformed_body(self):
+		res = self.client.post(RECIPES_URL, b'\xc1', content_type='application/msgpack')
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,74 @@
+import datetime
+import decimal
+import json
+import uuid
+
+import msgpack
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict
+
+from core.renderers import FastJSONRenderer, MessagePackRenderer
+
+
+class FastJSONRendererTests(SimpleTestCase): #Test FastJSONRenderer writes the same bytes as DRF's JSONRenderer
+
+	def assertSameBytes(self, data, accepted_media_type='application/json'):
+		expected = JSONRenderer().render(data, accepted_media_type, {})
+		self.assertEqual(FastJSONRenderer().render(data, accepted_media_type, {}), expected)
+
+	def test_plain_data(self):
+		self.assertSameBytes([
+			{'id': 1, 'title': 'Dal makhani', 'price': '4.00', 'tags': [1, 2], 'renditions': {}},
+			{'id': 2, 'title': None, 'ok': True, 'ratio': 0.1, 'big': 2 ** 62, 'negative': -3},
+		])
+
+	def test_strings(self): #Test non ascii text stays utf-8, control characters and the javascript line terminators are escaped the same way
+		self.assertSameBytes({'title': 'Crème brûlée 🍮 "quoted" \\ back\nslash\t\x01\x1f\x7f', 'js': 'a\u2028b\u2029c'})
+
+	def test_types_of_drf_encoder(self): #Test dates, decimals, uuids, lazy strings and error details come out as DRF writes them
+		self.assertSameBytes(ReturnDict({
+			'created': datetime.datetime(2026, 10, 18, 8, 30, 1, 123456, tzinfo=datetime.timezone.utc),
+			'naive': datetime.datetime(2026, 10, 18, 8, 30),
+			'day': datetime.date(2026, 10, 18),
+			'time': datetime.time(8, 30, 1, 500),
+			'duration': datetime.timedelta(minutes=90),
+			'price': decimal.Decimal('4.50'),
+			'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+			'lazy': _('Not found.'),
+			'error': [ErrorDetail('This field is required.', code='required')],
+			'set': {3},
+		}, serializer=None))
+
+	def test_falls_back_to_drf(self): #Test what orjson refuses or writes differently is rendered by JSONRenderer
+		self.assertSameBytes({'big': 2 ** 70, 1: 'int key'})
+		self.assertSameBytes({'a': [1, {'b': 2}]}, 'application/json; indent=4')
+
+	def test_no_data(self):
+		self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class MessagePackRendererTests(SimpleTestCase): #Test MessagePackRenderer writes the values the json renderer does
+
+	def test_same_values_as_json(self):
+		data = ReturnDict({
+			'created': datetime.datetime(2026, 10, 18, 8, 30, 1, 123456, tzinfo=datetime.timezone.utc),
+			'price': decimal.Decimal('4.50'),
+			'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+			'lazy': _('Not found.'),
+			'error': [ErrorDetail('This field is required.', code='required')],
+			'title': 'Crème brûlée 🍮',
+			'tags': (1, 2),
+			'none': None,
+		}, serializer=None)
+
+		unpacked = msgpack.unpackb(MessagePackRenderer().render(data), raw=False)
+
+		self.assertEqual(unpacked, json.loads(JSONRenderer().render(data).decode('utf-8')))
+
+	def test_no_data(self):
+		self.assertEqual(MessagePackRenderer().render(None), b'')
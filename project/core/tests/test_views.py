@@ -0,0 +1,125 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+from prometheus_client import REGISTRY, Counter, values
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.utils import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.metrics import IMAGE_QUEUE_DEPTH, latest_metrics
+
+from recipe import images
+
+
+LIVENESS_URL = reverse('liveness')
+READINESS_URL = reverse('readiness')
+METRICS_URL = reverse('metrics')
+
+
+class HealthViewTests(TestCase): #Test the probes for orchestrators, which need no authentication
+
+	def test_liveness(self):
+		with patch('core.views.check_database') as cd:
+			res = self.client.get(LIVENESS_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res.json(), {'status': 'ok'})
+		cd.assert_not_called() #a db outage must not fail liveness
+
+	def test_readiness(self):
+		res = self.client.get(READINESS_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res.json()['database'], 'ok')
+		self.assertIn('no-cache', res['Cache-Control'])
+
+	def test_readiness_database_unavailable(self):
+		with patch('core.views.check_database', side_effect=OperationalError):
+			res = self.client.get(READINESS_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+		self.assertEqual(res.json()['database'], 'unavailable')
+
+	def test_readiness_database_lost_reading_migrations(self): #Test the db going away after the SELECT 1 is still a 503
+		with patch('core.views.unapplied_migrations', side_effect=OperationalError):
+			res = self.client.get(READINESS_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+		self.assertEqual(res.json(), {'status': 'unavailable', 'database': 'unavailable'})
+
+	def test_readiness_unapplied_migrations(self):
+		with patch('core.views.unapplied_migrations', return_value=['core.0008_recipe_image_storage']):
+			res = self.client.get(READINESS_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+		self.assertEqual(res.json()['unapplied_migrations'], ['core.0008_recipe_image_storage'])
+
+
+class MetricsViewTests(TestCase): #Test the prometheus metrics endpoint
+
+	def setUp(self):
+		self.client = APIClient()
+		get_user_model().objects.create_user('ksarthak4ever@gmail.com', 'randompassword')
+
+	def metric(self, name, **labels):
+		return REGISTRY.get_sample_value(name, labels) or 0
+
+	def test_request_metrics(self): #Test the latencies are labelled by view and the cache lookups counted
+		before = self.metric('api_request_duration_seconds_count', view='CreateTokenView', method='POST', status='200')
+		token = self.client.post(reverse('user:token'), {'email': 'ksarthak4ever@gmail.com', 'password': 'randompassword'}).data['token']
+		self.client.credentials(HTTP_AUTHORIZATION='Token ' + token)
+		hits = self.metric('api_cache_lookups_total', cache='recipe_list', result='hit')
+		for i in range(2):
+			self.client.get(reverse('recipe:recipe-list'))
+
+		res = self.client.get(METRICS_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertTrue(res['Content-Type'].startswith('text/plain'))
+		self.assertIn('api_request_duration_seconds_bucket{le="0.1",method="GET",status="200",view="RecipeViewSet"}', res.content.decode())
+		self.assertEqual(self.metric('api_request_duration_seconds_count', view='CreateTokenView', method='POST', status='200'), before + 1)
+		self.assertEqual(self.metric('api_cache_lookups_total', cache='recipe_list', result='hit'), hits + 1)
+		self.assertEqual(self.metric('api_requests_in_flight'), 0)
+
+	def test_db_connections(self):
+		opened = self.metric('db_connections_opened_total', alias='default')
+		open_before = self.metric('db_connections_open', alias='default')
+		other = connection.copy()
+
+		other.ensure_connection()
+		self.assertEqual(self.metric('db_connections_opened_total', alias='default'), opened + 1)
+		self.assertEqual(self.metric('db_connections_open', alias='default'), open_before + 1)
+		other.close()
+		self.assertEqual(self.metric('db_connections_open', alias='default'), open_before)
+
+	def test_image_queue_depth(self): #Test an image counts in the queue until its renditions are made
+		jobs = []
+		with patch('recipe.images.get_executor') as executor, patch('recipe.images._run') as run:
+			executor.return_value.submit.side_effect = lambda fn, *args: jobs.append((fn, args))
+			images._submit(1)
+			self.assertEqual(IMAGE_QUEUE_DEPTH._value.get(), 1)
+			for fn, args in jobs:
+				fn(*args)
+
+		run.assert_called_once_with(1)
+		self.assertEqual(IMAGE_QUEUE_DEPTH._value.get(), 0)
+
+	@override_settings(METRICS_TOKEN='scrape-token')
+	def test_metrics_token(self):
+		self.assertEqual(self.client.get(METRICS_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+		self.assertEqual(self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer scrape-token').status_code, status.HTTP_200_OK)
+
+	def test_multiple_processes(self): #Test the values the worker processes write to PROMETHEUS_MULTIPROC_DIR are added up
+		with tempfile.TemporaryDirectory() as path, patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': path}):
+			for pid in (101, 102):
+				with patch.object(values, 'ValueClass', values.MultiProcessValue(lambda: pid)):
+					Counter('test_worker_requests', 'Requests of a worker', registry=None).inc(2)
+
+			self.assertIn(b'test_worker_requests_total 4.0', latest_metrics())
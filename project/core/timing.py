@@ -0,0 +1,90 @@
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+
+from rest_framework.fields import empty
+
+
+re_placeholder_list = re.compile(r'%s(?:\s*,\s*%s)+') #IN (%s, %s, %s) of any length
+re_number = re.compile(r'\b\d+\b') #LIMIT 21, OFFSET 100 etc. that django writes into the sql
+
+_local = threading.local()
+
+
+def query_shape(sql): #The sql of a query without what changes between its runs, so an N+1 loop's queries all have the same shape
+	return re_number.sub('N', re_placeholder_list.sub('%s', sql))
+
+
+class RequestTimings: #Seconds spent in each phase(db, auth, serialize, render) of the request being handled and the shapes of the queries it ran
+	def __init__(self):
+		self.started = time.perf_counter()
+		self.duration = None
+		self.phases = {}
+		self.running = {} #phase -> when its outermost block started
+		self.queries = Counter() #shape -> runs
+
+	def start(self, name):
+		self.running[name] = time.perf_counter()
+
+	def stop(self, name):
+		started = self.running.pop(name, None)
+		if started is not None:
+			self.phases[name] = self.phases.get(name, 0) + time.perf_counter() - started
+
+	def finish(self):
+		self.duration = time.perf_counter() - self.started
+
+	def record_query(self, execute, sql, params, many, context): #connection.execute_wrapper() timing every query
+		started = time.perf_counter()
+		try:
+			return execute(sql, params, many, context)
+		finally:
+			self.phases['db'] = self.phases.get('db', 0) + time.perf_counter() - started
+			self.queries[query_shape(sql)] += 1
+
+	def repeated_queries(self, limit): #(shape, runs) of the queries run more than limit times, most repeated first
+		return [(shape, count) for shape, count in self.queries.most_common() if count > limit]
+
+
+class PhaseTimer: #Times a block into a phase of RequestTimings, see timed()
+	def __init__(self, timings, name):
+		self.timings = timings
+		self.name = name
+
+	def __enter__(self):
+		self.timings.start(self.name)
+
+	def __exit__(self, *exc_info):
+		self.timings.stop(self.name)
+
+
+def current_timings(): #RequestTimings of the request this thread is handling, None when it isn't sampled
+	return getattr(_local, 'timings', None)
+
+
+def start_timings():
+	_local.timings = RequestTimings()
+	return _local.timings
+
+
+def stop_timings():
+	_local.timings = None
+
+
+def timed(name): #Context manager adding the time spent in the block to the `name` phase of the sampled request, only the outermost block counts when they nest(i.e a nested serializer)
+	timings = current_timings()
+	if timings is None or name in timings.running:
+		return nullcontext()
+	return PhaseTimer(timings, name)
+
+
+class TimedSerializerMixin: #Serializer mixin counting the time spent validating and representing objects as the serialize phase of the request
+	def to_representation(self, instance):
+		with timed('serialize'):
+			return super().to_representation(instance)
+
+	def run_validation(self, data=empty):
+		with timed('serialize'):
+			return super().run_validation(data)
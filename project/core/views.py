@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.db.utils import DatabaseError
+from django.http import HttpResponse, JsonResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from core.health import check_database, unapplied_migrations
+from core.metrics import latest_metrics
+
+
+@never_cache
+@require_GET
+def liveness(request): #Liveness probe, the process answers requests. Touches nothing else so a db outage doesn't get every container restarted
+	return JsonResponse({'status': 'ok'})
+
+
+@never_cache
+@require_GET
+def readiness(request): #Readiness probe, the same checks as wait_for_db --migrations. 503 until the db answers a SELECT 1 and every migration is applied
+	try:
+		check_database()
+		pending = unapplied_migrations() #reads the applied migrations from the db too, which may have gone since the SELECT 1
+	except DatabaseError:
+		return JsonResponse({'status': 'unavailable', 'database': 'unavailable'}, status=503)
+
+	if pending:
+		return JsonResponse({'status': 'unavailable', 'database': 'ok', 'unapplied_migrations': pending}, status=503)
+	return JsonResponse({'status': 'ok', 'database': 'ok'})
+
+
+@never_cache
+@require_GET
+def metrics(request): #Prometheus metrics of all the worker processes, i.e the request latencies per view. Needs Authorization: Bearer <METRICS_TOKEN> when METRICS_TOKEN is set
+	if settings.METRICS_TOKEN and not constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), 'Bearer ' + settings.METRICS_TOKEN):
+		return HttpResponse(status=401)
+	return HttpResponse(latest_metrics(), content_type=CONTENT_TYPE_LATEST)
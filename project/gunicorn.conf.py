@@ -0,0 +1,73 @@
+# Gunicorn settings for serving the api in production, used by docker-compose.prod.yml
+# gunicorn -c gunicorn.conf.py project.wsgi:application
+# or, through the ASGI entry point with uvicorn workers,
+# GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py project.asgi:application
+# http://docs.gunicorn.org/en/stable/settings.html
+
+import multiprocessing
+import os
+import shutil
+
+
+def cpu_count(): #CPUs this process may run on, which in a container limited with --cpuset-cpus is fewer than the host has
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return multiprocessing.cpu_count()
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Every worker is a process with its own db connections, caches and rendition
+# pool. The gthread workers serve `threads` requests at a time each, so the db
+# sees up to workers * threads connections, kept open between requests for
+# DB_CONN_MAX_AGE seconds. The uvicorn workers run the views in ASGI_THREADS
+# threads each instead, taken only once a request has been read, so they keep
+# many more slow clients connected with workers * ASGI_THREADS connections. If
+# that is more than postgres allows, point DB_HOST at a PgBouncer in
+# transaction pooling mode and set DB_POOL_MODE=pgbouncer.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('GUNICORN_WORKERS', cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4 if worker_class == 'gthread' else 1))
+
+# Load the app once in the master before forking so the workers share its
+# memory copy-on-write and start faster. Django opens no db connection and the
+# rendition pool no threads while loading, so nothing is shared that shouldn't be.
+preload_app = True
+
+# Graceful reload: `kill -HUP <master pid>` replaces the workers one by one,
+# letting each finish its requests first (graceful_timeout). Preloaded code is
+# not re-imported on HUP. To deploy new code without dropping requests,
+# `kill -USR2` starts a new master next to the old one, then `kill -TERM` the old one.
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5)) #seconds to keep idle client connections open, for clients behind a load balancer that reuses them
+
+# Restart every worker after a number of requests (jittered so they don't all
+# restart at once), bounding the memory any leak can take.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+worker_tmp_dir = '/dev/shm' #the worker heartbeat files, on the docker overlay filesystem they can block workers
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-') or None #an empty GUNICORN_ACCESSLOG turns the access log off
+errorlog = '-'
+
+# With PROMETHEUS_MULTIPROC_DIR set every worker writes its metrics to files in
+# that directory and /metrics adds them all up. It has to exist before the app
+# is preloaded. The files of the previous run are removed once the master
+# starts and those of a worker that exited are marked dead, so the gauges of
+# the requests in flight etc. drop its values.
+if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+
+def on_starting(server):
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
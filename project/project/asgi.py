@@ -0,0 +1,21 @@
+"""
+ASGI config for project project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Django 2.1 has no ASGI handler of its own (django.core.asgi arrives in Django
+3.0), so the WSGI application is wrapped with core.asgi.PooledWsgiToAsgi. It
+reads request bodies and sends responses on the event loop and runs the views
+in a pool of ASGI_THREADS threads, so slow clients don't hold a thread or a db
+connection. Serve it with uvicorn workers, see gunicorn.conf.py.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
+
+from core.asgi import PooledWsgiToAsgi  # noqa: E402 settings module has to be set first
+
+application = PooledWsgiToAsgi(get_wsgi_application())
@@ -23,9 +23,9 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = 'r99bi0zt+3d+ujidt7$3+k(ypf$$uquisew$0tg205+a@u6^1*'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1' #docker-compose.prod.yml sets DJANGO_DEBUG=0, with DEBUG on every query is kept in memory
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host] #comma separated, needed once DEBUG is off
 
 
 # Application definition
@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres', #search and trigram lookups
     'rest_framework',
     'rest_framework.authtoken', #for authentication using tokens
     'core',
@@ -45,7 +46,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware', #first so the latencies include the other middleware
+    'core.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware', #before the middleware reading or changing the response body
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -78,16 +82,36 @@ WSGI_APPLICATION = 'project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
+DB_POOL_MODE = os.environ.get('DB_POOL_MODE', '') #set to pgbouncer when DB_HOST is a PgBouncer in transaction pooling mode
+
 DATABASES = {
     'default': { #updating django settings to use postgre database
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.backends.postgresql', #django's postgresql backend plus CONN_HEALTH_CHECKS
         'HOST': os.environ.get('DB_HOST'), #using environment variable of docker-compose file.Useful as we can easily change our configurations when we run our app on diff servers by simply changing them in the environment variables and no need to make changes to source code.
+        'PORT': os.environ.get('DB_PORT', ''),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0 if DEBUG else 60)), #seconds a thread keeps its connection open for the next requests instead of connecting for every request, 0 closes it after each request.Off by default with DEBUG as runserver starts a new thread per request, whose connection would linger
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1', #check a reused connection still works before the first query of a request
+        'DISABLE_SERVER_SIDE_CURSORS': DB_POOL_MODE == 'pgbouncer', #in transaction pooling the next statement may run on another server connection, where a cursor declared by the previous one doesn't exist
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+
+CACHES = {
+    'default': { #local memory by default(and in tests), point CACHE_BACKEND/CACHE_LOCATION at memcached or any other shared backend so all the workers share the cached responses
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
+RECIPE_RESPONSE_CACHE = 'default' #alias in CACHES used for the list responses of the recipe api and the per user versions
+RECIPE_RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RECIPE_RESPONSE_CACHE_TIMEOUT', 300)) #seconds a cached list response is kept, stale entries are never served as the version in their key changes
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -108,6 +132,31 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# https://docs.djangoproject.com/en/2.1/topics/auth/passwords/
+
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'argon2') #argon2, bcrypt or pbkdf2, the hasher of new passwords
+PASSWORD_HASHERS = sorted([
+    'user.hashers.Argon2PasswordHasher',
+    'user.hashers.BCryptSHA256PasswordHasher',
+    'user.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+], key=lambda path: not path.lower().startswith('user.hashers.' + PASSWORD_HASHER)) #PASSWORD_HASHER first, the others only verify older hashes, which are rehashed with the first one at their next login
+
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2))
+PASSWORD_ARGON2_MEMORY_COST = int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 512)) #KiB
+PASSWORD_ARGON2_PARALLELISM = int(os.environ.get('PASSWORD_ARGON2_PARALLELISM', 2))
+PASSWORD_BCRYPT_ROUNDS = int(os.environ.get('PASSWORD_BCRYPT_ROUNDS', 12))
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 120000))
+
+# Failed logins (user.throttling.LoginFailureThrottle)
+
+LOGIN_THROTTLE_CACHE = 'default' #alias in CACHES counting the failures, a shared one makes the limits apply across workers
+LOGIN_FAILURES_PER_EMAIL = int(os.environ.get('LOGIN_FAILURES_PER_EMAIL', 5))
+LOGIN_FAILURES_PER_IP = int(os.environ.get('LOGIN_FAILURES_PER_IP', 50))
+LOGIN_FAILURE_WINDOW = int(os.environ.get('LOGIN_FAILURE_WINDOW', 900)) #seconds the failures are counted for
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/2.1/topics/i18n/
 
@@ -131,4 +180,87 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = '/vol/web/media/'
 STATIC_URL = '/vol/web/static/'
 
-AUTH_USER_MODEL = 'core.User' #assigning User model of our core app as custom User model
\ No newline at end of file
+# Recipe images (recipe.images, recipe.uploads)
+
+RECIPE_IMAGE_RENDITIONS = {
+    'thumb': 160,
+    'small': 480,
+    'medium': 960,
+} #name -> longest edge in px of the resized copies made of every uploaded recipe image
+RECIPE_IMAGE_WORKERS = int(os.environ.get('RECIPE_IMAGE_WORKERS', 2)) #threads per process making the renditions after the upload request returns, 0 makes them inline right after the upload is committed
+RECIPE_IMAGE_MAX_BYTES = int(os.environ.get('RECIPE_IMAGE_MAX_BYTES', 10 * 1024 * 1024)) #largest image upload accepted, the upload is cut off as soon as it streams past this
+RECIPE_IMAGE_MAX_PIXELS = int(os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 40000000)) #width * height an uploaded image can have, read from its header before anything is decoded
+
+# ASGI (core.asgi, project/asgi.py)
+
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 4)) #threads per process the views run in when served through project.asgi, each keeps its own db connection
+ASGI_MAX_BODY_BYTES = int(os.environ.get('ASGI_MAX_BODY_BYTES', RECIPE_IMAGE_MAX_BYTES + 1024 * 1024)) #larger request bodies get a 413 as soon as they go past it, they are read whole before a view runs.The image uploads are the largest, with room for their multipart headers
+
+# Recipe search (recipe.search, recipe.filters)
+
+RECIPE_SEARCH_CONFIG = os.environ.get('RECIPE_SEARCH_CONFIG', 'english') #postgres text search configuration the ?q= words and the recipe search vectors are stemmed with, changing it needs the vectors rebuilt
+
+AUTH_USER_MODEL = 'core.User' #assigning User model of our core app as custom User model
+
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'recipe.pagination.KeysetPagination', #cursor pagination so list endpoints never load every row a user owns
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 100)), #default page size when the client doesn't send ?page_size=
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer', #same bytes as rest_framework.renderers.JSONRenderer, encoded with orjson
+        'core.renderers.MessagePackRenderer', #Accept: application/msgpack
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'core.parsers.MessagePackParser', #Content-Type: application/msgpack
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
+
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 1000)) #largest ?page_size= a client is allowed to ask for
+API_MAX_BULK_SIZE = int(os.environ.get('API_MAX_BULK_SIZE', 1000)) #most items accepted by one request to the /bulk/ endpoints
+
+
+# Response compression (core.middleware.CompressionMiddleware)
+
+RESPONSE_COMPRESSION = os.environ.get('RESPONSE_COMPRESSION', 'br,gzip') #codings offered in order of preference, empty turns compression off i.e when a proxy in front already compresses
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', 1024)) #smaller responses are sent as they are, compressing them saves less than it costs
+RESPONSE_BROTLI_QUALITY = int(os.environ.get('RESPONSE_BROTLI_QUALITY', 4)) #0-11, the higher ones compress better but are far too slow for responses made on every request
+
+
+# Metrics (core.metrics, /metrics)
+
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '') #bearer token prometheus has to send to read /metrics, leave empty when only the internal network reaches it
+
+
+# Request timing (core.middleware.RequestTimingMiddleware)
+
+REQUEST_TIMING_SAMPLE_RATE = float(os.environ.get('REQUEST_TIMING_SAMPLE_RATE', 0.01)) #fraction of the requests timed, 0 turns the middleware off and 1 times every request
+REQUEST_TIMING_REPEATED_QUERIES = int(os.environ.get('REQUEST_TIMING_REPEATED_QUERIES', 5)) #a request running the same query shape more times than this is logged as a warning
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.middleware': { #a json line per timed request
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_TIMING_LOG_LEVEL', 'WARNING' if DEBUG else 'INFO'), #only the repeated queries while developing
+            'propagate': False,
+        },
+    },
+}
+
+
+# Token authentication cache (user.authentication.CachedTokenAuthentication)
+
+TOKEN_AUTH_CACHE_SIZE = int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 10000)) #max tokens kept in the in-process cache of each worker
+TOKEN_AUTH_CACHE_TTL = int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 60)) #seconds a cached token is trusted without asking the db
+TOKEN_AUTH_SHARED_CACHE = os.environ.get('TOKEN_AUTH_SHARED_CACHE') #alias in CACHES of a cache shared by all workers, leave unset to only use the in-process cache
\ No newline at end of file
@@ -18,7 +18,12 @@ from django.urls import path,include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core import views as core_views
+
 urlpatterns = [
+    path('health/live/', core_views.liveness, name='liveness'), #probes for orchestrators, outside /api/ so they skip authentication
+    path('health/ready/', core_views.readiness, name='readiness'),
+    path('metrics', core_views.metrics, name='metrics'), #scraped by prometheus
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
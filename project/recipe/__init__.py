@@ -0,0 +1 @@
+default_app_config = 'recipe.apps.RecipeConfig' #so django uses RecipeConfig and its ready() hook
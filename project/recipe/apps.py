@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class RecipeConfig(AppConfig):
     name = 'recipe'
+
+    def ready(self): #connecting the signal receivers that invalidate the cached list responses
+        from recipe import signals  # noqa: F401
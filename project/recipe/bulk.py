@@ -0,0 +1,123 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Value, When
+from django.db.models.functions import Cast
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from recipe.cache import bump_user_version
+
+
+BATCH_SIZE = 1000 #rows per INSERT/UPDATE statement
+
+
+def is_valid_id(pk): #An id as the bulk endpoints accept them, an int that isn't a bool(True == 1).Checked before any dict lookup as JSON can send unhashable lists and dicts
+	return isinstance(pk, int) and not isinstance(pk, bool)
+
+
+def bulk_insert(model, objs): #Insert objs with multi row INSERTs and return them with their ids set
+	if connection.features.can_return_ids_from_bulk_insert: #i.e postgres returns the new ids so m2m links can be created right away
+		return model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+
+	for obj in objs: #other databases don't return the ids of a bulk insert
+		obj.save(force_insert=True)
+	return objs
+
+
+def bulk_update(model, objs, fields): #Save fields of objs with one UPDATE ... SET field = CASE id WHEN .. THEN .. END per batch(what QuerySet.bulk_update does from django 2.2 onwards)
+	fields = [model._meta.get_field(name) for name in fields]
+	if not objs or not fields:
+		return
+
+	for start in range(0, len(objs), BATCH_SIZE):
+		batch = objs[start:start + BATCH_SIZE]
+		updates = {}
+		for field in fields:
+			whens = [When(pk=obj.pk, then=Value(getattr(obj, field.attname))) for obj in batch]
+			updates[field.attname] = Cast(Case(*whens, output_field=field), output_field=field) #cast as postgres can't infer the type of a CASE over plain parameters
+		model.objects.filter(pk__in=[obj.pk for obj in batch]).update(**updates)
+
+
+class BulkListSerializer(serializers.ListSerializer): #ListSerializer used by the bulk endpoints, all the items are validated before one multi row statement writes them. https://www.django-rest-framework.org/api-guide/serializers/#customizing-multiple-create
+
+	def create(self, validated_data):
+		model = self.child.Meta.model
+		return bulk_insert(model, [model(**attrs) for attrs in validated_data])
+
+	def update(self, instances, validated_data): #instances is the list of objects in the same order as the items of the payload
+		fields = set()
+		for instance, attrs in zip(instances, validated_data):
+			for attr, value in attrs.items():
+				setattr(instance, attr, value)
+				fields.add(attr)
+
+		bulk_update(self.child.Meta.model, instances, fields)
+		return instances
+
+
+class BulkModelMixin: #Adds POST/PATCH/DELETE <list url>/bulk/ to a viewset to create, update or delete many objects in one request
+	'''POST takes a list of objects, PATCH a list of objects with their id(plus the fields to change) and DELETE a
+	list of ids.At most settings.API_MAX_BULK_SIZE items are accepted per request.Every item is validated first and
+	the errors come back as a list with one entry per item({} for the valid ones), nothing is written unless all
+	the items are valid and the writes run in a single transaction.'''
+
+	@action(methods=['POST', 'PATCH', 'DELETE'], detail=False, url_path='bulk')
+	def bulk(self, request):
+		handler = {
+			'POST': self.bulk_create,
+			'PATCH': self.bulk_update,
+			'DELETE': self.bulk_destroy,
+		}[request.method]
+		response = handler(request, self.get_bulk_items(request.data))
+		bump_user_version(request.user.id) #bulk writes don't send post_save/m2m_changed signals
+		return response
+
+	def get_bulk_items(self, data):
+		if not isinstance(data, list) or not data:
+			raise ValidationError({'non_field_errors': [_('Expected a non empty list of items.')]})
+		if len(data) > settings.API_MAX_BULK_SIZE:
+			raise ValidationError({'non_field_errors': [
+				_('Expected at most {} items.').format(settings.API_MAX_BULK_SIZE)
+			]})
+		return data
+
+	def get_bulk_instances(self, ids): #Objects of the current user for ids in the same order, and the per item errors for the ids that aren't valid or don't exist
+		found = self.get_queryset().in_bulk([pk for pk in ids if is_valid_id(pk)])
+		instances = [found.get(pk) if is_valid_id(pk) else None for pk in ids]
+		errors = [{} if instance else {'id': [_('Not found.')]} for instance in instances]
+		return instances, errors
+
+	@transaction.atomic
+	def bulk_create(self, request, items):
+		serializer = self.get_serializer(data=items, many=True)
+		serializer.is_valid(raise_exception=True)
+		serializer.save(user=request.user)
+		return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+	@transaction.atomic
+	def bulk_update(self, request, items):
+		ids = [item.get('id') if isinstance(item, dict) else None for item in items]
+		instances, errors = self.get_bulk_instances(ids)
+		serializer = self.get_serializer(instances, data=items, many=True, partial=True)
+		if not serializer.is_valid():
+			if not isinstance(serializer.errors, list): #not per item errors
+				raise ValidationError(serializer.errors)
+			errors = [dict(id_error, **item_error) for id_error, item_error in zip(errors, serializer.errors)]
+		if any(errors):
+			raise ValidationError(errors)
+
+		serializer.save()
+		return Response(serializer.data)
+
+	@transaction.atomic
+	def bulk_destroy(self, request, ids):
+		instances, errors = self.get_bulk_instances(ids)
+		if any(errors):
+			raise ValidationError(errors)
+
+		self.get_queryset().filter(pk__in=[instance.pk for instance in instances]).delete()
+		return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,91 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.metrics import record_cache_lookup
+
+
+def response_cache(): #Cache backend holding the list responses and the per user versions, configured by RECIPE_RESPONSE_CACHE
+	return caches[settings.RECIPE_RESPONSE_CACHE]
+
+
+def _version_key(user_id):
+	return 'recipe:version:{}'.format(user_id)
+
+
+def get_user_version(user_id): #Current version of the data of a user.Starts from the clock in ms so a version evicted from the cache never comes back with a value that was already used
+	cache = response_cache()
+	key = _version_key(user_id)
+	version = cache.get(key)
+	if version is None:
+		cache.add(key, int(time.time() * 1000), None) #add so concurrent requests agree on one initial value
+		version = cache.get(key)
+	return version
+
+
+def bump_user_version(user_id): #Invalidate every cached response of a user by moving them to a new version.Called by recipe/signals.py on every change to their recipes,tags and ingredients
+	cache = response_cache()
+	try:
+		cache.incr(_version_key(user_id))
+	except ValueError: #incr raises when the key is missing
+		cache.set(_version_key(user_id), int(time.time() * 1000), None)
+
+
+def normalize_query_params(query_params, id_list_params=()): #Canonical form of the query params so equivalent urls share a cache entry i.e ?tags=2,1&page_size=5 and ?page_size=5&tags=1,2
+	normalized = []
+	for param in sorted(query_params):
+		values = [value for value in query_params.getlist(param) if value != '']
+		if param in id_list_params:
+			values = [','.join(sorted(set(','.join(values).split(','))))]
+		normalized.extend('{}={}'.format(param, value) for value in sorted(values))
+	return '&'.join(normalized)
+
+
+class CachedListMixin: #Serve the list action of a viewset from a per user response cache with ETag/If-None-Match support
+	'''The cache key is made of the user, the url path, the normalized query params, the negotiated renderer and the
+	version of the user's data.Any create/update/delete of a user's recipes,tags or ingredients(including m2m
+	changes) bumps the version so stale entries are never read again and simply expire.The key doubles as the
+	ETag, a client sending it back in If-None-Match gets a 304 without the list being queried or rendered.'''
+
+	cache_id_list_params = ('tags', 'ingredients') #comma separated id params whose order doesn't matter
+
+	def list(self, request, *args, **kwargs):
+		key = self.get_list_cache_key(request)
+		etag = '"{}"'.format(key.rsplit(':', 1)[-1])
+
+		if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+			response = Response(status=status.HTTP_304_NOT_MODIFIED)
+		else:
+			cache = response_cache()
+			cached = cache.get(key)
+			record_cache_lookup('recipe_list', cached is not None)
+			if cached is not None:
+				data, headers = cached
+				response = Response(data, headers=headers)
+			else:
+				response = super().list(request, *args, **kwargs)
+				headers = {'Link': response['Link']} if response.has_header('Link') else None
+				cache.set(key, (response.data, headers), settings.RECIPE_RESPONSE_CACHE_TIMEOUT)
+
+		response['ETag'] = etag
+		response['Cache-Control'] = 'private, no-cache' #clients may keep it but have to revalidate with the ETag
+		patch_vary_headers(response, ('Authorization',))
+		return response
+
+	def get_list_cache_key(self, request):
+		version = get_user_version(request.user.id)
+		params = normalize_query_params(request.query_params, self.cache_id_list_params)
+		digest = hashlib.sha1('|'.join((
+			str(request.user.id),
+			request.path,
+			params,
+			request.accepted_renderer.format,
+			str(version),
+		)).encode('utf-8')).hexdigest()
+		return 'recipe:list:{}:{}'.format(request.user.id, digest)
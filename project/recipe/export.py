@@ -0,0 +1,109 @@
+import csv
+import json
+from collections import defaultdict
+
+from django.core.serializers.json import DjangoJSONEncoder #handles the Decimal prices
+from django.db import connections
+
+from rest_framework.negotiation import BaseContentNegotiation
+
+from core.models import Recipe
+
+
+CHUNK_SIZE = 2000 #recipes fetched per round trip, the tags and ingredients are fetched once per chunk
+CSV_LIST_SEPARATOR = '|' #joins the tag and ingredient names in a single csv column
+EXPORT_FIELDS = ('id', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients')
+
+
+def iter_recipes(queryset, chunk_size=CHUNK_SIZE): #Yield every recipe of queryset as a dict with its tags and ingredients as lists of {'id', 'name'}, holding at most one chunk of recipes in memory
+	rows = queryset.order_by('id').values_list('id', 'title', 'time_minutes', 'price', 'link')
+	for chunk in _chunks(rows, chunk_size):
+		yield from _with_related(chunk)
+
+
+def _chunks(rows, chunk_size): #Split rows(ordered by id) in lists of chunk_size rows without loading them all
+	if connections[rows.db].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'): #i.e behind PgBouncer, every chunk is its own query starting after the last id of the previous one
+		chunk = list(rows[:chunk_size])
+		while chunk:
+			yield chunk
+			if len(chunk) < chunk_size:
+				return
+			chunk = list(rows.filter(id__gt=chunk[-1][0])[:chunk_size])
+		return
+
+	chunk = []
+	for row in rows.iterator(chunk_size=chunk_size): #iterator() streams through a server side cursor on postgres instead of loading every row, it ignores prefetch_related so the related rows are batched per chunk by hand in _with_related
+		chunk.append(row)
+		if len(chunk) == chunk_size:
+			yield chunk
+			chunk = []
+	if chunk:
+		yield chunk
+
+
+def _with_related(chunk): #Attach the tags and ingredients of a chunk of recipe rows with one query per relation
+	ids = [row[0] for row in chunk]
+	related = {field: _related_names(field, ids) for field in ('tags', 'ingredients')}
+	for recipe_id, title, time_minutes, price, link in chunk:
+		yield {
+			'id': recipe_id,
+			'title': title,
+			'time_minutes': time_minutes,
+			'price': price,
+			'link': link,
+			'tags': related['tags'].get(recipe_id, []),
+			'ingredients': related['ingredients'].get(recipe_id, []),
+		}
+
+
+def _related_names(field, recipe_ids): #Map recipe id -> [{'id', 'name'}] for the tags or ingredients of recipe_ids
+	relation = getattr(Recipe, field).field
+	attr = relation.m2m_reverse_field_name() #i.e tag or ingredient
+	links = relation.remote_field.through.objects.filter(
+		recipe_id__in=recipe_ids
+	).order_by(attr).values_list('recipe_id', attr, '{}__name'.format(attr))
+
+	related = defaultdict(list)
+	for recipe_id, pk, name in links:
+		related[recipe_id].append({'id': pk, 'name': name})
+	return related
+
+
+def ndjson_lines(recipes): #One JSON object per line
+	for recipe in recipes:
+		yield json.dumps(recipe, cls=DjangoJSONEncoder) + '\n'
+
+
+class _Echo: #File-like object whose write() just returns the line so csv.writer can be used in a generator. https://docs.djangoproject.com/en/2.1/howto/outputting-csv/#streaming-large-csv-files
+	def write(self, value):
+		return value
+
+
+def csv_lines(recipes): #Header line then one line per recipe, tags and ingredients are their names joined by CSV_LIST_SEPARATOR
+	writer = csv.writer(_Echo())
+	yield writer.writerow(EXPORT_FIELDS)
+	for recipe in recipes:
+		yield writer.writerow([
+			CSV_LIST_SEPARATOR.join(item['name'] for item in recipe[field]) if field in ('tags', 'ingredients') else recipe[field]
+			for field in EXPORT_FIELDS
+		])
+
+
+EXPORT_FORMATS = {
+	'ndjson': (ndjson_lines, 'application/x-ndjson'),
+	'csv': (csv_lines, 'text/csv'),
+} #format name -> (line generator, content type)
+
+
+def export_lines(queryset, export_format, chunk_size=CHUNK_SIZE): #Lines of the export of queryset in export_format, generated lazily
+	lines, content_type = EXPORT_FORMATS[export_format]
+	return lines(iter_recipes(queryset, chunk_size))
+
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation): #The export picks its own content type from ?output= so a client sending Accept: text/csv shouldn't get a 406 from the json renderers. https://www.django-rest-framework.org/api-guide/content-negotiation/#example
+
+	def select_parser(self, request, parsers):
+		return parsers[0]
+
+	def select_renderer(self, request, renderers, format_suffix=None):
+		return (renderers[0], renderers[0].media_type)
@@ -0,0 +1,113 @@
+from operator import itemgetter
+
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import IntegerField, OuterRef, Subquery
+
+from rest_framework.response import Response
+
+from core.timing import timed
+
+from recipe import serializers
+from recipe.images import image_rendition_urls
+
+
+class ArraySubquery(Subquery): #ARRAY(SELECT ...), the one column of the subquery for every outer row as an array, empty rather than NULL when there are no rows
+	template = 'ARRAY(%(subquery)s)'
+
+
+def related_ids(relation): #ArraySubquery of the ids linked to the outer recipe through the m2m relation, in id order like the prefetches of RecipeQuerySet
+	field = relation.field
+	recipe_column = '{}_id'.format(field.m2m_field_name())
+	attr_column = '{}_id'.format(field.m2m_reverse_field_name())
+	return ArraySubquery(
+		relation.through.objects.filter(**{recipe_column: OuterRef('pk')}).order_by(attr_column).values(attr_column),
+		output_field=ArrayField(IntegerField())
+	) #answered from the unique (recipe_id, x_id) index of the through table
+
+
+class ValuesReader: #Read only twin of a ModelSerializer, turning values() rows into the same dicts as its to_representation for list responses
+	'''Once the queries are fixed most of the CPU time of a large list goes to DRF building a field object per field and
+	calling its to_representation per value.A reader selects the columns of the fields with values(), gets the
+	ids of many to many relations as arrays from the db and builds each item with one dict comprehension.A field is
+	output by the reader's represent_<field>(row) when it has one and as it comes from the db otherwise, which is
+	what the serializer does for id, integer and char fields.recipe/tests/test_fastpath.py checks the responses
+	are byte for byte the ones of the serializers.'''
+
+	serializer_class = None
+
+	def __init__(self, request, fields=None):
+		self.request = request
+		self.fields = fields or self.serializer_class.Meta.fields
+
+	def get_values(self, queryset, extra=()): #queryset as values() rows holding the columns of the fields, plus extra ones(i.e the ordering the paginator reads)
+		opts = queryset.model._meta
+		sources = getattr(self.serializer_class, 'field_sources', {})
+		columns, arrays = list(extra), {}
+		for name in self.fields:
+			if name in sources:
+				columns.extend(sources[name])
+			elif opts.get_field(name).many_to_many:
+				arrays[self._array_name(name)] = related_ids(getattr(queryset.model, name))
+			else:
+				columns.append(name)
+		return queryset.prefetch_related(None).values(*dict.fromkeys(columns), **arrays)
+
+	def to_representation(self, rows):
+		getters = [(name, self._getter(name)) for name in self.fields]
+		with timed('serialize'):
+			return [{name: getter(row) for name, getter in getters} for row in rows]
+
+	def _getter(self, name):
+		represent = getattr(self, 'represent_{}'.format(name), None)
+		if represent is not None:
+			return represent
+		if name in self._many_to_many():
+			return itemgetter(self._array_name(name))
+		return itemgetter(name)
+
+	def _many_to_many(self):
+		return {field.name for field in self.serializer_class.Meta.model._meta.many_to_many}
+
+	@staticmethod
+	def _array_name(name): #values() can't name an annotation after a field of the model
+		return '{}_ids'.format(name)
+
+
+class TagReader(ValuesReader):
+	serializer_class = serializers.TagSerializer
+
+
+class IngredientReader(ValuesReader):
+	serializer_class = serializers.IngredientSerializer
+
+
+class RecipeReader(ValuesReader):
+	serializer_class = serializers.RecipeSerializer
+
+	def represent_price(self, row): #DecimalField renders the numeric(5, 2) column as a string with its 2 decimal places
+		return '{:f}'.format(row['price'])
+
+	def represent_renditions(self, row):
+		return image_rendition_urls(row['image'], row['renditions_ready'], self.request)
+
+
+class FastListMixin: #Serve the list action of a viewset from values() rows through its reader_class instead of its serializer
+	reader_class = None
+
+	def get_reader(self): #Reader for the current list request, None to go through the serializer
+		return self.reader_class(self.request)
+
+	def list(self, request, *args, **kwargs):
+		reader = self.get_reader()
+		if reader is None:
+			return super().list(request, *args, **kwargs)
+
+		ordering = self.get_ordering() if hasattr(self, 'get_ordering') else getattr(self, 'ordering', ())
+		rows = reader.get_values(
+			self.filter_queryset(self.get_queryset()),
+			extra=[field.lstrip('-') for field in ordering]
+		)
+		page = self.paginate_queryset(rows)
+		if page is not None:
+			return self.get_paginated_response(reader.to_representation(page))
+		return Response(reader.to_representation(rows))
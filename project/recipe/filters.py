@@ -0,0 +1,163 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Count, Exists, F, OuterRef, Value
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import fields
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend #https://www.django-rest-framework.org/api-guide/filtering/#custom-generic-filtering
+
+from core.models import Recipe
+
+from recipe.search import TrigramWordSimilarity, cursor_safe
+
+
+MODE_ANY = 'any'
+MODE_ALL = 'all'
+SEARCH_PARAM = 'q'
+ORDERING_PARAM = 'ordering'
+
+
+def search_terms(request): #Text searched for with ?q=, empty when the request isn't a search
+	return request.query_params.get(SEARCH_PARAM, '').strip()
+
+
+def ordering_param(request, allowed): #Keyset ordering asked for with ?ordering=price(ascending) or ?ordering=-price, with id breaking ties in the same direction so one index serves both.None when the param isn't given
+	value = request.query_params.get(ORDERING_PARAM)
+	if not value:
+		return None
+	field = value[1:] if value.startswith('-') else value
+	if field not in allowed:
+		raise ValidationError({ORDERING_PARAM: [
+			_('Expected one of: {}, optionally prefixed with - for descending.').format(', '.join(allowed))
+		]})
+	if field == 'id':
+		return (value,)
+	return (value, '-id' if value.startswith('-') else 'id')
+
+
+def params_to_ints(param, value): #Convert a comma separated string of ids from the query param `param` to a list of integers, raising a 400 instead of a 500 when one of them isn't an id
+	try:
+		ids = [int(str_id) for str_id in value.split(',')]
+	except ValueError:
+		ids = None
+	if not ids or any(id_ <= 0 for id_ in ids):
+		raise ValidationError({param: [_('Expected a comma separated list of ids.')]})
+	return ids
+
+
+class RecipeAttrFilter(BaseFilterBackend): #Filter recipes by tag and ingredient ids i.e ?tags=1,2&tags_mode=all&ingredients=3
+	'''Each filter is a semi-join subquery on the m2m through table(recipe id IN (SELECT recipe_id ...)) instead
+	of a join on it, so a recipe matching several of the ids is still returned once and combining the tags and
+	ingredients filters doesn't multiply rows. `<param>_mode=any`(the default) returns recipes that have at least
+	one of the ids and `<param>_mode=all` returns recipes that have every one of them.'''
+
+	relations = (
+		('tags', Recipe.tags),
+		('ingredients', Recipe.ingredients),
+	) #query param and the Recipe m2m it filters on
+
+	def filter_queryset(self, request, queryset, view):
+		for param, relation in self.relations:
+			value = request.query_params.get(param)
+			if value:
+				ids = params_to_ints(param, value)
+				mode = self.get_mode(request, param)
+				queryset = queryset.filter(pk__in=self.matching_recipe_ids(relation, ids, mode))
+
+		return queryset
+
+	def get_mode(self, request, param):
+		mode_param = '{}_mode'.format(param)
+		mode = request.query_params.get(mode_param, MODE_ANY)
+		if mode not in (MODE_ANY, MODE_ALL):
+			raise ValidationError({mode_param: [_('Expected "any" or "all".')]})
+		return mode
+
+	def matching_recipe_ids(self, relation, ids, mode): #Subquery of the ids of the recipes linked to any/all of ids through the relation's through table
+		field = relation.field
+		recipe_column = '{}_id'.format(field.m2m_field_name()) #i.e recipe_id
+		attr_column = '{}_id'.format(field.m2m_reverse_field_name()) #i.e tag_id or ingredient_id
+		links = relation.through.objects.filter(**{'{}__in'.format(attr_column): ids})
+		if mode == MODE_ALL: #the recipes that have a link to every distinct id
+			links = links.values(recipe_column).annotate(
+				matched=Count(attr_column, distinct=True)
+			).filter(matched=len(set(ids)))
+
+		return links.values(recipe_column)
+
+
+class RecipeRangeFilter(BaseFilterBackend): #Filter recipes by their preparation time and price i.e ?max_time=20&min_price=2.50&max_price=10
+	'''The values are validated with the same rules as the Recipe fields and the bounds are inclusive.Combined
+	with ?ordering=time_minutes or ?ordering=price the page is read from the (user, time_minutes, id, price) or
+	(user, price, id, time_minutes) index, the other bound being checked on the index entries.'''
+
+	ranges = (
+		('max_time', 'time_minutes__lte', fields.IntegerField(min_value=0)),
+		('min_price', 'price__gte', fields.DecimalField(max_digits=5, decimal_places=2)),
+		('max_price', 'price__lte', fields.DecimalField(max_digits=5, decimal_places=2)),
+	) #query param, lookup and the field validating its value
+
+	def filter_queryset(self, request, queryset, view):
+		for param, lookup, field in self.ranges:
+			value = request.query_params.get(param)
+			if value:
+				try:
+					value = field.run_validation(value)
+				except ValidationError as exc:
+					raise ValidationError({param: exc.detail})
+				queryset = queryset.filter(**{lookup: value})
+
+		return queryset
+
+
+class AssignedOnlyFilter(BaseFilterBackend): #Filter tags/ingredients down to the ones assigned to at least one recipe i.e ?assigned_only=1
+	'''Uses a correlated EXISTS on the m2m through table rather than joining the recipes so a tag used by many
+	recipes is returned once.'''
+
+	def filter_queryset(self, request, queryset, view):
+		if not request.query_params.get('assigned_only'):
+			return queryset
+
+		through, attr_column = self.get_through(queryset.model)
+		return queryset.annotate(
+			assigned=Exists(through.objects.filter(**{attr_column: OuterRef('pk')}))
+		).filter(assigned=True) #django 2.1 can't filter on an Exists expression directly so it goes through an annotation
+
+	def get_through(self, model): #Through model of the Recipe m2m pointing at model and the name of its column for model
+		for field in Recipe._meta.many_to_many:
+			if field.related_model is model:
+				return field.remote_field.through, '{}_id'.format(field.m2m_reverse_field_name())
+		raise ValueError('Recipe has no many to many field to {}'.format(model.__name__))
+
+
+class RecipeSearchFilter(BaseFilterBackend): #Full text search of recipes i.e ?q=spicy chicken
+	'''Matches the words of q, stemmed with settings.RECIPE_SEARCH_CONFIG so "chickens" finds "chicken", against
+	Recipe.search_vector through its GIN index and annotates every match with its `rank`.Titles weigh more than
+	tag names which weigh more than ingredient names(see recipe.search).The view orders the results by rank
+	before its usual ordering.'''
+
+	def filter_queryset(self, request, queryset, view):
+		terms = search_terms(request)
+		if not terms:
+			return queryset
+
+		query = SearchQuery(terms, config=settings.RECIPE_SEARCH_CONFIG) #plainto_tsquery, every word has to match
+		return queryset.annotate(
+			rank=cursor_safe(SearchRank(F('search_vector'), query))
+		).filter(search_vector=query)
+
+
+class NameSearchFilter(BaseFilterBackend): #Autocomplete of tag/ingredient names i.e ?q=chick finds "Chicken", and typos like ?q=chiken too
+	'''A name matches when q is similar enough to some run of whole words in it(pg_trgm's word similarity,
+	answered from the trigram index on name), and matches are annotated with their `similarity` so the view can
+	list the closest ones first.'''
+
+	def filter_queryset(self, request, queryset, view):
+		terms = search_terms(request)
+		if not terms:
+			return queryset
+
+		return queryset.filter(name__trigram_word_similar=terms).annotate(
+			similarity=cursor_safe(TrigramWordSimilarity(Value(terms), F('name')))
+		)
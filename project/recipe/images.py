@@ -0,0 +1,139 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+
+from core.metrics import IMAGE_QUEUE_DEPTH
+from core.models import Recipe
+
+from recipe.cache import bump_user_version
+
+
+logger = logging.getLogger(__name__)
+
+RENDITION_FORMATS = (
+	('webp', 'WEBP', {'quality': 80, 'method': 4}),
+	('jpeg', 'JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+) #(extension, Pillow format, save options) of each rendition, saving without an exif argument is what strips the EXIF data
+
+EXIF_ORIENTATION = 0x0112
+ORIENTATION_TRANSPOSE = {
+	2: (Image.FLIP_LEFT_RIGHT,),
+	3: (Image.ROTATE_180,),
+	4: (Image.FLIP_TOP_BOTTOM,),
+	5: (Image.TRANSPOSE,),
+	6: (Image.ROTATE_270,),
+	7: (Image.TRANSVERSE,),
+	8: (Image.ROTATE_90,),
+} #EXIF orientation -> transpose to apply so the pixels are upright once the EXIF data is gone
+
+
+def rendition_path(image_name, size): #Path of a rendition next to the uploads i.e uploads/recipe/renditions/<name of the original>_small.webp without the extension
+	stem = os.path.splitext(os.path.basename(image_name))[0]
+	return os.path.join('uploads/recipe/renditions/', '{}_{}'.format(stem, size))
+
+
+def rendition_urls(recipe, request=None): #Map size -> {format: url} of the renditions of a recipe image, empty until the pipeline has made them
+	return image_rendition_urls(recipe.image.name, recipe.renditions_ready, request)
+
+
+def image_rendition_urls(image_name, renditions_ready, request=None): #rendition_urls from the image name and renditions_ready columns, i.e of a values() row
+	if not image_name or not renditions_ready:
+		return {}
+
+	urls = {}
+	for size in settings.RECIPE_IMAGE_RENDITIONS:
+		path = rendition_path(image_name, size)
+		urls[size] = {}
+		for extension, image_format, options in RENDITION_FORMATS:
+			url = default_storage.url('{}.{}'.format(path, extension))
+			urls[size][extension] = request.build_absolute_uri(url) if request is not None else url
+	return urls
+
+
+def _upright(image): #Apply the EXIF orientation to the pixels(Pillow 5 has no ImageOps.exif_transpose)
+	try:
+		orientation = (image._getexif() or {}).get(EXIF_ORIENTATION)
+	except (AttributeError, KeyError, IndexError, SyntaxError, TypeError, ValueError):
+		orientation = None #not a jpeg, or broken exif data
+	for method in ORIENTATION_TRANSPOSE.get(orientation, ()):
+		image = image.transpose(method)
+	return image
+
+
+def create_renditions(recipe_id): #Make the resized WebP and JPEG renditions of the image of a recipe and flag them as ready
+	recipe = Recipe.objects.filter(pk=recipe_id).only('id', 'user_id', 'image').first()
+	if recipe is None or not recipe.image:
+		return
+
+	with recipe.image.storage.open(recipe.image.name, 'rb') as file:
+		original = _upright(Image.open(file))
+		original = original.convert('RGB') #drops alpha and palettes so every mode can be written as jpeg
+
+	for size, max_edge in settings.RECIPE_IMAGE_RENDITIONS.items():
+		resized = original.copy()
+		resized.thumbnail((max_edge, max_edge), Image.LANCZOS) #keeps the aspect ratio and never upscales
+		path = rendition_path(recipe.image.name, size)
+		for extension, image_format, options in RENDITION_FORMATS:
+			buffer = io.BytesIO()
+			resized.save(buffer, image_format, **options)
+			name = '{}.{}'.format(path, extension)
+			if default_storage.exists(name):
+				default_storage.delete(name)
+			default_storage.save(name, ContentFile(buffer.getvalue()))
+
+	updated = Recipe.objects.filter(pk=recipe_id, image=recipe.image.name).update(renditions_ready=True) #only if the image wasn't replaced in the meantime
+	if updated:
+		bump_user_version(recipe.user_id) #update() doesn't send post_save, the cached lists need the new urls
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(): #Pool of worker threads making the renditions, created on first use so every gunicorn worker process gets its own. Pillow releases the GIL while resizing and encoding
+	global _executor
+	with _executor_lock:
+		if _executor is None:
+			_executor = ThreadPoolExecutor(
+				max_workers=settings.RECIPE_IMAGE_WORKERS,
+				thread_name_prefix='renditions'
+			)
+	return _executor
+
+
+def _run(recipe_id):
+	close_old_connections() #the worker threads keep their own db connections, don't reuse broken or expired ones
+	try:
+		create_renditions(recipe_id)
+	except Exception:
+		logger.exception('Creating the renditions of recipe %s failed', recipe_id)
+	finally:
+		close_old_connections()
+
+
+def _run_queued(recipe_id):
+	try:
+		_run(recipe_id)
+	finally:
+		IMAGE_QUEUE_DEPTH.dec()
+
+
+def _submit(recipe_id):
+	IMAGE_QUEUE_DEPTH.inc()
+	get_executor().submit(_run_queued, recipe_id)
+
+
+def schedule_renditions(recipe_id): #Queue the renditions of a recipe image once the upload is committed so the request doesn't wait for them, RECIPE_IMAGE_WORKERS = 0 makes them inline instead
+	if not settings.RECIPE_IMAGE_WORKERS:
+		transaction.on_commit(lambda: _run(recipe_id))
+		return
+	transaction.on_commit(lambda: _submit(recipe_id))
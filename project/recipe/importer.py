@@ -0,0 +1,157 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.db.models import Max
+
+from core.models import Tag, Ingredient, Recipe
+
+from recipe.cache import bump_user_version
+from recipe.export import CSV_LIST_SEPARATOR
+from recipe.search import update_search_vectors
+
+
+class InvalidRecord(ValueError): #A record of the input file that can't be imported
+	pass
+
+
+def read_records(file, file_format): #Yield the raw records of an ndjson or csv file one at a time, parsing is left to parse_record so skipping records already imported stays cheap
+	if file_format == 'csv':
+		yield from csv.DictReader(file)
+	else:
+		for line in file:
+			if line.strip():
+				yield line
+
+
+def parse_record(raw, file_format): #Turn a raw record into the fields of a recipe plus the lists of tag and ingredient names, in the same shape export_recipes writes them
+	try:
+		record = json.loads(raw) if file_format == 'ndjson' else dict(raw)
+	except ValueError:
+		raise InvalidRecord('not valid json')
+	if not isinstance(record, dict):
+		raise InvalidRecord('expected an object')
+
+	title = str(record.get('title') or '').strip()
+	if not title or len(title) > 255:
+		raise InvalidRecord('title is required and at most 255 characters')
+	link = str(record.get('link') or '')
+	if len(link) > 255:
+		raise InvalidRecord('link is at most 255 characters')
+	try:
+		time_minutes = int(record.get('time_minutes'))
+		price = Decimal(str(record.get('price'))).quantize(Decimal('0.01'))
+	except (TypeError, ValueError, InvalidOperation):
+		raise InvalidRecord('time_minutes and price must be numbers')
+	if abs(price) >= 1000: #i.e max_digits=5, decimal_places=2
+		raise InvalidRecord('price must be less than 1000')
+
+	return {
+		'title': title,
+		'time_minutes': time_minutes,
+		'price': price,
+		'link': link,
+		'tags': _parse_names(record.get('tags')),
+		'ingredients': _parse_names(record.get('ingredients')),
+	}
+
+
+def _parse_names(value): #Names from a list of names, a list of {'name': ..} objects or a CSV_LIST_SEPARATOR joined string
+	if not value:
+		return []
+	if isinstance(value, str):
+		value = value.split(CSV_LIST_SEPARATOR)
+	if not isinstance(value, list):
+		raise InvalidRecord('tags and ingredients must be lists')
+
+	names = []
+	for item in value:
+		name = str(item.get('name', '') if isinstance(item, dict) else item).strip()
+		if not name or len(name) > 255:
+			raise InvalidRecord('tag and ingredient names are required and at most 255 characters')
+		names.append(name)
+	return list(dict.fromkeys(names)) #drop repeated names, keeping their order
+
+
+class RecipeImporter: #Loads batches of parsed recipes for a user, reusing the tags and ingredients the user already has by name
+	'''On postgres every table is loaded with COPY ... FROM STDIN and the ids of the new rows are reserved from the
+	sequences first, so the m2m through rows can be written with COPY as well without reading anything back.
+	Other databases get the same rows through multi row INSERTs.'''
+
+	relations = (
+		('tags', Tag, Recipe.tags.through, 'tag_id'),
+		('ingredients', Ingredient, Recipe.ingredients.through, 'ingredient_id'),
+	)
+
+	def __init__(self, user):
+		self.user = user
+		self.use_copy = connection.vendor == 'postgresql'
+		self.ids_by_name = {} #field -> {name: id}, the dedupe map by (user, name), loaded once
+		for field, model, through, column in self.relations:
+			ids = {}
+			for name, pk in model.objects.filter(user=user).order_by('-id').values_list('name', 'id'):
+				ids[name] = pk #ordered by -id so duplicate names already in the db map to their oldest row
+			self.ids_by_name[field] = ids
+
+	@transaction.atomic
+	def load_batch(self, recipes): #Insert a batch of parsed recipes with their new tags, ingredients and links in one transaction
+		for field, model, through, column in self.relations:
+			known = self.ids_by_name[field]
+			new_names = list(dict.fromkeys(
+				name for recipe in recipes for name in recipe[field] if name not in known
+			))
+			new_ids = self._allocate_ids(model, len(new_names))
+			self._insert(model, ('id', 'user_id', 'name'), [
+				(pk, self.user.id, name) for pk, name in zip(new_ids, new_names)
+			])
+			known.update(zip(new_names, new_ids))
+
+		recipe_ids = self._allocate_ids(Recipe, len(recipes))
+		self._insert(Recipe, ('id', 'user_id', 'title', 'time_minutes', 'price', 'link', 'image', 'renditions_ready'), [
+			(pk, self.user.id, recipe['title'], recipe['time_minutes'], recipe['price'], recipe['link'], '', False)
+			for pk, recipe in zip(recipe_ids, recipes)
+		])
+		for field, model, through, column in self.relations:
+			known = self.ids_by_name[field]
+			self._insert(through, ('recipe_id', column), [
+				(pk, known[name]) for pk, recipe in zip(recipe_ids, recipes) for name in recipe[field]
+			])
+		update_search_vectors(recipe_ids)
+
+		transaction.on_commit(lambda: bump_user_version(self.user.id)) #nothing here sends model signals
+		return recipe_ids
+
+	def _allocate_ids(self, model, count): #Reserve count primary keys for model
+		if not count:
+			return []
+		if self.use_copy:
+			with connection.cursor() as cursor:
+				cursor.execute(
+					'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+					[model._meta.db_table, model._meta.pk.column, count]
+				)
+				return [row[0] for row in cursor.fetchall()]
+
+		start = (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1 #safe as the batch runs in a transaction that holds the write lock on sqlite
+		return list(range(start, start + count))
+
+	def _insert(self, model, columns, rows):
+		if not rows:
+			return
+		if not self.use_copy:
+			model.objects.bulk_create(model(**dict(zip(columns, row))) for row in rows)
+			return
+
+		buffer = io.StringIO()
+		csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows) #quoting everything so empty strings aren't read back as NULL
+		buffer.seek(0)
+		with connection.cursor() as cursor:
+			cursor.copy_expert(
+				'COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(
+					connection.ops.quote_name(model._meta.db_table),
+					', '.join(connection.ops.quote_name(column) for column in columns)
+				),
+				buffer
+			)
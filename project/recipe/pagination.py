@@ -0,0 +1,158 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination): #Cursor(keyset) pagination i.e instead of OFFSET each page continues with WHERE (ordering columns) are past the last row of the previous page, so every page costs the same index range scan no matter how deep the client is. https://use-the-index-luke.com/no-offset
+	'''The response body stays a plain list, so clients that don't paginate keep working, and the links to the
+	neighbouring pages are sent in a Link header (RFC 8288) the same way the GitHub API does it i.e
+	Link: <https://.../api/recipe/recipes/?cursor=eyJwIjpb...>; rel="next"
+	The ordering comes from the view's get_ordering() or `ordering` attribute and must end with a unique column(like id) so
+	that every row has a distinct position.'''
+
+	cursor_query_param = 'cursor'
+	page_size_query_param = 'page_size'
+	ordering = ('-id',) #used when the view doesn't define an ordering
+	invalid_cursor_message = _('Invalid cursor')
+
+	def paginate_queryset(self, queryset, request, view=None):
+		self.request = request
+		self.base_url = request.build_absolute_uri()
+		self.page_size = self.get_page_size(request)
+		self.ordering = self.get_ordering(view)
+		position, reverse = self.decode_cursor(request, queryset)
+
+		ordering = self._reverse_ordering(self.ordering) if reverse else self.ordering #walking backwards for the previous page is a forward walk over the inverted ordering
+		queryset = queryset.order_by(*ordering)
+		if position is not None:
+			queryset = queryset.filter(self._past_position(position, ordering))
+
+		results = list(queryset[:self.page_size + 1]) #fetching one extra row tells us if there is another page without a COUNT query
+		has_more = len(results) > self.page_size
+		results = results[:self.page_size]
+		if reverse:
+			results.reverse()
+			self.has_next, self.has_previous = position is not None, has_more
+		else:
+			self.has_next, self.has_previous = has_more, position is not None
+
+		self.page = results
+		return results
+
+	def get_paginated_response(self, data):
+		links = []
+		next_link = self.get_next_link()
+		if next_link:
+			links.append('<{}>; rel="next"'.format(next_link))
+		previous_link = self.get_previous_link()
+		if previous_link:
+			links.append('<{}>; rel="previous"'.format(previous_link))
+
+		headers = {'Link': ', '.join(links)} if links else None
+		return Response(data, headers=headers)
+
+	def get_page_size(self, request): #Page size asked for by the client, capped at settings.API_MAX_PAGE_SIZE
+		page_size = api_settings.PAGE_SIZE
+		try:
+			requested = int(request.query_params[self.page_size_query_param])
+			if requested > 0:
+				page_size = requested
+		except (KeyError, ValueError):
+			pass
+		return min(page_size, settings.API_MAX_PAGE_SIZE)
+
+	def get_ordering(self, view): #Ordering of the view, the cursor stores one value per column of it.Views whose ordering depends on the request(i.e search results ordered by rank) implement get_ordering()
+		if hasattr(view, 'get_ordering'):
+			return tuple(view.get_ordering())
+		return tuple(getattr(view, 'ordering', None) or self.ordering)
+
+	def get_next_link(self):
+		if not self.has_next:
+			return None
+		return self.encode_cursor(self._position_of(self.page[-1]), reverse=False)
+
+	def get_previous_link(self):
+		if not self.has_previous:
+			return None
+		if not self.page: #walked backwards past the first row, the first page is the url without a cursor
+			return remove_query_param(self.base_url, self.cursor_query_param)
+		return self.encode_cursor(self._position_of(self.page[0]), reverse=True)
+
+	def encode_cursor(self, position, reverse): #Return the url of the page that continues from position.The cursor is opaque to clients and records the ordering it continues, a cursor sent with another ?ordering= is a 404
+		payload = {'p': position, 'o': self.ordering} #a cursor only continues the ordering it was made for
+		if reverse:
+			payload['r'] = 1
+		cursor = base64.urlsafe_b64encode(
+			json.dumps(payload, separators=(',', ':')).encode('utf-8')
+		).decode('ascii')
+		return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+	def decode_cursor(self, request, queryset): #Return (position, reverse) from the cursor query param, position is None for the first page.The cursor comes from the client, so its values are converted to the types of their columns here and anything else is a 404 rather than an error in the query
+		encoded = request.query_params.get(self.cursor_query_param)
+		if not encoded:
+			return None, False
+
+		try:
+			payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+			position = payload['p']
+			reverse = bool(payload.get('r'))
+			ordering = tuple(payload['o'])
+		except (TypeError, ValueError, KeyError, UnicodeError):
+			raise NotFound(self.invalid_cursor_message)
+
+		if ordering != self.ordering: #i.e a ?ordering=price cursor sent with ?ordering=-time_minutes
+			raise NotFound(self.invalid_cursor_message)
+
+		if not isinstance(position, list) or len(position) != len(self.ordering):
+			raise NotFound(self.invalid_cursor_message)
+		try:
+			position = [
+				self._column_field(queryset, field.lstrip('-')).to_python(value)
+				for field, value in zip(self.ordering, position)
+			]
+		except (TypeError, ValueError, ValidationError):
+			raise NotFound(self.invalid_cursor_message)
+		if None in position: #none of the ordering columns is nullable
+			raise NotFound(self.invalid_cursor_message)
+		return position, reverse
+
+	@staticmethod
+	def _column_field(queryset, name): #Field of an ordering column, the output field for annotations like the rank of search results
+		if name in queryset.query.annotations:
+			return queryset.query.annotations[name].output_field
+		return queryset.model._meta.get_field(name)
+
+	def _position_of(self, obj): #Values of the ordering columns for obj(a model instance or a values() row), as JSON friendly values
+		position = []
+		for field in self.ordering:
+			name = field.lstrip('-')
+			value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+			if not isinstance(value, (int, float, str)): #i.e Decimal prices,sent back as strings and django converts them when filtering
+				value = str(value)
+			position.append(value)
+		return position
+
+	def _past_position(self, position, ordering): #Q for the rows that come after position in ordering i.e for ('-name', 'id') that's name < v0 OR (name = v0 AND id > v1)
+		condition = Q()
+		for index, field in enumerate(ordering):
+			name = field.lstrip('-')
+			lookup = '{}__{}'.format(name, 'lt' if field.startswith('-') else 'gt')
+			term = Q(**{lookup: position[index]})
+			for previous_field, value in zip(ordering[:index], position):
+				term &= Q(**{previous_field.lstrip('-'): value})
+			condition |= term
+		return condition
+
+	@staticmethod
+	def _reverse_ordering(ordering):
+		return tuple(field[1:] if field.startswith('-') else '-' + field for field in ordering)
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db.models import CharField, DecimalField, FloatField, Func, Lookup, OuterRef, Subquery, TextField
+from django.db.models.functions import Cast
+
+from core.models import Tag, Ingredient, Recipe
+
+
+RELATIONS = {
+	Tag: Recipe.tags,
+	Ingredient: Recipe.ingredients,
+} #the Recipe m2m each searchable attribute model is linked through
+
+
+def search_document(model=Recipe): #SearchVector expression of a recipe's title(weight A), tag names(B) and ingredient names(C).model is the historical Recipe when called from a migration
+	config = settings.RECIPE_SEARCH_CONFIG
+	return (
+		SearchVector('title', weight='A', config=config) +
+		SearchVector(_joined_names(model.tags), weight='B', config=config) +
+		SearchVector(_joined_names(model.ingredients), weight='C', config=config)
+	)
+
+
+def _joined_names(relation): #Subquery of the names of the tags/ingredients of the outer recipe joined with spaces
+	field = relation.field
+	recipe_column = '{}_id'.format(field.m2m_field_name())
+	return Subquery(
+		relation.through.objects.filter(**{recipe_column: OuterRef('pk')}).values(recipe_column).annotate(
+			names=StringAgg('{}__name'.format(field.m2m_reverse_field_name()), ' ')
+		).values('names'),
+		output_field=TextField()
+	)
+
+
+def update_search_vectors(recipes): #Recompute Recipe.search_vector of recipes(a list of ids or a queryset of ids) with one UPDATE
+	return Recipe.objects.filter(pk__in=recipes).update(search_vector=search_document())
+
+
+def recipes_using(model, ids): #Queryset of the ids of the recipes linked to the tags/ingredients ids, for reindexing them after a rename or delete
+	field = RELATIONS[model].field
+	return field.remote_field.through.objects.filter(
+		**{'{}_id__in'.format(field.m2m_reverse_field_name()): ids}
+	).values_list('{}_id'.format(field.m2m_field_name()), flat=True)
+
+
+def cursor_safe(score): #Cast a real(float4) score to numeric, a real read back as a python float and sent again as a float8 cursor parameter no longer equals itself so KeysetPagination would repeat or skip rows
+	return Cast(score, DecimalField(max_digits=10, decimal_places=6))
+
+
+class TrigramWordSimilarity(Func): #pg_trgm's word_similarity(a, b), how close a is to the most similar run of whole words in b, from 0 to 1
+	function = 'WORD_SIMILARITY'
+	output_field = FloatField()
+
+
+@CharField.register_lookup
+class TrigramWordSimilar(Lookup): #name__trigram_word_similar=q i.e name %> q, true when word_similarity(q, name) is above pg_trgm.word_similarity_threshold(0.6 by default).Unlike comparing TrigramWordSimilarity it can be answered from a gin_trgm_ops index
+	lookup_name = 'trigram_word_similar'
+
+	def as_sql(self, compiler, connection):
+		lhs, lhs_params = self.process_lhs(compiler, connection)
+		rhs, rhs_params = self.process_rhs(compiler, connection)
+		return '%s %%%%> %s' % (lhs, rhs), lhs_params + rhs_params
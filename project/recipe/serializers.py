@@ -1,25 +1,33 @@
 from rest_framework import serializers
 
 from core.models import Tag, Ingredient, Recipe
+from core.timing import TimedSerializerMixin
 
+from recipe.bulk import BATCH_SIZE, BulkListSerializer
+from recipe.images import rendition_urls
+from recipe.search import update_search_vectors
+from recipe.sparse import ExpandableFieldsMixin
 
-class TagSerializer(serializers.ModelSerializer): #Serializer for tag object
+
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer): #Serializer for tag object
 
 	class Meta:
 		model = Tag #The model serializer will access
 		fields = ('id', 'name')
 		read_only_fields = ('id',) 
+		list_serializer_class = BulkListSerializer #used with many=True i.e by the bulk endpoint
 
 
-class IngredientSerializer(serializers.ModelSerializer): #Serializer for ingredient objects
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer): #Serializer for ingredient objects
 	
 	class Meta:
 		model = Ingredient
 		fields = ('id','name')
 		read_only_fields = ('id',)
+		list_serializer_class = BulkListSerializer
 
 
-class RecipeSerializer(serializers.ModelSerializer): #Serializer for recipe
+class RecipeSerializer(TimedSerializerMixin, ExpandableFieldsMixin, serializers.ModelSerializer): #Serializer for recipe.The views narrow it with ?fields= and nest the tags and ingredients with ?expand=
 	
 	ingredients = serializers.PrimaryKeyRelatedField(
 		many = True,
@@ -29,19 +37,124 @@ class RecipeSerializer(serializers.ModelSerializer): #Serializer for recipe
 		many = True,
 		queryset = Tag.objects.all()
 	)
+	renditions = serializers.SerializerMethodField() #urls of the resized copies of the image i.e {'thumb': {'webp': url, 'jpeg': url}, ...}
+
+	expandable_fields = {
+		'ingredients': IngredientSerializer,
+		'tags': TagSerializer,
+	}
+	field_sources = {
+		'renditions': ('image', 'renditions_ready'),
+	}
 
 	class Meta:
 		model = Recipe
-		fields = ('id', 'title', 'ingredients', 'tags', 'time_minutes', 'price', 'link')
+		fields = ('id', 'title', 'ingredients', 'tags', 'time_minutes', 'price', 'link', 'renditions')
 		read_only_fields = ('id',)
 
+	def get_renditions(self, recipe):
+		return rendition_urls(recipe, self.context.get('request'))
+
 
 class RecipeDetailSerializer(RecipeSerializer): #Serialize a recipe detail. Inheriting RecipeSerializer.
-	ingredients = IngredientSerializer(many=True, read_only=True) #as DRF allows us to nest serializers inside serializers
-	tags = TagSerializer(many=True, read_only=True)
+	default_expand = ('ingredients', 'tags') #nesting the full tag and ingredient objects, as DRF allows us to nest serializers inside serializers
+
+
+class IdOnlyRelatedField(serializers.PrimaryKeyRelatedField): #PrimaryKeyRelatedField that only checks it was given an id instead of querying the db for every id, BulkRecipeListSerializer checks all the ids of a request at once
+
+	def to_internal_value(self, data):
+		if isinstance(data, bool) or not isinstance(data, (int, str)):
+			self.fail('incorrect_type', data_type=type(data).__name__)
+		try:
+			pk = int(data)
+		except ValueError:
+			self.fail('incorrect_type', data_type=type(data).__name__)
+		if pk <= 0:
+			self.fail('does_not_exist', pk_value=data)
+		return pk
+
+
+class BulkRecipeListSerializer(BulkListSerializer): #Creates/updates many recipes and their tag and ingredient links with a fixed number of queries
+	related_fields = (
+		('tags', Tag),
+		('ingredients', Ingredient),
+	)
+
+	def to_internal_value(self, data): #Validate the items, then check every tag and ingredient id of the payload exists for the user with one query per model
+		items = super().to_internal_value(data)
+		user = self.context['request'].user
+		errors = [{} for item in items]
+		for field, model in self.related_fields:
+			ids = {pk for item in items for pk in item.get(field, ())}
+			existing = set(model.objects.filter(user=user, pk__in=ids).values_list('pk', flat=True)) if ids else set()
+			for item, item_errors in zip(items, errors):
+				missing = [pk for pk in item.get(field, ()) if pk not in existing]
+				if missing:
+					item_errors[field] = [
+						serializers.PrimaryKeyRelatedField.default_error_messages['does_not_exist'].format(pk_value=pk)
+						for pk in missing
+					]
+
+		if any(errors):
+			raise serializers.ValidationError(errors)
+		return items
+
+	def create(self, validated_data):
+		related = [self._pop_related(attrs) for attrs in validated_data]
+		recipes = super().create(validated_data)
+		self._set_related(recipes, related, replace=False) #new recipes have no links to delete
+		update_search_vectors([recipe.pk for recipe in recipes]) #bulk writes send no signals
+		return self._refetch(recipes)
+
+	def update(self, instances, validated_data):
+		related = [self._pop_related(attrs) for attrs in validated_data]
+		recipes = super().update(instances, validated_data)
+		self._set_related(recipes, related)
+		update_search_vectors([recipe.pk for recipe in recipes])
+		return self._refetch(recipes)
+
+	def _pop_related(self, attrs): #Take the tag and ingredient ids out of the attrs of a recipe, fields missing from a partial update stay untouched
+		return {field: attrs.pop(field) for field, model in self.related_fields if field in attrs}
+
+	def _set_related(self, recipes, related, replace=True): #Replace the links of the recipes with a delete and a multi row insert per through table
+		for field, model in self.related_fields:
+			relation = getattr(Recipe, field)
+			through = relation.through
+			recipe_column = '{}_id'.format(relation.field.m2m_field_name())
+			attr_column = '{}_id'.format(relation.field.m2m_reverse_field_name())
+			changed = [(recipe, ids[field]) for recipe, ids in zip(recipes, related) if field in ids]
+			if not changed:
+				continue
+
+			if replace:
+				through.objects.filter(**{recipe_column + '__in': [recipe.pk for recipe, pks in changed]}).delete()
+			through.objects.bulk_create([
+				through(**{recipe_column: recipe.pk, attr_column: pk})
+				for recipe, pks in changed for pk in dict.fromkeys(pks) #dict.fromkeys drops duplicate ids but keeps their order
+			], batch_size=BATCH_SIZE)
+
+	def _refetch(self, recipes): #Reload the recipes with their related ids prefetched so the response doesn't query the links once per recipe
+		found = Recipe.objects.filter(pk__in=[recipe.pk for recipe in recipes]).with_related_ids().in_bulk()
+		return [found[recipe.pk] for recipe in recipes]
+
+
+class BulkRecipeSerializer(RecipeSerializer): #Serializer for the items of the recipes bulk endpoint
+	ingredients = IdOnlyRelatedField(
+		many = True,
+		required = False,
+		queryset = Ingredient.objects.all()
+	)
+	tags = IdOnlyRelatedField(
+		many = True,
+		required = False,
+		queryset = Tag.objects.all()
+	)
+
+	class Meta(RecipeSerializer.Meta):
+		list_serializer_class = BulkRecipeListSerializer
 
 
-class RecipeImageSerializer(serializers.ModelSerializer): #Serializer for uploading images to recipes
+class RecipeImageSerializer(TimedSerializerMixin, serializers.ModelSerializer): #Serializer for uploading images to recipes
 	
 	class Meta:
 		model = Recipe
@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe
+
+from recipe.cache import bump_user_version
+from recipe.search import recipes_using, update_search_vectors
+
+
+def bump_user_version_on_commit(user_id): #The signals are sent inside the transaction of the write, a list request answered before it commits would cache the old rows under the new version
+	transaction.on_commit(lambda: bump_user_version(user_id))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_user_responses(sender, instance, **kwargs): #Any change to a user's recipes,tags or ingredients invalidates their cached list responses
+	bump_user_version_on_commit(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_user_responses_m2m(sender, instance, action, **kwargs): #Adding/removing tags and ingredients of a recipe changes the recipes list and the assigned_only lists.instance is the Recipe, or the Tag/Ingredient when the change is made from their side, both belong to the user
+	if action in ('post_add', 'post_remove', 'post_clear'):
+		bump_user_version_on_commit(instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(sender, instance, update_fields=None, **kwargs): #Reindex a saved recipe unless the save left its title alone
+	if update_fields is None or 'title' in update_fields:
+		update_search_vectors([instance.pk])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def update_search_vectors_renamed(sender, instance, created, update_fields=None, **kwargs): #A renamed tag/ingredient changes the search vectors of its recipes, a new one has none
+	if not created and (update_fields is None or 'name' in update_fields):
+		update_search_vectors(recipes_using(sender, [instance.pk]))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def remember_recipes_of_deleted(sender, instance, **kwargs): #The links of a deleted tag/ingredient are gone by post_delete and deleting them sends no m2m_changed
+	instance._search_recipe_ids = list(recipes_using(sender, [instance.pk]))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def update_search_vectors_deleted(sender, instance, **kwargs):
+	recipe_ids = getattr(instance, '_search_recipe_ids', None)
+	if recipe_ids:
+		update_search_vectors(recipe_ids)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_search_vectors_m2m(sender, instance, action, reverse, model, pk_set, **kwargs): #Reindex the recipes whose tags/ingredients changed.From the Tag/Ingredient side(reverse) pk_set holds the recipe ids, except on clear where they are only known before the links go
+	if not reverse:
+		if action in ('post_add', 'post_remove', 'post_clear'):
+			update_search_vectors([instance.pk])
+	elif action == 'pre_clear':
+		instance._search_recipe_ids = list(recipes_using(type(instance), [instance.pk]))
+	elif action in ('post_add', 'post_remove'):
+		update_search_vectors(pk_set)
+	elif action == 'post_clear':
+		update_search_vectors(getattr(instance, '_search_recipe_ids', []))
@@ -0,0 +1,91 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import ValidationError
+
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def params_to_names(param, value, allowed): #Split the comma separated names of the query param `param`, raising a 400 for the ones not in allowed
+	names = [name.strip() for name in value.split(',') if name.strip()]
+	unknown = [name for name in names if name not in allowed]
+	if unknown:
+		raise ValidationError({param: [
+			_('Unknown field(s): {}. Expected any of: {}.').format(', '.join(unknown), ', '.join(allowed))
+		]})
+	return tuple(dict.fromkeys(names))
+
+
+class ExpandableFieldsMixin: #ModelSerializer mixin that keeps only the fields in context['fields'] and nests the related objects of the relations in context['expand'] instead of their ids
+	expandable_fields = {} #relation -> serializer nested in its place when expanded
+	default_expand = () #relations expanded when the context doesn't say
+	field_sources = {} #model fields read by the fields that aren't model fields themselves, so the view can load just those columns
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		fields = self.context.get('fields')
+		if fields is not None:
+			for name in set(self.fields) - set(fields):
+				self.fields.pop(name)
+
+		expand = self.context.get('expand')
+		for name in self.default_expand if expand is None else expand:
+			if name in self.fields:
+				self.fields[name] = self.expandable_fields[name](many=True, read_only=True)
+
+
+class SparseFieldsMixin: #Adds ?fields=id,title and ?expand=tags,ingredients to the list and retrieve actions of a viewset whose serializer uses ExpandableFieldsMixin
+	'''?fields= returns only the named fields of every object and ?expand= nests the full related objects instead of
+	their ids(an empty ?expand= turns off the relations a serializer expands by default).Unknown names are a 400.
+	get_sparse_queryset() prunes the queryset to match, loading only the columns the returned fields read(plus
+	the primary key and the ordering columns KeysetPagination reads) and prefetching only the returned relations,
+	the expanded ones as full objects and the others as ids.'''
+
+	sparse_actions = ('list', 'retrieve')
+
+	def get_serializer_context(self):
+		context = super().get_serializer_context()
+		if self.action in self.sparse_actions:
+			context['fields'] = self.get_fields_param()
+			context['expand'] = self.get_expand_param()
+		return context
+
+	def get_fields_param(self): #Names of the fields asked for, None for all of them
+		value = self.request.query_params.get(FIELDS_PARAM)
+		if not value:
+			return None
+		return params_to_names(FIELDS_PARAM, value, self.get_serializer_class().Meta.fields)
+
+	def get_expand_param(self): #Relations to expand, None for the serializer's default_expand
+		value = self.request.query_params.get(EXPAND_PARAM)
+		if value is None:
+			return None
+		return params_to_names(EXPAND_PARAM, value, tuple(self.get_serializer_class().expandable_fields))
+
+	def get_sparse_queryset(self, queryset):
+		serializer_class = self.get_serializer_class()
+		names = self.get_fields_param() or serializer_class.Meta.fields
+		expand = self.get_expand_param()
+		if expand is None:
+			expand = serializer_class.default_expand
+
+		opts = queryset.model._meta
+		columns = {opts.pk.name}
+		id_relations, object_relations = [], []
+		for name in names:
+			if name in serializer_class.field_sources:
+				columns.update(serializer_class.field_sources[name])
+			elif opts.get_field(name).many_to_many:
+				(object_relations if name in expand else id_relations).append(name)
+			else:
+				columns.add(name)
+
+		for field in self.get_ordering():
+			try:
+				columns.add(opts.get_field(field.lstrip('-')).name)
+			except FieldDoesNotExist: #annotations like the search rank
+				pass
+
+		return queryset.only(*columns).with_related_ids(id_relations).with_related_objects(object_relations)
@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+
+from core.models import Tag, Ingredient, Recipe, UserStats
+
+
+COUNTED = (
+	(Tag, Recipe.tags),
+	(Ingredient, Recipe.ingredients),
+) #models with a recipe_count and the Recipe m2m it counts the links of
+
+LOCK_SQL = 'SELECT count(*) FROM (SELECT 1 FROM {table} AS counted {where} ORDER BY {pk} FOR NO KEY UPDATE) AS locked'
+
+RECOUNT_RECIPES_SQL = '''
+UPDATE {table} AS counted SET recipe_count = actual.recipe_count
+FROM (
+	SELECT counted.id, count(link.{column}) AS recipe_count
+	FROM {table} AS counted LEFT JOIN {links} AS link ON link.{column} = counted.id
+	{where}
+	GROUP BY counted.id
+) AS actual
+WHERE counted.id = actual.id AND counted.recipe_count <> actual.recipe_count
+'''
+
+RECOUNT_USERS_SQL = '''
+INSERT INTO {stats} AS stats (user_id, recipe_count, tag_count, ingredient_count)
+SELECT actual.user_id, actual.recipe_count, actual.tag_count, actual.ingredient_count
+FROM (
+	SELECT
+		counted.id AS user_id,
+		(SELECT count(*) FROM {recipes} WHERE user_id = counted.id) AS recipe_count,
+		(SELECT count(*) FROM {tags} WHERE user_id = counted.id) AS tag_count,
+		(SELECT count(*) FROM {ingredients} WHERE user_id = counted.id) AS ingredient_count
+	FROM {users} AS counted
+	{where}
+) AS actual LEFT JOIN {stats} AS kept ON kept.user_id = actual.user_id
+WHERE (COALESCE(kept.recipe_count, 0), COALESCE(kept.tag_count, 0), COALESCE(kept.ingredient_count, 0))
+	IS DISTINCT FROM (actual.recipe_count, actual.tag_count, actual.ingredient_count)
+ORDER BY actual.user_id
+ON CONFLICT (user_id) DO UPDATE SET
+	recipe_count = EXCLUDED.recipe_count,
+	tag_count = EXCLUDED.tag_count,
+	ingredient_count = EXCLUDED.ingredient_count
+'''
+
+
+def user_stats(user, limit): #Totals of the user and their limit most used tags and ingredients, read from the counters so the cost doesn't grow with the account
+	totals = UserStats.objects.filter(user=user).values('recipe_count', 'tag_count', 'ingredient_count').first() or {}
+	return {
+		'recipes': totals.get('recipe_count', 0), #no row until the user creates something
+		'tags': totals.get('tag_count', 0),
+		'ingredients': totals.get('ingredient_count', 0),
+		'top_tags': _most_used(Tag, user, limit),
+		'top_ingredients': _most_used(Ingredient, user, limit),
+	}
+
+
+def _most_used(model, user, limit): #read in the order of the (user, -recipe_count, id) index
+	return list(
+		model.objects.filter(user=user, recipe_count__gt=0).order_by('-recipe_count', 'id').values('id', 'name', 'recipe_count')[:limit]
+	)
+
+
+@transaction.atomic
+def recount(user_ids=None): #Recompute every counter(or those of user_ids) from the rows and fix the ones that drifted, returns how many rows were fixed.The counted rows are locked first so a write committing meanwhile is counted once, by the recount or by its trigger
+	where = 'WHERE counted.user_id = ANY(%s)' if user_ids is not None else ''
+	user_where = 'WHERE counted.id = ANY(%s)' if user_ids is not None else ''
+	params = [list(user_ids)] if user_ids is not None else []
+	fixed = 0
+	with connection.cursor() as cursor:
+		for model, relation in COUNTED:
+			field = relation.field
+			table = model._meta.db_table
+			cursor.execute(LOCK_SQL.format(table=table, where=where, pk='counted.id'), params)
+			cursor.execute(RECOUNT_RECIPES_SQL.format(
+				table=table,
+				links=relation.through._meta.db_table,
+				column='{}_id'.format(field.m2m_reverse_field_name()), #i.e tag_id
+				where=where
+			), params)
+			fixed += cursor.rowcount
+
+		stats = UserStats._meta.db_table
+		cursor.execute(LOCK_SQL.format(table=stats, where=where, pk='counted.user_id'), params)
+		cursor.execute(RECOUNT_USERS_SQL.format(
+			stats=stats,
+			recipes=Recipe._meta.db_table,
+			tags=Tag._meta.db_table,
+			ingredients=Ingredient._meta.db_table,
+			users=get_user_model()._meta.db_table,
+			where=user_where
+		), params)
+		fixed += cursor.rowcount
+	return fixed
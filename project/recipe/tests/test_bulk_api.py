@@ -0,0 +1,140 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+class BulkApiTests(TestCase): #Test the bulk create/update/delete endpoints
+
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(
+			'ksarthak4ever@gmail.com',
+			'randompassword'
+		)
+		self.client.force_authenticate(self.user)
+
+	def test_bulk_create_tags(self): #Test creating several tags in one request
+		res = self.client.post(TAGS_BULK_URL, [{'name': 'Vegan'}, {'name': 'Dessert'}], format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+		self.assertEqual([tag['name'] for tag in res.data], ['Vegan', 'Dessert'])
+		self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+	def test_bulk_create_per_item_errors(self): #Test an invalid item returns its errors in its position and nothing is created
+		res = self.client.post(TAGS_BULK_URL, [{'name': 'Vegan'}, {'name': ''}], format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(res.data[0], {})
+		self.assertIn('name', res.data[1])
+		self.assertFalse(Tag.objects.exists())
+
+	@override_settings(API_MAX_BULK_SIZE=2)
+	def test_bulk_size_limited(self): #Test more items than API_MAX_BULK_SIZE are refused
+		res = self.client.post(TAGS_BULK_URL, [{'name': 'Tag'}] * 3, format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+	def test_bulk_create_recipes_with_links(self): #Test creating recipes with tags and ingredients uses a fixed number of queries
+		tag = Tag.objects.create(user=self.user, name='Vegan')
+		ingredient = Ingredient.objects.create(user=self.user, name='Tofu')
+		payload = [
+			{
+				'title': 'Recipe {}'.format(i),
+				'time_minutes': 10,
+				'price': '5.00',
+				'tags': [tag.id],
+				'ingredients': [ingredient.id]
+			} for i in range(20)
+		]
+
+		if connection.features.can_return_ids_from_bulk_insert:
+			with self.assertNumQueries(11): #savepoint and its release, 2 id checks, recipes insert, 2 link inserts, search vectors update, refetch with its 2 prefetches
+				res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+		else: #the recipes are inserted one by one when the db can't return the ids of a bulk insert
+			res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+		self.assertEqual(len(res.data), 20)
+		self.assertEqual(res.data[0]['tags'], [tag.id])
+		recipe = Recipe.objects.get(id=res.data[0]['id'])
+		self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+
+	def test_bulk_create_recipes_other_users_tag(self): #Test linking a tag of another user is an error of that item
+		user2 = get_user_model().objects.create_user('kshubham155@gmail.com', 'password123')
+		tag = Tag.objects.create(user=user2, name='Vegan')
+
+		res = self.client.post(RECIPES_BULK_URL, [
+			{'title': 'Salad', 'time_minutes': 5, 'price': '3.00', 'tags': [tag.id]}
+		], format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertIn('tags', res.data[0])
+
+	def test_bulk_update_recipes(self): #Test updating fields and tags of several recipes
+		recipe1 = Recipe.objects.create(user=self.user, title='Dal', time_minutes=30, price=4.00)
+		recipe2 = Recipe.objects.create(user=self.user, title='Rice', time_minutes=20, price=2.00)
+		tag = Tag.objects.create(user=self.user, name='Main Course')
+
+		res = self.client.patch(RECIPES_BULK_URL, [
+			{'id': recipe1.id, 'price': '4.50', 'tags': [tag.id]},
+			{'id': recipe2.id, 'title': 'Jeera rice'}
+		], format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		recipe1.refresh_from_db()
+		recipe2.refresh_from_db()
+		self.assertEqual(recipe1.price, Decimal('4.50'))
+		self.assertEqual(list(recipe1.tags.all()), [tag])
+		self.assertEqual(recipe2.title, 'Jeera rice')
+		self.assertEqual(recipe2.time_minutes, 20)
+
+	def test_bulk_update_unknown_id(self): #Test updating a recipe of another user is an error of that item
+		user2 = get_user_model().objects.create_user('kshubham155@gmail.com', 'password123')
+		recipe = Recipe.objects.create(user=user2, title='Dal', time_minutes=30, price=4.00)
+
+		res = self.client.patch(RECIPES_BULK_URL, [{'id': recipe.id, 'title': 'Mine'}], format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertIn('id', res.data[0])
+		recipe.refresh_from_db()
+		self.assertEqual(recipe.title, 'Dal')
+
+	def test_bulk_delete_tags(self): #Test deleting several tags by id
+		tag1 = Tag.objects.create(user=self.user, name='Vegan')
+		tag2 = Tag.objects.create(user=self.user, name='Dessert')
+		tag3 = Tag.objects.create(user=self.user, name='Spicy')
+
+		res = self.client.delete(TAGS_BULK_URL, [tag1.id, tag2.id], format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+		self.assertEqual(list(Tag.objects.all()), [tag3])
+
+	def test_bulk_delete_invalid_ids(self): #Test ids that aren't ints(true equals 1, lists can't be looked up) are errors of their items and nothing is deleted
+		tag = Tag.objects.create(user=self.user, name='Vegan')
+
+		res = self.client.delete(TAGS_BULK_URL, [tag.id, True, [tag.id], '1'], format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(res.data[0], {})
+		self.assertEqual([set(item) for item in res.data[1:]], [{'id'}] * 3)
+		self.assertEqual(list(Tag.objects.all()), [tag])
+
+	def test_bulk_write_invalidates_cache(self): #Test the cached list reflects bulk writes, which don't send model signals
+		tags_url = reverse('recipe:tag-list')
+		self.client.get(tags_url)
+
+		self.client.post(TAGS_BULK_URL, [{'name': 'Vegan'}], format='json')
+
+		self.assertEqual(len(self.client.get(tags_url).data), 1)
@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.http import QueryDict
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from core.tests.helpers import run_on_commit_callbacks
+
+from recipe.cache import get_user_version, normalize_query_params
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class ResponseCacheTests(TestCase): #Test the per user versioned cache of the list endpoints
+
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(
+			'ksarthak4ever@gmail.com',
+			'randompassword'
+		)
+		self.client.force_authenticate(self.user)
+		self.recipe = Recipe.objects.create(user=self.user, title='Dal makhani', time_minutes=40, price=8.00)
+
+	def test_cached_list_skips_db(self): #Test repeating a list request is served without any query
+		first = self.client.get(RECIPES_URL)
+
+		with self.assertNumQueries(0):
+			second = self.client.get(RECIPES_URL)
+
+		self.assertEqual(second.data, first.data)
+
+	def test_if_none_match_returns_304(self): #Test sending back the ETag returns a 304 with no body
+		first = self.client.get(RECIPES_URL)
+
+		res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=first['ETag'])
+
+		self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+		self.assertEqual(res.content, b'')
+
+	def test_change_invalidates(self): #Test updating a recipe is visible on the next list request and changes the ETag
+		first = self.client.get(RECIPES_URL)
+		self.recipe.title = 'Dal tadka'
+		self.recipe.save()
+		run_on_commit_callbacks()
+
+		res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=first['ETag'])
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res.data[0]['title'], 'Dal tadka')
+		self.assertNotEqual(res['ETag'], first['ETag'])
+
+	def test_m2m_change_invalidates(self): #Test adding a tag to a recipe invalidates the cached lists
+		tag = Tag.objects.create(user=self.user, name='Vegetarian')
+		self.client.get(RECIPES_URL)
+		self.client.get(TAGS_URL, {'assigned_only': 1})
+
+		self.recipe.tags.add(tag)
+		run_on_commit_callbacks()
+
+		self.assertEqual(self.client.get(RECIPES_URL).data[0]['tags'], [tag.id])
+		self.assertEqual(len(self.client.get(TAGS_URL, {'assigned_only': 1}).data), 1)
+
+	def test_invalidated_once_committed(self): #Test a list cached while a write is still uncommitted isn't served after the commit, another connection would have read the old rows
+		self.client.get(RECIPES_URL)
+		version = get_user_version(self.user.id)
+		self.recipe.title = 'Dal tadka'
+		self.recipe.save()
+		self.recipe.tags.add(Tag.objects.create(user=self.user, name='Vegetarian'))
+
+		self.assertEqual(get_user_version(self.user.id), version) #not bumped before the commit
+		pending = self.client.get(RECIPES_URL)
+		run_on_commit_callbacks()
+		res = self.client.get(RECIPES_URL)
+
+		self.assertNotEqual(get_user_version(self.user.id), version)
+		self.assertNotEqual(res['ETag'], pending['ETag'])
+
+	def test_cache_per_user(self): #Test users never get each others cached responses
+		self.client.get(RECIPES_URL)
+		user2 = get_user_model().objects.create_user('kshubham155@gmail.com', 'password123')
+		self.client.force_authenticate(user2)
+
+		res = self.client.get(RECIPES_URL)
+
+		self.assertEqual(res.data, [])
+
+	def test_normalize_query_params(self): #Test equivalent query strings share a cache key
+		self.assertEqual(
+			normalize_query_params(QueryDict('tags=2,1&page_size=5'), ('tags',)),
+			normalize_query_params(QueryDict('page_size=5&tags=1,2,2'), ('tags',))
+		)
@@ -0,0 +1,92 @@
+import csv
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+from recipe.export import iter_recipes
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class RecipeExportTests(TestCase): #Test the streaming export of a user's recipes
+
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(
+			'ksarthak4ever@gmail.com',
+			'randompassword'
+		)
+		self.client.force_authenticate(self.user)
+		self.recipe = Recipe.objects.create(user=self.user, title='Chole bhature', time_minutes=45, price=7.25)
+		self.tag = Tag.objects.create(user=self.user, name='Punjabi')
+		self.ingredient = Ingredient.objects.create(user=self.user, name='Chickpeas')
+		self.recipe.tags.add(self.tag)
+		self.recipe.ingredients.add(self.ingredient)
+
+	def test_export_ndjson(self): #Test the default export is a line of json per recipe with nested tags and ingredients
+		res = self.client.get(EXPORT_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+		lines = b''.join(res.streaming_content).decode().splitlines()
+		self.assertEqual(json.loads(lines[0]), {
+			'id': self.recipe.id,
+			'title': 'Chole bhature',
+			'time_minutes': 45,
+			'price': '7.25',
+			'link': '',
+			'tags': [{'id': self.tag.id, 'name': 'Punjabi'}],
+			'ingredients': [{'id': self.ingredient.id, 'name': 'Chickpeas'}],
+		})
+
+	def test_export_csv(self): #Test the csv export has a header and the names of the tags and ingredients
+		res = self.client.get(EXPORT_URL, {'output': 'csv'}, HTTP_ACCEPT='text/csv')
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		rows = list(csv.DictReader(b''.join(res.streaming_content).decode().splitlines()))
+		self.assertEqual(rows[0]['title'], 'Chole bhature')
+		self.assertEqual(rows[0]['tags'], 'Punjabi')
+
+	def test_export_invalid_output(self):
+		res = self.client.get(EXPORT_URL, {'output': 'xml'})
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+	def test_export_limited_to_user(self): #Test recipes of other users are not exported
+		user2 = get_user_model().objects.create_user('kshubham155@gmail.com', 'password123')
+		Recipe.objects.create(user=user2, title='Rajma', time_minutes=60, price=5.00)
+
+		res = self.client.get(EXPORT_URL)
+
+		self.assertEqual(len(b''.join(res.streaming_content).splitlines()), 1)
+
+	def test_related_rows_fetched_per_chunk(self): #Test tags and ingredients cost two queries per chunk of recipes, not per recipe
+		for i in range(5):
+			Recipe.objects.create(user=self.user, title='Recipe {}'.format(i), time_minutes=5, price=1.00).tags.add(self.tag)
+
+		with self.assertNumQueries(1 + 2 * 2): #the recipes plus tags and ingredients for each of the 2 chunks
+			recipes = list(iter_recipes(Recipe.objects.for_user(self.user), chunk_size=3))
+
+		self.assertEqual(len(recipes), 6)
+
+	def test_keyset_chunks_without_server_side_cursors(self): #Test behind PgBouncer every chunk is its own query and no recipe is skipped or repeated
+		for i in range(5):
+			Recipe.objects.create(user=self.user, title='Recipe {}'.format(i), time_minutes=5, price=1.00)
+		expected = [recipe['id'] for recipe in iter_recipes(Recipe.objects.for_user(self.user), chunk_size=3)]
+
+		with patch.dict(connection.settings_dict, {'DISABLE_SERVER_SIDE_CURSORS': True}):
+			with self.assertNumQueries(2 * 3 + 1): #a recipe query plus tags and ingredients for each of the 2 chunks, and the query finding no more recipes
+				recipes = list(iter_recipes(Recipe.objects.for_user(self.user), chunk_size=3))
+
+		self.assertEqual([recipe['id'] for recipe in recipes], expected)
+		self.assertEqual(len(recipes), 6)
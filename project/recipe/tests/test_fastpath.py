@@ -0,0 +1,100 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+from recipe.cache import response_cache
+from recipe.fastpath import FastListMixin
+from recipe.serializers import RecipeSerializer
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class FastPathParityTests(TestCase): #Test the lists built by the readers are byte for byte the ones the serializers render
+
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(
+			'ksarthak4ever@gmail.com',
+			'randompassword'
+		)
+		self.client.force_authenticate(self.user)
+
+		tags = [Tag.objects.create(user=self.user, name=name) for name in ('Vegan', 'Dessert', 'Crème', 'Chicken')]
+		ingredients = [Ingredient.objects.create(user=self.user, name=name) for name in ('Sugar', 'Flour', 'Chickpeas')]
+		recipes = [
+			Recipe.objects.create(user=self.user, title='Crème brûlée 🍮', time_minutes=45, price=4.5, link='https://example.com/brulee'),
+			Recipe.objects.create(user=self.user, title='Chickpea "curry"', time_minutes=30, price=999.99),
+			Recipe.objects.create(user=self.user, title='Water', time_minutes=0, price=0),
+			Recipe.objects.create(user=self.user, title='Vegan cake', time_minutes=60, price=12),
+		]
+		recipes[0].tags.add(tags[2], tags[1])
+		recipes[0].ingredients.add(ingredients[1], ingredients[0])
+		recipes[1].tags.add(tags[3], tags[0])
+		recipes[1].ingredients.add(ingredients[2])
+		recipes[3].tags.add(tags[0])
+		Recipe.objects.filter(pk=recipes[0].pk).update(image='uploads/recipe/abc.jpg', renditions_ready=True)
+		Recipe.objects.filter(pk=recipes[1].pk).update(image='uploads/recipe/def.jpg', renditions_ready=False)
+		self.tags = tags
+
+	def assertSameResponses(self, url, params=None):
+		response_cache().clear() #the second request must not be served the first one's cached response
+		fast = self.client.get(url, params)
+		response_cache().clear()
+		with patch.object(FastListMixin, 'get_reader', return_value=None):
+			serialized = self.client.get(url, params)
+
+		self.assertEqual(fast.status_code, status.HTTP_200_OK)
+		self.assertEqual(fast.content, serialized.content, params)
+		self.assertEqual(fast.get('Link'), serialized.get('Link'), params)
+		return fast
+
+	def test_recipes(self):
+		res = self.assertSameResponses(RECIPES_URL)
+		self.assertEqual(len(res.data), 4)
+		self.assertTrue(res.data[-1]['renditions'])
+
+	def test_recipes_each_field(self):
+		for name in RecipeSerializer.Meta.fields:
+			self.assertSameResponses(RECIPES_URL, {'fields': name})
+		self.assertSameResponses(RECIPES_URL, {'fields': 'tags,title,id'})
+
+	def test_recipes_filtered_ordered_and_paged(self):
+		for params in (
+			{'tags': self.tags[0].id},
+			{'ordering': 'price', 'page_size': 2},
+			{'ordering': '-time_minutes', 'max_price': 20},
+			{'q': 'vegan', 'page_size': 1},
+		):
+			self.assertSameResponses(RECIPES_URL, params)
+
+	def test_recipe_pages_from_a_cursor(self): #Test the cursor written by the fast path pages the same as the serializer's
+		first = self.client.get(RECIPES_URL, {'ordering': 'price', 'page_size': 2})
+		next_url = first['Link'].split('>')[0].lstrip('<')
+
+		self.assertSameResponses(next_url)
+
+	def test_tags_and_ingredients(self):
+		for url in (TAGS_URL, INGREDIENTS_URL):
+			self.assertSameResponses(url)
+			self.assertSameResponses(url, {'assigned_only': 1})
+			self.assertSameResponses(url, {'q': 'chick'})
+			self.assertSameResponses(url, {'page_size': 1})
+
+	def test_recipes_one_query(self): #Test the fast path reads a page of recipes with their tag and ingredient ids in a single query
+		with CaptureQueriesContext(connection) as queries:
+			self.client.get(RECIPES_URL)
+
+		self.assertEqual(len(queries), 1)
+		self.assertIn('ARRAY(', queries[0]['sql'])
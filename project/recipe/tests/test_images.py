@@ -0,0 +1,103 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+from recipe.images import create_renditions, rendition_path
+from recipe.serializers import RecipeSerializer
+
+
+def image_upload_url(recipe_id):
+	return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def renditions_files(directory):
+	return {os.path.join(root, name) for root, dirs, names in os.walk(directory) for name in names}
+
+
+class RecipeRenditionTests(TestCase): #Test the resized copies made of uploaded recipe images
+
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(
+			'ksarthak4ever@gmail.com',
+			'testpass'
+		)
+		self.client.force_authenticate(self.user)
+		self.recipe = Recipe.objects.create(user=self.user, title='Masala dosa', time_minutes=40, price=3.00)
+
+	def tearDown(self):
+		self.recipe.refresh_from_db()
+		if self.recipe.image:
+			for size in settings.RECIPE_IMAGE_RENDITIONS:
+				for extension in ('webp', 'jpeg'):
+					default_storage.delete('{}.{}'.format(rendition_path(self.recipe.image.name, size), extension))
+			self.recipe.image.delete()
+
+	def upload(self, size=(1200, 800)):
+		with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+			Image.new('RGB', size).save(ntf, format='JPEG')
+			ntf.seek(0)
+			return self.client.post(image_upload_url(self.recipe.id), {'image': ntf}, format='multipart')
+
+	@patch('recipe.views.schedule_renditions')
+	def test_upload_schedules_renditions(self, schedule): #Test the upload returns before the renditions exist and queues them
+		res = self.upload()
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		schedule.assert_called_once_with(self.recipe.id)
+		self.recipe.refresh_from_db()
+		self.assertFalse(self.recipe.renditions_ready)
+
+	@patch('recipe.views.schedule_renditions')
+	def test_create_renditions(self, schedule): #Test every rendition is written at most its max size and the recipe exposes their urls
+		self.upload()
+
+		create_renditions(self.recipe.id)
+
+		self.recipe.refresh_from_db()
+		self.assertTrue(self.recipe.renditions_ready)
+		for size, max_edge in settings.RECIPE_IMAGE_RENDITIONS.items():
+			for extension in ('webp', 'jpeg'):
+				name = '{}.{}'.format(rendition_path(self.recipe.image.name, size), extension)
+				with default_storage.open(name) as file:
+					image = Image.open(file)
+					self.assertEqual(max(image.size), max_edge)
+					self.assertNotIn('exif', image.info)
+		renditions = RecipeSerializer(self.recipe).data['renditions']
+		self.assertEqual(set(renditions), set(settings.RECIPE_IMAGE_RENDITIONS))
+		self.assertTrue(renditions['thumb']['webp'].endswith('_thumb.webp'))
+
+	@patch('recipe.views.schedule_renditions')
+	def test_small_images_not_upscaled(self, schedule):
+		self.upload(size=(100, 50))
+
+		create_renditions(self.recipe.id)
+
+		self.recipe.refresh_from_db()
+		name = '{}.jpeg'.format(rendition_path(self.recipe.image.name, 'medium'))
+		with default_storage.open(name) as file:
+			self.assertEqual(Image.open(file).size, (100, 50))
+
+	def test_no_renditions_without_image(self): #Test making the renditions of a recipe without an image writes nothing and leaves it not ready
+		renditions_dir = os.path.join(settings.MEDIA_ROOT, 'uploads/recipe/renditions')
+		files_before = renditions_files(renditions_dir)
+
+		create_renditions(self.recipe.id)
+
+		self.recipe.refresh_from_db()
+		self.assertFalse(self.recipe.renditions_ready)
+		self.assertEqual(renditions_files(renditions_dir), files_before)
+		self.assertEqual(RecipeSerializer(self.recipe).data['renditions'], {})
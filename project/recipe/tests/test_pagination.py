@@ -0,0 +1,133 @@
+import base64
+import json
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from core.tests.helpers import page_links
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def make_cursor(payload): #A cursor as the api encodes them, for tampering with
+	return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+
+class KeysetPaginationTests(TestCase): #Test the cursor pagination of the list endpoints
+
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(
+			'ksarthak4ever@gmail.com',
+			'randompassword'
+		)
+		self.client.force_authenticate(self.user)
+
+	def _create_recipes(self, count):
+		return [
+			Recipe.objects.create(user=self.user, title='Recipe {}'.format(i), time_minutes=10, price=5.00)
+			for i in range(count)
+		]
+
+	def test_page_size_limits_results(self): #Test that page_size limits the number of rows and a next link is sent
+		self._create_recipes(3)
+
+		res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(len(res.data), 2)
+		self.assertIn('next', page_links(res))
+		self.assertNotIn('previous', page_links(res))
+
+	def test_walk_all_pages(self): #Test following the next links returns every recipe once, newest first
+		recipes = self._create_recipes(5)
+
+		ids = []
+		url = RECIPES_URL + '?page_size=2'
+		while url:
+			res = self.client.get(url)
+			ids.extend(recipe['id'] for recipe in res.data)
+			url = page_links(res).get('next')
+
+		self.assertEqual(ids, sorted((recipe.id for recipe in recipes), reverse=True))
+
+	def test_previous_link(self): #Test the previous link of the second page returns the first page again
+		self._create_recipes(5)
+		first = self.client.get(RECIPES_URL, {'page_size': 2})
+		second = self.client.get(page_links(first)['next'])
+
+		res = self.client.get(page_links(second)['previous'])
+
+		self.assertEqual(res.data, first.data)
+
+	def test_ties_on_name_are_not_skipped(self): #Test tags sharing a name are paginated by id so none are lost between pages
+		for i in range(3):
+			Tag.objects.create(user=self.user, name='Vegan')
+		Tag.objects.create(user=self.user, name='Dessert')
+
+		first = self.client.get(TAGS_URL, {'page_size': 2})
+		second = self.client.get(page_links(first)['next'])
+
+		names = [tag['name'] for tag in first.data + second.data]
+		self.assertEqual(names, ['Vegan', 'Vegan', 'Vegan', 'Dessert'])
+		self.assertNotIn('next', page_links(second))
+
+	@override_settings(API_MAX_PAGE_SIZE=2)
+	def test_page_size_capped(self): #Test clients can't ask for more rows than API_MAX_PAGE_SIZE
+		self._create_recipes(3)
+
+		res = self.client.get(RECIPES_URL, {'page_size': 100})
+
+		self.assertEqual(len(res.data), 2)
+
+	def test_invalid_cursor(self): #Test a cursor that wasn't issued by the api returns 404
+		res = self.client.get(RECIPES_URL, {'cursor': 'notacursor'})
+
+		self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+	def test_tampered_cursor_values(self): #Test cursor values that don't fit their columns return 404 instead of failing in the query
+		self._create_recipes(1)
+		Tag.objects.create(user=self.user, name='Spicy')
+
+		for url, params, position in [
+			(RECIPES_URL, {}, ['abc']),
+			(RECIPES_URL, {}, [None]),
+			(RECIPES_URL, {}, [[1]]),
+			(RECIPES_URL, {'ordering': 'price'}, ['cheap', 1]),
+			(TAGS_URL, {}, [1, 'x']),
+			(RECIPES_URL, {'q': 'spicy'}, ['x', 1]),
+			(TAGS_URL, {'q': 'spicy'}, [None, 'Spicy', 1]),
+		]:
+			ordering = {
+				RECIPES_URL: ['-id'],
+				TAGS_URL: ['-name', 'id'],
+			}[url]
+			if 'ordering' in params:
+				ordering = [params['ordering'], 'id']
+			if 'q' in params:
+				ordering = ['-rank' if url == RECIPES_URL else '-similarity'] + ordering
+			res = self.client.get(url, dict(params, cursor=make_cursor({'p': position, 'o': ordering})))
+
+			self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND, (url, params, position))
+
+	def test_cursor_of_another_ordering(self): #Test a cursor made for one ?ordering= returns 404 with another instead of a wrong page
+		self._create_recipes(3)
+		res = self.client.get(RECIPES_URL, {'ordering': 'price', 'page_size': 1})
+		cursor = parse_qs(urlparse(page_links(res)['next']).query)['cursor'][0]
+
+		self.assertEqual(self.client.get(RECIPES_URL, {'ordering': 'price', 'page_size': 1, 'cursor': cursor}).status_code, status.HTTP_200_OK)
+		for ordering in ('-time_minutes', '-price', None):
+			params = {'page_size': 1, 'cursor': cursor}
+			if ordering:
+				params['ordering'] = ordering
+			res = self.client.get(RECIPES_URL, params)
+
+			self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND, ordering)
@@ -1,3 +1,4 @@
+import re
 import tempfile #python fn that allows us to generate temperory files i.e it allows us to call a fn which will then create a temp file and we can remove that file after using it
 import os
 
@@ -11,6 +12,7 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
+from core.tests.helpers import QueryCountAssertionsMixin
 
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
@@ -190,6 +192,104 @@ class PrivateRecipeApiTests(TestCase): #Test authenticated recipe API access
 		tags = recipe.tags.all()
 		self.assertEqual(len(tags), 0)
 
+	def test_filter_recipes_no_duplicates(self): #Test a recipe matching several tags and ingredients is returned once
+		recipe = sample_recipe(user=self.user)
+		tag1 = sample_tag(user=self.user, name='Vegan')
+		tag2 = sample_tag(user=self.user, name='Dessert')
+		ingredient1 = sample_ingredient(user=self.user, name='Sugar')
+		ingredient2 = sample_ingredient(user=self.user, name='Flour')
+		recipe.tags.add(tag1, tag2)
+		recipe.ingredients.add(ingredient1, ingredient2)
+
+		res = self.client.get(RECIPES_URL, {
+			'tags': '{},{}'.format(tag1.id, tag2.id),
+			'ingredients': '{},{}'.format(ingredient1.id, ingredient2.id)
+		})
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual([r['id'] for r in res.data], [recipe.id])
+
+	def test_filter_recipes_all_tags(self): #Test tags_mode=all only returns recipes that have every one of the tags
+		recipe1 = sample_recipe(user=self.user, title='Vegan brownies')
+		recipe2 = sample_recipe(user=self.user, title='Vegan curry')
+		tag1 = sample_tag(user=self.user, name='Vegan')
+		tag2 = sample_tag(user=self.user, name='Dessert')
+		recipe1.tags.add(tag1, tag2)
+		recipe2.tags.add(tag1)
+
+		res = self.client.get(RECIPES_URL, {
+			'tags': '{},{}'.format(tag1.id, tag2.id),
+			'tags_mode': 'all'
+		})
+
+		self.assertEqual([r['id'] for r in res.data], [recipe1.id])
+
+	def test_filter_recipes_invalid_ids(self): #Test ids that aren't integers return a 400 instead of a server error
+		for value in ('abc', '1,,2', '-1'):
+			res = self.client.get(RECIPES_URL, {'tags': value})
+			self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+			self.assertIn('tags', res.data)
+
+	def test_filter_recipes_invalid_mode(self): #Test an unknown tags_mode returns a 400
+		res = self.client.get(RECIPES_URL, {'tags': '1', 'tags_mode': 'some'})
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+	def test_filter_recipes_by_time_and_price(self): #Test max_time, min_price and max_price are inclusive and combine with the tags filter
+		tag = sample_tag(user=self.user, name='Quick')
+		recipe1 = sample_recipe(user=self.user, time_minutes=15, price=10.00)
+		recipe2 = sample_recipe(user=self.user, time_minutes=20, price=4.50)
+		recipe3 = sample_recipe(user=self.user, time_minutes=45, price=5.00)
+		sample_recipe(user=self.user, time_minutes=10, price=20.00)
+		for recipe in (recipe1, recipe2, recipe3):
+			recipe.tags.add(tag)
+
+		res = self.client.get(RECIPES_URL, {'max_time': '20', 'min_price': '4.50', 'max_price': '10', 'tags': tag.id})
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual([r['id'] for r in res.data], [recipe2.id, recipe1.id])
+
+	def test_filter_recipes_invalid_ranges(self): #Test values that aren't numbers in the range of the fields return a 400
+		for param, value in (('max_time', 'abc'), ('max_time', '-1'), ('min_price', '1.234'), ('max_price', '100000')):
+			res = self.client.get(RECIPES_URL, {param: value})
+			self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+			self.assertIn(param, res.data)
+
+	def test_order_recipes(self): #Test ordering by price and time, both ways, ties broken by id in the same direction
+		recipe1 = sample_recipe(user=self.user, time_minutes=30, price=8.00)
+		recipe2 = sample_recipe(user=self.user, time_minutes=10, price=8.00)
+		recipe3 = sample_recipe(user=self.user, time_minutes=20, price=3.00)
+
+		expected = {
+			'price': [recipe3.id, recipe1.id, recipe2.id],
+			'-price': [recipe2.id, recipe1.id, recipe3.id],
+			'time_minutes': [recipe2.id, recipe3.id, recipe1.id],
+			'-time_minutes': [recipe1.id, recipe3.id, recipe2.id],
+			'id': [recipe1.id, recipe2.id, recipe3.id],
+		}
+		for ordering, ids in expected.items():
+			res = self.client.get(RECIPES_URL, {'ordering': ordering})
+			self.assertEqual([r['id'] for r in res.data], ids, ordering)
+
+	def test_order_recipes_pages(self): #Test walking the pages of an ordering with ties returns every recipe once
+		recipes = [sample_recipe(user=self.user, price=price) for price in (5, 3, 5, 3, 5)]
+
+		ids = []
+		url = RECIPES_URL + '?ordering=-price&page_size=2'
+		while url:
+			res = self.client.get(url)
+			ids.extend(r['id'] for r in res.data)
+			url = re.search(r'<([^>]+)>; rel="next"', res.get('Link', ''))
+			url = url and url.group(1)
+
+		self.assertEqual(ids, [recipes[4].id, recipes[2].id, recipes[0].id, recipes[3].id, recipes[1].id])
+
+	def test_order_recipes_invalid(self):
+		for value in ('title', '--price', 'user'):
+			res = self.client.get(RECIPES_URL, {'ordering': value})
+			self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+			self.assertIn('ordering', res.data)
+
 
 class RecipeImageUploadTests(TestCase): 
 
@@ -266,4 +366,39 @@ class RecipeImageUploadTests(TestCase):
 		self.assertIn(serializer1.data, res.data)
 		self.assertIn(serializer2.data, res.data)
 		self.assertNotIn(serializer3.data, res.data)
-		
+
+
+class RecipeQueryCountTests(QueryCountAssertionsMixin, TestCase): #Test that the recipe endpoints don't run extra queries per recipe,tag or ingredient
+
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(
+			'ksarthak4ever@gmail.com',
+			'testpass'
+		)
+		self.client.force_authenticate(self.user)
+
+	def _add_recipes(self, count): #Create recipes that each have their own tags and ingredients
+		for i in range(count):
+			recipe = sample_recipe(user=self.user)
+			recipe.tags.add(sample_tag(user=self.user), sample_tag(user=self.user, name='Spicy'))
+			recipe.ingredients.add(sample_ingredient(user=self.user))
+
+	def test_list_recipes_query_count_constant(self): #Test listing recipes does not do N+1 queries for tags and ingredients
+		self.assertQueryCountConstant(
+			lambda: self.client.get(RECIPES_URL),
+			self._add_recipes
+		)
+
+	def test_retrieve_recipe_query_count_constant(self): #Test the recipe detail does not do a query per nested tag or ingredient
+		recipe = sample_recipe(user=self.user)
+
+		def add_related(count):
+			for i in range(count):
+				recipe.tags.add(sample_tag(user=self.user, name='Tag {}'.format(i)))
+				recipe.ingredients.add(sample_ingredient(user=self.user, name='Ingredient {}'.format(i)))
+
+		self.assertQueryCountConstant(
+			lambda: self.client.get(detail_url(recipe.id)),
+			add_related
+		)
@@ -0,0 +1,198 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.tests.helpers import page_links, run_on_commit_callbacks
+
+from recipe.search import update_search_vectors
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = RECIPES_URL + 'bulk/'
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class SearchTestsMixin: #Shared setUp for the search tests
+
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(
+			'ksarthak4ever@gmail.com',
+			'randompassword'
+		)
+		self.client.force_authenticate(self.user)
+
+	def sample_recipe(self, title, **params):
+		return Recipe.objects.create(user=self.user, title=title, time_minutes=10, price=5.00, **params)
+
+	def search_ids(self, q, **params):
+		run_on_commit_callbacks() #the writes made so far invalidate the cached responses
+		res = self.client.get(RECIPES_URL, dict(params, q=q))
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		return [recipe['id'] for recipe in res.data]
+
+
+class SearchVectorTests(SearchTestsMixin, TestCase): #Test Recipe.search_vector follows the changes to recipes, tags and ingredients
+
+	def test_new_recipe_is_searchable(self):
+		recipe = self.sample_recipe('Thai green curry')
+
+		self.assertEqual(self.search_ids('curry'), [recipe.id])
+
+	def test_renamed_recipe(self):
+		recipe = self.sample_recipe('Thai green curry')
+		recipe.title = 'Mushroom risotto'
+		recipe.save()
+
+		self.assertEqual(self.search_ids('curry'), [])
+		self.assertEqual(self.search_ids('risotto'), [recipe.id])
+
+	def test_tags_added_and_removed(self):
+		recipe = self.sample_recipe('Dinner')
+		tag = Tag.objects.create(user=self.user, name='Vegan')
+
+		recipe.tags.add(tag)
+		self.assertEqual(self.search_ids('vegan'), [recipe.id])
+
+		recipe.tags.remove(tag)
+		self.assertEqual(self.search_ids('vegan'), [])
+
+	def test_links_changed_from_the_ingredient_side(self): #Test adding and clearing the recipes of an ingredient reindexes those recipes
+		recipe = self.sample_recipe('Dinner')
+		ingredient = Ingredient.objects.create(user=self.user, name='Salmon')
+
+		ingredient.recipe_set.add(recipe)
+		self.assertEqual(self.search_ids('salmon'), [recipe.id])
+
+		ingredient.recipe_set.clear()
+		self.assertEqual(self.search_ids('salmon'), [])
+
+	def test_renamed_and_deleted_tag(self):
+		recipe = self.sample_recipe('Dinner')
+		tag = Tag.objects.create(user=self.user, name='Vegan')
+		recipe.tags.add(tag)
+
+		tag.name = 'Spicy'
+		tag.save()
+		self.assertEqual(self.search_ids('vegan'), [])
+		self.assertEqual(self.search_ids('spicy'), [recipe.id])
+
+		tag.delete()
+		self.assertEqual(self.search_ids('spicy'), [])
+
+	def test_bulk_rename_tags(self): #Test renaming tags through the bulk endpoint reindexes their recipes
+		recipe = self.sample_recipe('Dinner')
+		tag = Tag.objects.create(user=self.user, name='Vegan')
+		recipe.tags.add(tag)
+
+		res = self.client.patch(TAGS_URL + 'bulk/', [{'id': tag.id, 'name': 'Spicy'}], format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(self.search_ids('spicy'), [recipe.id])
+
+	def test_bulk_created_recipes(self):
+		tag = Tag.objects.create(user=self.user, name='Vegan')
+
+		res = self.client.post(RECIPES_BULK_URL, [
+			{'title': 'Lentil soup', 'time_minutes': 30, 'price': '4.00', 'tags': [tag.id]},
+		], format='json')
+
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+		self.assertEqual(self.search_ids('vegan'), [res.data[0]['id']])
+
+	def test_update_search_vectors(self): #Test recipes written without signals are found once reindexed
+		recipe = Recipe.objects.bulk_create([Recipe(user=self.user, title='Lentil soup', time_minutes=30, price=4.00)])[0]
+		self.assertIsNone(Recipe.objects.values_list('search_vector', flat=True).get(pk=recipe.id))
+
+		update_search_vectors([recipe.id])
+
+		self.assertEqual(self.search_ids('lentil'), [recipe.id])
+
+
+class RecipeSearchTests(SearchTestsMixin, TestCase): #Test the ?q= search of the recipes endpoint
+
+	def test_words_are_stemmed(self):
+		recipe = self.sample_recipe('Roasted chickens')
+
+		self.assertEqual(self.search_ids('roast chicken'), [recipe.id])
+
+	def test_every_word_must_match(self):
+		self.sample_recipe('Chicken soup')
+		curry = self.sample_recipe('Chicken curry')
+
+		self.assertEqual(self.search_ids('chicken curry'), [curry.id])
+
+	def test_title_ranks_above_tags_and_ingredients(self): #Test matches in the title come before matches in tag names, which come before ingredient names
+		by_ingredient = self.sample_recipe('Dinner')
+		by_ingredient.ingredients.add(Ingredient.objects.create(user=self.user, name='Lemon'))
+		by_tag = self.sample_recipe('Lunch')
+		by_tag.tags.add(Tag.objects.create(user=self.user, name='Lemon'))
+		by_title = self.sample_recipe('Lemon tart')
+
+		self.assertEqual(self.search_ids('lemon'), [by_title.id, by_tag.id, by_ingredient.id])
+
+	def test_only_own_recipes(self):
+		other = get_user_model().objects.create_user('other@gmail.com', 'password123')
+		Recipe.objects.create(user=other, title='Lemon tart', time_minutes=10, price=5.00)
+
+		self.assertEqual(self.search_ids('lemon'), [])
+
+	def test_combined_with_tag_filter(self):
+		tag = Tag.objects.create(user=self.user, name='Dessert')
+		tart = self.sample_recipe('Lemon tart')
+		tart.tags.add(tag)
+		self.sample_recipe('Lemon chicken')
+
+		self.assertEqual(self.search_ids('lemon', tags=tag.id), [tart.id])
+
+	def test_blank_query_lists_everything(self):
+		recipes = [self.sample_recipe('Lemon tart'), self.sample_recipe('Soup')]
+
+		self.assertEqual(self.search_ids('  '), [recipe.id for recipe in reversed(recipes)])
+
+	def test_walk_ranked_pages(self): #Test the cursor pages through the ranked results, equally ranked recipes newest first, without repeating or skipping any
+		recipes = [self.sample_recipe('Lemon pie {}'.format(i)) for i in range(5)]
+		best = self.sample_recipe('Lemon lemon pie')
+
+		ids = []
+		url = RECIPES_URL + '?q=lemon&page_size=2'
+		while url:
+			res = self.client.get(url)
+			ids.extend(recipe['id'] for recipe in res.data)
+			url = page_links(res).get('next')
+
+		self.assertEqual(ids, [best.id] + [recipe.id for recipe in reversed(recipes)])
+
+
+class AutocompleteTests(SearchTestsMixin, TestCase): #Test the ?q= trigram matching of the tag and ingredient names
+
+	def names(self, url, q):
+		res = self.client.get(url, {'q': q})
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		return [item['name'] for item in res.data]
+
+	def test_prefix_and_typos_match(self):
+		for name in ('Chicken', 'Chickpea curry', 'Beef'):
+			Tag.objects.create(user=self.user, name=name)
+
+		self.assertIn('Chicken', self.names(TAGS_URL, 'chick'))
+		self.assertEqual(self.names(TAGS_URL, 'chiken'), ['Chicken'])
+		self.assertEqual(self.names(TAGS_URL, 'beef'), ['Beef'])
+
+	def test_closest_names_first(self):
+		for name in ('Chilli oil', 'Chilli'):
+			Ingredient.objects.create(user=self.user, name=name)
+		Ingredient.objects.create(user=self.user, name='Chili')
+
+		self.assertEqual(self.names(INGREDIENTS_URL, 'chili')[0], 'Chili')
+
+	def test_only_own_names(self):
+		other = get_user_model().objects.create_user('other@gmail.com', 'password123')
+		Tag.objects.create(user=other, name='Chicken')
+
+		self.assertEqual(self.names(TAGS_URL, 'chicken'), [])
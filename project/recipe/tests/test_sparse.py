@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.tests.helpers import QueryCountAssertionsMixin
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+	return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class SparseFieldsTests(QueryCountAssertionsMixin, TestCase): #Test ?fields= and ?expand= on the recipe endpoints
+
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(
+			'ksarthak4ever@gmail.com',
+			'randompassword'
+		)
+		self.client.force_authenticate(self.user)
+		self.recipe = Recipe.objects.create(user=self.user, title='Dal makhani', time_minutes=60, price=4.00, link='https://example.com')
+		self.tag = Tag.objects.create(user=self.user, name='Vegetarian')
+		self.ingredient = Ingredient.objects.create(user=self.user, name='Lentils')
+		self.recipe.tags.add(self.tag)
+		self.recipe.ingredients.add(self.ingredient)
+
+	def get(self, url, **params):
+		with CaptureQueriesContext(connection) as queries:
+			res = self.client.get(url, params)
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		return res, [query['sql'] for query in queries]
+
+	def test_list_only_requested_fields(self): #Test ?fields= narrows the items, loads only the columns they need and skips the prefetches of the relations left out
+		res, queries = self.get(RECIPES_URL, fields='id,title')
+
+		self.assertEqual(res.data, [{'id': self.recipe.id, 'title': 'Dal makhani'}])
+		recipe_query = next(sql for sql in queries if 'FROM "core_recipe"' in sql)
+		self.assertNotIn('"link"', recipe_query)
+		self.assertNotIn('"price"', recipe_query)
+		self.assertFalse([sql for sql in queries if 'core_tag' in sql or 'core_ingredient' in sql])
+
+	def test_list_expand(self): #Test ?expand= nests the full objects of the named relation only
+		res, queries = self.get(RECIPES_URL, expand='tags')
+
+		self.assertEqual(res.data[0]['tags'], [{'id': self.tag.id, 'name': 'Vegetarian'}])
+		self.assertEqual(res.data[0]['ingredients'], [self.ingredient.id])
+
+	def test_list_expand_query_count_constant(self): #Test the list nests tags and ingredients without a query per recipe
+		def add_recipes(count):
+			for i in range(count):
+				recipe = Recipe.objects.create(user=self.user, title='Recipe {}'.format(i), time_minutes=10, price=5.00)
+				recipe.tags.add(Tag.objects.create(user=self.user, name='Tag {}'.format(i)))
+				recipe.ingredients.add(self.ingredient)
+
+		self.assertQueryCountConstant(
+			lambda: self.client.get(RECIPES_URL, {'expand': 'tags,ingredients'}),
+			add_recipes
+		)
+
+	def test_detail_fields_and_expand(self): #Test the detail nests both relations by default and an empty ?expand= returns their ids
+		res, queries = self.get(detail_url(self.recipe.id), fields='title,tags')
+		self.assertEqual(res.data, {'title': 'Dal makhani', 'tags': [{'id': self.tag.id, 'name': 'Vegetarian'}]})
+
+		res, queries = self.get(detail_url(self.recipe.id), fields='tags,ingredients', expand='')
+		self.assertEqual(res.data, {'tags': [self.tag.id], 'ingredients': [self.ingredient.id]})
+
+	def test_fields_with_ordering_and_pages(self): #Test the columns of the ordering are loaded even when they aren't returned, the cursor needs them
+		Recipe.objects.create(user=self.user, title='Chole', time_minutes=40, price=3.00)
+
+		with CaptureQueriesContext(connection) as queries:
+			res = self.client.get(RECIPES_URL, {'fields': 'title', 'ordering': 'price', 'page_size': 1})
+
+		self.assertEqual(res.data, [{'title': 'Chole'}])
+		self.assertIn('rel="next"', res['Link'])
+		self.assertEqual(len([query for query in queries if 'FROM "core_recipe"' in query['sql']]), 1)
+
+	def test_unknown_names(self):
+		for param, value in (('fields', 'id,secret'), ('expand', 'title'), ('expand', 'user')):
+			res = self.client.get(RECIPES_URL, {param: value})
+			self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+			self.assertIn(param, res.data)
+
+	def test_writes_return_every_field(self): #Test ?fields= doesn't narrow what create validates or returns
+		res = self.client.post(RECIPES_URL + '?fields=id', {'title': 'Rajma', 'time_minutes': 50, 'price': 3.50})
+
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+		self.assertEqual(res.data['title'], 'Rajma')
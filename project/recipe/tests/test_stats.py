@@ -0,0 +1,169 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient, UserStats
+
+from recipe.stats import recount
+
+
+STATS_URL = reverse('recipe:stats')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+class RecipeCountTests(TestCase): #Test the counters kept by the triggers of migration 0011
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(
+			'ksarthak4ever@gmail.com',
+			'randompassword'
+		)
+		self.tag = Tag.objects.create(user=self.user, name='Vegan')
+		self.ingredient = Ingredient.objects.create(user=self.user, name='Tofu')
+
+	def sample_recipe(self, title='Salad'):
+		return Recipe.objects.create(user=self.user, title=title, time_minutes=10, price=5.00)
+
+	def counts(self):
+		self.tag.refresh_from_db()
+		self.ingredient.refresh_from_db()
+		return self.tag.recipe_count, self.ingredient.recipe_count
+
+	def test_links_counted(self): #Test adding, removing and clearing links from either side changes the counts
+		recipe1 = self.sample_recipe()
+		recipe2 = self.sample_recipe('Curry')
+		recipe1.tags.add(self.tag)
+		recipe1.ingredients.add(self.ingredient)
+		self.tag.recipe_set.add(recipe2)
+		self.assertEqual(self.counts(), (2, 1))
+
+		recipe1.tags.remove(self.tag)
+		recipe1.tags.remove(self.tag) #already removed, not counted twice
+		self.assertEqual(self.counts(), (1, 1))
+
+		self.tag.recipe_set.clear()
+		recipe1.ingredients.clear()
+		self.assertEqual(self.counts(), (0, 0))
+
+	def test_deleted_recipe_uncounted(self): #Test deleting a recipe removes its links from the counts
+		recipe = self.sample_recipe()
+		recipe.tags.add(self.tag)
+		recipe.ingredients.add(self.ingredient)
+
+		recipe.delete()
+
+		self.assertEqual(self.counts(), (0, 0))
+		self.assertEqual(UserStats.objects.get(user=self.user).recipe_count, 0)
+
+	def test_saving_stale_tag_keeps_count(self): #Test saving a tag loaded before a recipe was linked doesn't write its old count back
+		self.sample_recipe().tags.add(self.tag)
+
+		self.tag.name = 'Vegetarian'
+		self.tag.save()
+
+		self.assertEqual(self.counts(), (1, 0))
+		self.assertEqual(self.tag.name, 'Vegetarian')
+
+	def test_bulk_endpoints_counted(self): #Test the bulk endpoints, which send no signals, are counted
+		client = APIClient()
+		client.force_authenticate(self.user)
+		res = client.post(RECIPES_BULK_URL, [
+			{'title': 'Recipe {}'.format(i), 'time_minutes': 10, 'price': '5.00', 'tags': [self.tag.id], 'ingredients': []}
+			for i in range(3)
+		], format='json')
+		self.assertEqual(self.counts(), (3, 0))
+
+		client.delete(RECIPES_BULK_URL, [res.data[0]['id'], res.data[1]['id']], format='json')
+
+		self.assertEqual(self.counts(), (1, 0))
+		self.assertEqual(UserStats.objects.get(user=self.user).recipe_count, 1)
+
+	def test_user_totals(self): #Test the per user totals follow creates and deletes
+		self.sample_recipe()
+		Tag.objects.create(user=self.user, name='Dessert').delete()
+		Ingredient.objects.create(user=self.user, name='Salt')
+
+		stats = UserStats.objects.get(user=self.user)
+		self.assertEqual((stats.recipe_count, stats.tag_count, stats.ingredient_count), (1, 1, 2))
+
+	def test_recount_fixes_drift(self): #Test recount and the recount command fix counters changed behind the triggers' back
+		self.sample_recipe().tags.add(self.tag)
+		Tag.objects.filter(id=self.tag.id).update(recipe_count=7)
+		UserStats.objects.filter(user=self.user).update(recipe_count=0)
+
+		self.assertEqual(recount([self.user.id]), 2)
+		self.assertEqual(self.counts(), (1, 0))
+		self.assertEqual(UserStats.objects.get(user=self.user).recipe_count, 1)
+
+		Ingredient.objects.filter(id=self.ingredient.id).update(recipe_count=3)
+		out = StringIO()
+		call_command('recount', stdout=out)
+		self.assertIn('Fixed 1 counts', out.getvalue())
+		self.assertEqual(self.counts(), (1, 0))
+
+
+class StatsApiTests(TestCase): #Test the /stats/ endpoint
+
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(
+			'ksarthak4ever@gmail.com',
+			'randompassword'
+		)
+		self.client.force_authenticate(self.user)
+
+	def test_login_required(self):
+		res = APIClient().get(STATS_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+	def test_empty_account(self): #Test a user who created nothing gets zeros
+		res = self.client.get(STATS_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res.data, {'recipes': 0, 'tags': 0, 'ingredients': 0, 'top_tags': [], 'top_ingredients': []})
+
+	def test_stats(self): #Test the totals and the most used tags and ingredients, unused ones and other users' left out
+		tags = [Tag.objects.create(user=self.user, name=name) for name in ('Vegan', 'Dessert', 'Unused')]
+		salt = Ingredient.objects.create(user=self.user, name='Salt')
+		for i in range(3):
+			recipe = Recipe.objects.create(user=self.user, title='Recipe {}'.format(i), time_minutes=10, price=5.00)
+			recipe.tags.add(*tags[:1 if i else 2])
+			recipe.ingredients.add(salt)
+		user2 = get_user_model().objects.create_user('kshubham155@gmail.com', 'password123')
+		Tag.objects.create(user=user2, name='Spicy')
+
+		res = self.client.get(STATS_URL, {'limit': 1})
+
+		self.assertEqual(res.data['recipes'], 3)
+		self.assertEqual(res.data['tags'], 3)
+		self.assertEqual(res.data['ingredients'], 1)
+		self.assertEqual(res.data['top_tags'], [{'id': tags[0].id, 'name': 'Vegan', 'recipe_count': 3}])
+		self.assertEqual(res.data['top_ingredients'], [{'id': salt.id, 'name': 'Salt', 'recipe_count': 3}])
+
+		res = self.client.get(STATS_URL)
+		self.assertEqual([tag['name'] for tag in res.data['top_tags']], ['Vegan', 'Dessert'])
+
+	def test_fixed_queries(self): #Test the stats cost the same queries however many recipes the user has
+		tag = Tag.objects.create(user=self.user, name='Vegan')
+		for i in range(10):
+			Recipe.objects.create(user=self.user, title='Recipe {}'.format(i), time_minutes=10, price=5.00).tags.add(tag)
+
+		with self.assertNumQueries(3): #totals, top tags, top ingredients
+			self.client.get(STATS_URL)
+
+	def test_invalid_limit(self): #Test a limit that isn't a positive number gives the default and a big one is capped
+		for i in range(12):
+			Recipe.objects.create(user=self.user, title='Recipe', time_minutes=10, price=5.00).tags.add(
+				Tag.objects.create(user=self.user, name='Tag {}'.format(i))
+			)
+
+		self.assertEqual(len(self.client.get(STATS_URL, {'limit': 'abc'}).data['top_tags']), 10)
+		self.assertEqual(len(self.client.get(STATS_URL, {'limit': 0}).data['top_tags']), 10)
+		self.assertEqual(len(self.client.get(STATS_URL, {'limit': 1000}).data['top_tags']), 12)
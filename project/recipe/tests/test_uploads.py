@@ -0,0 +1,112 @@
+import hashlib
+import io
+import os
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+from recipe.uploads import BoundedImageUploadHandler
+
+
+def image_upload_url(recipe_id):
+	return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def image_bytes(size=(10, 10), image_format='JPEG', noise=False): #Return the encoded bytes of a new image, noise makes it compress badly
+	if noise:
+		image = Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+	else:
+		image = Image.new('RGB', size)
+	buffer = io.BytesIO()
+	image.save(buffer, format=image_format)
+	return buffer.getvalue()
+
+
+@patch('recipe.views.schedule_renditions')
+class BoundedImageUploadTests(TestCase): #Test the limits enforced while an image upload streams in
+
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(
+			'ksarthak4ever@gmail.com',
+			'testpass'
+		)
+		self.client.force_authenticate(self.user)
+		self.recipes = [
+			Recipe.objects.create(user=self.user, title='Pav bhaji', time_minutes=30, price=2.00)
+			for i in range(2)
+		]
+
+	def tearDown(self):
+		for recipe in self.recipes:
+			recipe.refresh_from_db()
+			if recipe.image and recipe.image.storage.exists(recipe.image.name):
+				recipe.image.delete()
+
+	def upload(self, recipe, content, name='image.jpg'):
+		return self.client.post(
+			image_upload_url(recipe.id),
+			{'image': SimpleUploadedFile(name, content)},
+			format='multipart'
+		)
+
+	def test_image_named_after_its_contents(self, schedule):
+		content = image_bytes()
+
+		res = self.upload(self.recipes[0], content)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.recipes[0].refresh_from_db()
+		self.assertEqual(self.recipes[0].image.name, 'uploads/recipe/{}.jpg'.format(hashlib.sha256(content).hexdigest()))
+
+	def test_identical_uploads_stored_once(self, schedule):
+		content = image_bytes()
+
+		self.upload(self.recipes[0], content, name='first.JPG')
+		self.upload(self.recipes[1], content, name='second.jpg')
+
+		for recipe in self.recipes:
+			recipe.refresh_from_db()
+		self.assertEqual(self.recipes[0].image.name, self.recipes[1].image.name)
+		directory = os.path.dirname(self.recipes[0].image.path)
+		digest = hashlib.sha256(content).hexdigest()
+		self.assertEqual([name for name in os.listdir(directory) if name.startswith(digest)], [digest + '.jpg'])
+
+	@override_settings(RECIPE_IMAGE_MAX_BYTES=4096)
+	def test_too_many_bytes_rejected(self, schedule):
+		res = self.upload(self.recipes[0], image_bytes(size=(100, 100), noise=True))
+
+		self.assertEqual(res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+		self.recipes[0].refresh_from_db()
+		self.assertFalse(self.recipes[0].image)
+		schedule.assert_not_called()
+
+	@override_settings(RECIPE_IMAGE_MAX_PIXELS=10000)
+	def test_too_many_pixels_rejected(self, schedule):
+		res = self.upload(self.recipes[0], image_bytes(size=(101, 100), image_format='PNG'), name='image.png')
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertIn('image', res.data)
+		self.recipes[0].refresh_from_db()
+		self.assertFalse(self.recipes[0].image)
+
+	@override_settings(RECIPE_IMAGE_MAX_PIXELS=10000)
+	def test_pixels_checked_from_the_header(self, schedule): #Test an oversized image is rejected on its first chunk, before the rest is read
+		content = image_bytes(size=(1000, 1000), noise=True)
+		handler = BoundedImageUploadHandler(RequestFactory().post('/'))
+		handler.new_file('image', 'image.jpg', 'image/jpeg', len(content))
+
+		with self.assertRaises(ValidationError):
+			handler.receive_data_chunk(content[:handler.chunk_size], 0)
+		self.assertGreater(len(content), handler.chunk_size)
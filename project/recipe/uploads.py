@@ -0,0 +1,95 @@
+import hashlib
+import io
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.http.multipartparser import MultiPartParser as DjangoMultiPartParser, MultiPartParserError
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError, ValidationError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+
+HEADER_BYTES = 512 * 1024 #how much of the start of an upload is tried as an image header while it streams in, jpeg dimensions come after the exif data which is at most 64KB per segment
+
+
+class UploadTooLarge(APIException):
+	status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+	default_detail = _('The uploaded file is too large.')
+	default_code = 'upload_too_large'
+
+
+def check_image_header(file, field_name): #Read the dimensions from the header of an image without decoding its pixels and reject images over RECIPE_IMAGE_MAX_PIXELS. Returns False if file doesn't start with a (complete) image header
+	try:
+		width, height = Image.open(file).size #lazy, only the header is parsed
+	except Image.DecompressionBombError: #Pillow refuses more than twice Image.MAX_IMAGE_PIXELS on its own
+		width, height = settings.RECIPE_IMAGE_MAX_PIXELS + 1, 1
+	except (IOError, ValueError):
+		return False
+
+	if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+		raise ValidationError({field_name: [
+			_('Images can have at most {} pixels.').format(settings.RECIPE_IMAGE_MAX_PIXELS)
+		]})
+	return True
+
+
+class BoundedImageUploadHandler(TemporaryFileUploadHandler): #Streams uploaded files to a temporary file chunk by chunk, hashing them on the way and rejecting them as soon as they pass RECIPE_IMAGE_MAX_BYTES or their header shows too many pixels
+	'''The rest of the file isn't read once a limit is hit, so a decompression bomb costs no more than its first chunks.
+	Files that pass get a content_hash attribute that core.storage uses to name them.'''
+
+	def new_file(self, field_name, *args, **kwargs):
+		super().new_file(field_name, *args, **kwargs)
+		self.sha256 = hashlib.sha256()
+		self.received = 0
+		self.header = bytearray()
+		self.header_checked = False
+
+	def receive_data_chunk(self, raw_data, start):
+		self.received += len(raw_data)
+		if self.received > settings.RECIPE_IMAGE_MAX_BYTES:
+			self.file.close() #removes the temporary file
+			raise UploadTooLarge(_('Images can be at most {} bytes.').format(settings.RECIPE_IMAGE_MAX_BYTES))
+
+		if not self.header_checked and len(self.header) < HEADER_BYTES:
+			self.header += raw_data
+			self.header_checked = self.check_header(io.BytesIO(self.header))
+
+		self.sha256.update(raw_data)
+		return super().receive_data_chunk(raw_data, start)
+
+	def file_complete(self, file_size):
+		file = super().file_complete(file_size)
+		if not self.header_checked: #header larger than HEADER_BYTES, or not an image which ImageField validation reports
+			self.check_header(file)
+			file.seek(0)
+		file.content_hash = self.sha256.hexdigest()
+		return file
+
+	def check_header(self, file):
+		try:
+			return check_image_header(file, self.field_name)
+		except ValidationError:
+			self.file.close()
+			raise
+
+
+class BoundedImageUploadParser(MultiPartParser): #Multipart parser for the image upload endpoints, streaming files through BoundedImageUploadHandler instead of the default upload handlers
+
+	def parse(self, stream, media_type=None, parser_context=None):
+		parser_context = parser_context or {}
+		request = parser_context['request']
+		encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+		meta = request.META.copy()
+		meta['CONTENT_TYPE'] = media_type
+		upload_handlers = [BoundedImageUploadHandler(request._request)]
+
+		try:
+			parser = DjangoMultiPartParser(meta, stream, upload_handlers, encoding)
+			data, files = parser.parse()
+			return DataAndFiles(data, files)
+		except MultiPartParserError as exc:
+			raise ParseError('Multipart form parse error - %s' % exc)
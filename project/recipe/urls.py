@@ -11,5 +11,6 @@ router.register('recipes', views.RecipeViewSet)
 app_name = 'recipe' #so that when we identify the app the reverse function can look up the correct urls
 
 urlpatterns = [
+	path('stats/', views.StatsView.as_view(), name='stats'),
 	path('', include(router.urls))
 ]
\ No newline at end of file
@@ -1,26 +1,49 @@
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
+
 from rest_framework.decorators import action #this decorator is used to add custom actions to our viewsets
 from rest_framework.response import Response #for returning a custom response
+from rest_framework.exceptions import ValidationError
 from rest_framework import viewsets, mixins, status
 from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 
 from core.models import Tag, Ingredient, Recipe
-
-from recipe import serializers
-
-
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin): #Base viewset for user owned recipe attributes.Creating base class to reduce code duplicacy and as i'm making this api in Test Driven Development i can do this without worry of breaking the code.
-	authentication_classes = (TokenAuthentication,)
+from user.authentication import CachedTokenAuthentication
+
+from recipe import serializers, filters
+from recipe.bulk import BulkModelMixin
+from recipe.cache import CachedListMixin
+from recipe.export import EXPORT_FORMATS, IgnoreClientContentNegotiation, export_lines
+from recipe.fastpath import FastListMixin, TagReader, IngredientReader, RecipeReader
+from recipe.images import schedule_renditions
+from recipe.search import recipes_using, update_search_vectors
+from recipe.sparse import SparseFieldsMixin
+from recipe.stats import user_stats
+from recipe.uploads import BoundedImageUploadParser
+
+
+class BaseRecipeAttrViewSet(CachedListMixin, FastListMixin, BulkModelMixin, viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin): #Base viewset for user owned recipe attributes.Creating base class to reduce code duplicacy and as i'm making this api in Test Driven Development i can do this without worry of breaking the code.
+	authentication_classes = (CachedTokenAuthentication,)
 	permission_classes = (IsAuthenticated,)
+	filter_backends = (filters.AssignedOnlyFilter, filters.NameSearchFilter)
+	ordering = ('-name', 'id') #id breaks ties between equal names so KeysetPagination has a unique position for every row
 
-	def get_queryset(self): #Return objects for current authenticated user
-		assigned_only = bool(self.request.query_params.get('assigned_only'))
-		queryset = self.queryset
-		if assigned_only:
-			queryset = queryset.filter(recipe__isnull=False) #since django will allow us to access the field of the reverse relationship on ingredient and tag by the lowercase version of the classname i.e recipe to access Recipe model class and isnull is used to filter out all the null values
+	def get_queryset(self): #Return objects for current authenticated user.Filtering on assigned_only is done by AssignedOnlyFilter and on ?q= by NameSearchFilter
+		return self.queryset.filter(user=self.request.user).order_by(*self.ordering)
 
-		return queryset.filter(user=self.request.user).order_by('-name')
+	def get_ordering(self): #Autocomplete matches come closest first
+		if filters.search_terms(self.request):
+			return ('-similarity',) + self.ordering
+		return self.ordering
+
+	@transaction.atomic
+	def bulk_update(self, request, items): #Renaming tags/ingredients in bulk sends no post_save, so their recipes are reindexed for search here
+		response = super().bulk_update(request, items)
+		update_search_vectors(recipes_using(self.queryset.model, [item['id'] for item in items]))
+		return response
 
 	def perform_create(self, serializer): #Create a new object. The perform_create function allows us to hook into the create process when creating an object i.e what happens is when we do a create object in our viewset this function gets invoked and the validated serializer will be passed in as a serializer argument
 		serializer.save(user=self.request.user)
@@ -29,47 +52,59 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixi
 class TagViewSet(BaseRecipeAttrViewSet): #Manage tags in the database. Inheriting BaseRecipeAttrViewSet class to reduce code duplicacy
 	queryset = Tag.objects.all() #as ListModelMixin require queryset to be passed
 	serializer_class = serializers.TagSerializer
+	reader_class = TagReader #builds the list straight from the rows, same output as TagSerializer
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet): #Manage ingredients in the database
 	queryset = Ingredient.objects.all() #as ListModelMixin require queryset to be passed
 	serializer_class = serializers.IngredientSerializer
+	reader_class = IngredientReader
 
 
-class RecipeViewSet(viewsets.ModelViewSet): #Manage recipes in the database
+class RecipeViewSet(CachedListMixin, FastListMixin, SparseFieldsMixin, BulkModelMixin, viewsets.ModelViewSet): #Manage recipes in the database.CachedListMixin serves the list from the per user response cache, FastListMixin builds it without the serializer, SparseFieldsMixin adds ?fields= and ?expand= and BulkModelMixin adds the /bulk/ endpoint
 	serializer_class = serializers.RecipeSerializer
+	reader_class = RecipeReader
 	queryset = Recipe.objects.all()
-	authentication_classes = (TokenAuthentication,)
+	authentication_classes = (CachedTokenAuthentication,)
 	permission_classes = (IsAuthenticated,)
-
-	def _params_to_ints(self, qs): #Convert a list of string IDS to a list of integers.To filter Recipes.
-		return [int(str_id) for str_id in qs.split(',')] #runs qs.split fn and that would return a list of strings split up by ,
-
-	def get_queryset(self): #Retrieve the recipes for the authenticated user
-		tags =self.request.query_params.get('tags') #i.e if we have provided tags as a query_params or query string then it will be assigned to tags variable
-		ingredients = self.request.query_params.get('ingredients')
-		queryset = self.queryset
-		if tags:
-			tag_ids = self._params_to_ints(tags)
-			queryset = queryset.filter(tags__id__in=tag_ids) #this is basically django syntax for filtering on foreign key objects.Double underscore used.
-		if ingredients:
-			ingredient_ids = self._params_to_ints(ingredients)
-			queryset = queryset.filter(ingredients__id__in=ingredient_ids)
-
-		return queryset.filter(user=self.request.user)
+	filter_backends = (filters.RecipeAttrFilter, filters.RecipeRangeFilter, filters.RecipeSearchFilter) #handle the tags, ingredients, time/price ranges and q query params
+	ordering = ('-id',) #newest recipes first, used by KeysetPagination
+	ordering_fields = ('id', 'time_minutes', 'price') #accepted by ?ordering=, each has a (user, field, id) index
+	cache_id_list_params = CachedListMixin.cache_id_list_params + ('fields', 'expand') #order of the names doesn't change the response either
+
+	def get_queryset(self): #Retrieve the recipes for the authenticated user.Filtering on the tags and ingredients query params is done by RecipeAttrFilter.The list and detail load only the columns and prefetch only the relations their ?fields= and ?expand= return, other actions(create,update,upload_image etc.) work on a single recipe and need no prefetching
+		queryset = self.queryset.for_user(self.request.user)
+		if self.action in self.sparse_actions:
+			queryset = self.get_sparse_queryset(queryset)
+		return queryset
+
+	def get_reader(self): #Readers only output ids for the relations, a list with ?expand= goes through the serializer
+		if self.get_expand_param():
+			return None
+		return self.reader_class(self.request, self.get_fields_param())
+
+	def get_ordering(self): #The ?ordering= asked for, else search results best match first, else newest first
+		ordering = filters.ordering_param(self.request, self.ordering_fields)
+		if ordering:
+			return ordering
+		if filters.search_terms(self.request):
+			return ('-rank',) + self.ordering
+		return self.ordering
 
 	def get_serializer_class(self): #Return appropriate serializer class. From DRF documentation:~https://www.django-rest-framework.org/api-guide/generic-views/#get_serializer_classself
 		if self.action == 'retrieve':
 			return serializers.RecipeDetailSerializer
 		elif self.action == 'upload_image':
 			return serializers.RecipeImageSerializer
+		elif self.action == 'bulk':
+			return serializers.BulkRecipeSerializer
 
 		return self.serializer_class
 
 	def perform_create(self, serializer): #Create a new Recipe
 		serializer.save(user=self.request.user)
 
-	@action(methods=['POST'], detail=True, url_path='upload-image') # https://www.django-rest-framework.org/api-guide/viewsets/#marking-extra-actions-for-routing
+	@action(methods=['POST'], detail=True, url_path='upload-image', parser_classes=(BoundedImageUploadParser,)) # https://www.django-rest-framework.org/api-guide/viewsets/#marking-extra-actions-for-routing
 	def upload_image(self, request, pk=None): #Upload an image to a recipe
 		recipe = self.get_object()
 		serializer = self.get_serializer(
@@ -78,7 +113,8 @@ class RecipeViewSet(viewsets.ModelViewSet): #Manage recipes in the database
 		)
 
 		if serializer.is_valid():
-			serializer.save()
+			serializer.save(renditions_ready=False) #the renditions of the previous image are stale
+			schedule_renditions(recipe.id) #resized in the worker pool once committed, so the upload returns right away
 			return Response(
 				serializer.data,
 				status=status.HTTP_200_OK
@@ -87,4 +123,33 @@ class RecipeViewSet(viewsets.ModelViewSet): #Manage recipes in the database
 		return Response(
 			serializer.errors,
 			status=status.HTTP_400_BAD_REQUEST
-		)
\ No newline at end of file
+		)
+
+	@action(methods=['GET'], detail=False, url_path='export', content_negotiation_class=IgnoreClientContentNegotiation)
+	def export(self, request): #Stream every recipe of the user(narrowed by the usual tags/ingredients filters) as ?output=ndjson(default) or ?output=csv, memory stays flat however big the account is
+		export_format = request.query_params.get('output', 'ndjson') #not ?format= as DRF uses that one to pick a renderer
+		if export_format not in EXPORT_FORMATS:
+			raise ValidationError({'output': [_('Expected one of: {}.').format(', '.join(EXPORT_FORMATS))]})
+
+		queryset = self.filter_queryset(self.get_queryset())
+		content_type = EXPORT_FORMATS[export_format][1]
+		response = StreamingHttpResponse(export_lines(queryset, export_format), content_type=content_type)
+		response['Content-Disposition'] = 'attachment; filename="recipes.{}"'.format(export_format)
+		return response
+
+
+class StatsView(APIView): #Number of recipes, tags and ingredients of the user and their ?limit= most used tags and ingredients, read from the counters the db triggers keep so it costs the same for any account size
+	authentication_classes = (CachedTokenAuthentication,)
+	permission_classes = (IsAuthenticated,)
+	default_limit = 10
+	max_limit = 100
+
+	def get(self, request):
+		return Response(user_stats(request.user, self.get_limit(request)))
+
+	def get_limit(self, request): #?limit= asked for, the default when it isn't a positive number and capped at max_limit like ?page_size=
+		try:
+			limit = int(request.query_params['limit'])
+		except (KeyError, ValueError):
+			return self.default_limit
+		return min(limit, self.max_limit) if limit > 0 else self.default_limit
@@ -0,0 +1 @@
+default_app_config = 'user.apps.UserConfig' #so django uses UserConfig and its ready() hook
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class UserConfig(AppConfig):
     name = 'user'
+
+    def ready(self): #connecting the signal receivers that keep the token authentication cache up to date
+        from user import signals  # noqa: F401
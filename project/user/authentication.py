@@ -0,0 +1,127 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.metrics import record_cache_lookup
+from core.timing import timed
+
+
+class LRUCache: #Small thread safe in-process cache with a max number of entries and a time to live for each entry
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict() #key -> (expires_at, value), ordered from least to most recently used
+        self._lock = threading.Lock() #as gunicorn threads share the cache
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False) #evict the least recently used entry
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = LRUCache(
+    max_size=settings.TOKEN_AUTH_CACHE_SIZE,
+    ttl=settings.TOKEN_AUTH_CACHE_TTL
+)
+
+
+def shared_token_cache(): #Django cache used as the second tier shared by all the worker processes, None if not configured
+    alias = settings.TOKEN_AUTH_SHARED_CACHE
+    return caches[alias] if alias else None
+
+
+SHARED_USER_FIELDS = ('id', 'email', 'name', 'is_active', 'is_staff', 'is_superuser') #what the views and permission checks read from request.user, never the password hash
+
+
+def shared_cache_key(key): #Keyed on a hash of the token so reading the shared cache doesn't reveal the live tokens
+    return 'authtoken:{}'.format(hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+
+def to_shared_entry(user, token): #The (user, token) of a key as stored in the shared cache, plain values without the token key or the password hash
+    return {
+        'user': {name: getattr(user, name) for name in SHARED_USER_FIELDS},
+        'token_created': token.created,
+    }
+
+
+def from_shared_entry(key, entry): #(user, token) rebuilt from a shared cache entry, the fields left out are deferred i.e loaded from the db if read and not written back by save()
+    user = _from_fields(get_user_model(), entry['user'])
+    token = _from_fields(Token, {'key': key, 'user_id': user.id, 'created': entry['token_created']})
+    token.user = user
+    return user, token
+
+
+def _from_fields(model, values): #model.from_db() takes the values in the order of the concrete fields
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(DEFAULT_DB_ALIAS, names, [values[name] for name in names])
+
+
+def invalidate_token(key): #Drop a token from both cache tiers so the next request with it goes to the db again
+    token_cache.delete(key)
+    shared = shared_token_cache()
+    if shared is not None:
+        shared.delete(shared_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication): #TokenAuthentication that remembers the (user, token) of a key so authenticated requests skip the authtoken_token query
+    '''Lookups go to the in-process LRU first, then to the shared cache(if TOKEN_AUTH_SHARED_CACHE is set) and
+    only then to the db, the shared cache holding only a few user fields under a hash of the token(see
+    to_shared_entry()). Entries are dropped by the signals in user/signals.py when a token is deleted or
+    rotated or its user is saved(i.e is_active changes), TOKEN_AUTH_CACHE_TTL bounds how long changes
+    made without signals(queryset.update(), other worker processes' local caches) can go unnoticed.'''
+
+    def authenticate(self, request):
+        with timed('auth'):
+            return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        record_cache_lookup('token_auth', cached is not None)
+        if cached is None:
+            shared = shared_token_cache()
+            if shared is not None:
+                entry = shared.get(shared_cache_key(key))
+                record_cache_lookup('token_auth_shared', entry is not None)
+                if entry is not None:
+                    cached = from_shared_entry(key, entry)
+            if cached is None:
+                cached = super().authenticate_credentials(key) #raises AuthenticationFailed for unknown tokens and inactive users, those are never cached
+                if shared is not None:
+                    shared.set(shared_cache_key(key), to_shared_entry(*cached), settings.TOKEN_AUTH_CACHE_TTL)
+            token_cache.set(key, cached)
+
+        user, token = cached
+        return copy.copy(user), token #a copy so one request changing request.user can't leak into other requests sharing the cached instance
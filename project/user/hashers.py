@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+# Django's hashers with their cost read from the settings, so it can be tuned per
+# deployment without a code change. The algorithm names are Django's, so stored
+# hashes keep verifying. After a cost change, must_update() reports the old hashes
+# and Django rehashes them the next time their user logs in.
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher): #needs argon2-cffi
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self): #in KiB
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher): #needs bcrypt
+
+    @property
+    def rounds(self): #log2 of the number of rounds
+        return settings.PASSWORD_BCRYPT_ROUNDS
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher): #Django's default, kept so the existing hashes verify until they are upgraded
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
@@ -3,8 +3,12 @@ from django.utils.translation import ugettext_lazy as _ # for outputting message
 
 from rest_framework import serializers
 
+from core.timing import TimedSerializerMixin, timed
 
-class UserSerializer(serializers.ModelSerializer): #Serializer for the user object # Create a new serializer that inherits from ModelSerializer
+from user.throttling import LoginFailureThrottle
+
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer): #Serializer for the user object # Create a new serializer that inherits from ModelSerializer
 
     class Meta:
         model = get_user_model() #specifying the model we want to base the ModelSerializer from
@@ -26,7 +30,7 @@ class UserSerializer(serializers.ModelSerializer): #Serializer for the user obje
         return user
 
 
-class AuthTokenSerializer(serializers.Serializer): #Serializer for the user authentication object
+class AuthTokenSerializer(TimedSerializerMixin, serializers.Serializer): #Serializer for the user authentication object
     email = serializers.CharField()
     password = serializers.CharField(
         style={'input_type': 'password'},
@@ -39,15 +43,20 @@ class AuthTokenSerializer(serializers.Serializer): #Serializer for the user auth
         email = attrs.get('email')
         password = attrs.get('password')
         # Validate whether to pass/fail by using authenticate. See notes.
-        user = authenticate(
-            request=self.context.get('request'),
-            username=email,
-            password=password
-        )
+        with timed('auth'):
+            user = authenticate(
+                request=self.context.get('request'),
+                username=email,
+                password=password
+            )
         # When authentication fails display message and error to user
+        throttle = LoginFailureThrottle() #CreateTokenView refuses the request before authenticate() once there are too many failures
         if not user:
+            if self.context.get('request') is not None:
+                throttle.record_failure(self.context['request'], email)
             msg = _("Unable to authenticate with provided credentials")
             raise serializers.ValidationError(msg, code='authentication')
+        throttle.clear(email)
         # Authentication passes so set attrs['user'] to user object
         attrs['user'] = user
         # Must return values(i.e attrs) at end when whenever overriding validate()
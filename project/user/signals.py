@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from user.authentication import invalidate_token
+
+
+@receiver(post_delete, sender=Token) #covers logging out, rotating a token(the old key is deleted) and deleting the user as tokens are deleted in cascade
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=Token)
+def invalidate_saved_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=get_user_model()) #the cache holds the user object too so any change to it(is_active, name etc.) needs the cached entry dropped
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    if created:
+        return
+    for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+        invalidate_token(key)
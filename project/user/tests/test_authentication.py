@@ -0,0 +1,120 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from user.authentication import CachedTokenAuthentication, LRUCache, shared_cache_key, token_cache
+
+
+ME_URL = reverse('user:me')
+
+
+class LRUCacheTests(TestCase): #Test the in-process cache used for tokens
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_size=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a') #makes b the least recently used
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    @patch('user.authentication.time.monotonic')
+    def test_entries_expire(self, monotonic):
+        cache = LRUCache(max_size=2, ttl=60)
+        monotonic.return_value = 100
+        cache.set('a', 1)
+
+        monotonic.return_value = 159
+        self.assertEqual(cache.get('a'), 1)
+        monotonic.return_value = 160
+        self.assertIsNone(cache.get('a'))
+
+
+class CachedTokenAuthenticationTests(TestCase): #Test the token authentication cache and its invalidation
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='ksarthak4ever@gmail.com',
+            password='booyaka'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_second_lookup_skips_db(self): #Test a cached token is authenticated without any query
+        self.auth.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_deleted_token_rejected(self): #Test deleting(or rotating) a token drops it from the cache
+        self.auth.authenticate_credentials(self.token.key)
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_deactivated_user_rejected(self): #Test a cached token stops working once its user is deactivated
+        self.auth.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    @override_settings(TOKEN_AUTH_SHARED_CACHE='default')
+    def test_shared_cache_tier(self): #Test a token found in the shared cache is not looked up in the db by a worker with an empty local cache
+        self.auth.authenticate_credentials(self.token.key)
+        token_cache.clear() #i.e another worker process
+
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user, self.user)
+        self.assertEqual((user.email, user.is_active), (self.user.email, True))
+        self.assertEqual((token.key, token.user_id), (self.token.key, self.user.id))
+
+    @override_settings(TOKEN_AUTH_SHARED_CACHE='default')
+    def test_shared_cache_holds_no_secrets(self): #Test the shared cache has neither the token nor the password hash in its keys or values
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.assertIsNone(caches['default'].get('authtoken:{}'.format(self.token.key)))
+        stored = repr(caches['default'].get(shared_cache_key(self.token.key)))
+        self.assertNotIn(self.token.key, shared_cache_key(self.token.key))
+        self.assertNotIn(self.token.key, stored)
+        self.assertNotIn(self.user.password, stored)
+
+    @override_settings(TOKEN_AUTH_SHARED_CACHE='default')
+    def test_user_from_shared_cache_saved(self): #Test saving a user rebuilt from the shared cache keeps the fields it doesn't hold
+        self.auth.authenticate_credentials(self.token.key)
+        token_cache.clear()
+        user, token = self.auth.authenticate_credentials(self.token.key)
+
+        user.name = 'Sarthak'
+        user.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'Sarthak')
+        self.assertTrue(self.user.check_password('booyaka'))
+
+    def test_api_request_with_token(self): #Test the endpoints authenticate with the cached token
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+        res = client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
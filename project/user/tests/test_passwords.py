@@ -0,0 +1,109 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+TOKEN_URL = reverse('user:token')
+
+
+class PasswordHashingTests(TestCase): #Test the configurable hashers and the upgrade of old hashes at login
+
+    def setUp(self):
+        cache.clear() #the failed login counters
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('ksarthak4ever@gmail.com', 'testpass')
+
+    def login(self, password='testpass'):
+        return self.client.post(TOKEN_URL, {'email': 'ksarthak4ever@gmail.com', 'password': password})
+
+    def test_new_passwords_hashed_with_argon2(self):
+        self.assertTrue(self.user.password.startswith('argon2$'))
+
+    def test_old_hash_upgraded_at_login(self): #Test a hash made by Django's default hasher is replaced with an argon2 one by the next successful login
+        self.user.password = make_password('testpass', hasher='pbkdf2_sha256')
+        self.user.save()
+
+        res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('argon2$'))
+
+    def test_cost_change_upgrades_hash_at_login(self):
+        with override_settings(PASSWORD_ARGON2_TIME_COST=3):
+            self.login()
+
+        self.user.refresh_from_db()
+        self.assertIn('t=3', self.user.password)
+
+    def test_failed_login_keeps_hash(self):
+        password = self.user.password
+
+        self.login(password='wrong')
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, password)
+
+    @override_settings(PASSWORD_HASHERS=[
+        'user.hashers.BCryptSHA256PasswordHasher',
+        'user.hashers.Argon2PasswordHasher',
+    ], PASSWORD_BCRYPT_ROUNDS=4)
+    def test_bcrypt_with_tunable_rounds(self):
+        self.login()
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('bcrypt_sha256$$2b$04$'))
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+
+@override_settings(LOGIN_FAILURES_PER_EMAIL=3, LOGIN_FAILURES_PER_IP=5)
+class LoginFailureThrottleTests(TestCase): #Test failed logins are limited before any password is hashed
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        get_user_model().objects.create_user('ksarthak4ever@gmail.com', 'testpass')
+
+    def login(self, email='ksarthak4ever@gmail.com', password='wrong'):
+        return self.client.post(TOKEN_URL, {'email': email, 'password': password})
+
+    def test_email_blocked_after_failures(self):
+        for i in range(3):
+            self.assertEqual(self.login().status_code, status.HTTP_400_BAD_REQUEST)
+
+        with patch('user.serializers.authenticate') as authenticate:
+            res = self.login(password='testpass') #even the right password
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+        authenticate.assert_not_called() #no hashing for blocked requests
+
+    def test_address_blocked_after_failures(self):
+        for i in range(5):
+            self.login(email='user{}@gmail.com'.format(i))
+
+        res = self.login(password='testpass')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_success_clears_email_failures(self):
+        for i in range(2):
+            self.login()
+        self.assertEqual(self.login(password='testpass').status_code, status.HTTP_200_OK)
+
+        for i in range(2):
+            self.assertEqual(self.login().status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.login(password='testpass').status_code, status.HTTP_200_OK)
+
+    def test_email_case_counted_together(self):
+        for i in range(3):
+            self.login(email='KSarthak4ever@gmail.com')
+
+        self.assertEqual(self.login().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
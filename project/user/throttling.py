@@ -0,0 +1,50 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework.throttling import BaseThrottle
+
+
+class LoginFailureThrottle(BaseThrottle): #Refuses token requests for an email, or from an address, with too many failed logins in the last LOGIN_FAILURE_WINDOW seconds
+    '''Checked before the serializer runs authenticate(), so a blocked request costs a cache read instead of a password hash.
+    Only failures count: AuthTokenSerializer calls record_failure() when the credentials are wrong and clear() when
+    they are right.'''
+
+    def allow_request(self, request, view):
+        cache = self.get_cache()
+        for key, limit in self.get_keys(request, self.get_email(request)):
+            if (cache.get(key) or 0) >= limit:
+                return False
+        return True
+
+    def wait(self): #counters expire a window after the first failure, so this is an upper bound
+        return settings.LOGIN_FAILURE_WINDOW
+
+    def record_failure(self, request, email):
+        cache = self.get_cache()
+        for key, limit in self.get_keys(request, email):
+            cache.add(key, 0, settings.LOGIN_FAILURE_WINDOW)
+            try:
+                cache.incr(key)
+            except ValueError: #expired between add() and incr()
+                cache.set(key, 1, settings.LOGIN_FAILURE_WINDOW)
+
+    def clear(self, email): #A correct password clears the failures of the email, not those of the address which may be shared by many users
+        self.get_cache().delete(self.email_key(email))
+
+    def get_keys(self, request, email): #(cache key, max failures) of the counters the request is limited by
+        keys = [('login-failures:ip:{}'.format(self.get_ident(request)), settings.LOGIN_FAILURES_PER_IP)]
+        if email:
+            keys.append((self.email_key(email), settings.LOGIN_FAILURES_PER_EMAIL))
+        return keys
+
+    def email_key(self, email): #hashed so any email is a valid cache key
+        return 'login-failures:email:{}'.format(hashlib.sha1(str(email).strip().lower().encode()).hexdigest())
+
+    def get_email(self, request):
+        data = request.data
+        return data.get('email') if hasattr(data, 'get') else None
+
+    def get_cache(self):
+        return caches[settings.LOGIN_THROTTLE_CACHE]
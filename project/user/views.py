@@ -1,8 +1,10 @@
-from rest_framework import generics, authentication, permissions #https://www.django-rest-framework.org/api-guide/generic-views/
+from rest_framework import generics, permissions #https://www.django-rest-framework.org/api-guide/generic-views/
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from user.authentication import CachedTokenAuthentication
 from user.serializers import UserSerializer, AuthTokenSerializer
+from user.throttling import LoginFailureThrottle
 
 
 class CreateUserView(generics.CreateAPIView): #create a new user in the app
@@ -12,6 +14,7 @@ class CreateUserView(generics.CreateAPIView): #create a new user in the app
 
 class CreateTokenView(ObtainAuthToken): #Create a new auth token for user
     serializer_class = AuthTokenSerializer
+    throttle_classes = (LoginFailureThrottle,) #checked before the password is hashed
     # Use default renderer classes so we have a browsable API
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
@@ -20,7 +23,7 @@ class ManageUserView(generics.RetrieveUpdateAPIView): #Manage the authenticated
     serializer_class = UserSerializer
 
     # Add class vars for authentication and permission
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     # Add a get_object() function to just return the user that's authenticated